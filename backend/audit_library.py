@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Offline duplicate audit for the debate template library
+
+Usage:
+    python audit_library.py                      # report duplicate clusters
+    python audit_library.py --merge              # collapse each cluster into one template
+    python audit_library.py --output report.json # also write the full report
+"""
+import argparse
+import json
+import time
+
+from services.debate_deduplication_service import DebateDeduplicationService
+from services.library_audit_service import LibraryAuditService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find and merge duplicate debate templates")
+    parser.add_argument("--templates", default="data/debate_templates.json",
+                        help="Path to the debate templates JSON file")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="Similarity threshold (defaults to the live deduplication threshold)")
+    parser.add_argument("--block-size", type=int, default=2048,
+                        help="Rows/columns per similarity tile")
+    parser.add_argument("--merge", action="store_true",
+                        help="Rewrite the library keeping one template per cluster")
+    parser.add_argument("--output", default=None,
+                        help="Write the full JSON report to this path")
+    args = parser.parse_args()
+
+    audit_service = LibraryAuditService(
+        deduplication_service=DebateDeduplicationService(templates_path=args.templates),
+        threshold=args.threshold,
+        block_size=args.block_size
+    )
+
+    start = time.perf_counter()
+    report = audit_service.run(merge=args.merge)
+    elapsed = time.perf_counter() - start
+
+    print("=" * 60)
+    print("DEBATE LIBRARY DUPLICATE AUDIT")
+    print("=" * 60)
+    print(f"\n📚 Templates audited: {report['total_templates']}")
+    print(f"  Threshold: {report['threshold']}")
+    print(f"  Duplicate clusters: {report['cluster_count']}")
+    print(f"  Redundant templates: {report['duplicate_count']}")
+    print(f"  Elapsed: {elapsed:.2f}s")
+
+    for cluster in report['clusters']:
+        canonical = cluster['canonical']
+        print(f"\n  [{canonical['id']}] {canonical['title']} ({canonical['slug']})")
+        print(f"    Scores: {cluster['min_score']} - {cluster['max_score']}")
+        for duplicate in cluster['duplicates']:
+            print(f"    ↳ [{duplicate['id']}] {duplicate['title']} "
+                  f"({duplicate['slug']}, {duplicate['similarity_score']:.4f})")
+
+    if report['merged']:
+        print(f"\n✅ Merged library now has {report['templates_after_merge']} templates")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nReport written to: {args.output}")
+
+    print("\n" + "=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark JSON load/dump on the history, metrics and template files
+
+Compares the previous persistence format (stdlib json, indent=2) against the
+serializer backends in services/serialization.py.
+
+Usage:
+    python benchmarks/bench_serialization.py            # real data files
+    python benchmarks/bench_serialization.py --scale 50 # data replicated 50x
+"""
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from services import serialization  # noqa: E402
+
+DATA_FILES = {
+    "history": BACKEND_DIR / "data" / "debate_history.json",
+    "metrics": BACKEND_DIR / "data" / "debate_metrics.json",
+    "templates": BACKEND_DIR / "data" / "debate_templates.json",
+}
+
+
+def scale_data(data, factor: int):
+    """Replicate list payloads to approximate a larger production file"""
+    if isinstance(data, list):
+        return data * factor
+    if isinstance(data, dict) and isinstance(data.get("debates"), list):
+        return {**data, "debates": data["debates"] * factor}
+    return data
+
+
+def best_of(fn, number: int, repeat: int) -> float:
+    """Best per-call time in milliseconds"""
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1000
+
+
+def bench_file(name: str, data, number: int, repeat: int) -> list:
+    rows = []
+
+    legacy = json.dumps(data, indent=2, ensure_ascii=False, default=str).encode("utf-8")
+    rows.append({
+        "file": name,
+        "format": "json indent=2 (legacy)",
+        "bytes": len(legacy),
+        "dump_ms": best_of(lambda: json.dumps(data, indent=2, ensure_ascii=False, default=str), number, repeat),
+        "load_ms": best_of(lambda: json.loads(legacy), number, repeat),
+    })
+
+    for backend in serialization.available_backends():
+        serialization.set_backend(backend)
+        for pretty in (False, True):
+            encoded = serialization.dumps(data, pretty=pretty)
+            rows.append({
+                "file": name,
+                "format": f"{backend} {'pretty' if pretty else 'compact'}",
+                "bytes": len(encoded),
+                "dump_ms": best_of(lambda: serialization.dumps(data, pretty=pretty), number, repeat),
+                "load_ms": best_of(lambda: serialization.loads(encoded), number, repeat),
+            })
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON persistence backends")
+    parser.add_argument("--scale", type=int, default=1, help="Replicate each file's records N times")
+    parser.add_argument("--number", type=int, default=50, help="Calls per timing run")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing runs (best is reported)")
+    args = parser.parse_args()
+
+    original_backend = serialization.serializer.name
+    rows = []
+    for name, path in DATA_FILES.items():
+        if not path.exists():
+            print(f"Skipping {name}: {path} not found")
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            data = scale_data(json.load(f), args.scale)
+        rows.extend(bench_file(name, data, args.number, args.repeat))
+    serialization.set_backend(original_backend)
+
+    print(f"{'file':<10} {'format':<26} {'bytes':>10} {'dump ms':>9} {'load ms':>9}")
+    print("-" * 68)
+    for row in rows:
+        print(f"{row['file']:<10} {row['format']:<26} {row['bytes']:>10} "
+              f"{row['dump_ms']:>9.3f} {row['load_ms']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Benchmark backend cold start
+
+Each run starts a fresh interpreter (in an empty data directory), imports
+main, runs the startup handlers and sends the first requests, reporting:
+
+    process    interpreter launch until the app could serve (what a
+               platform health check waits for)
+    import     `import main` alone
+    /health    first request that needs no services
+    /api/agents, /api/templates
+               first requests to storage-backed services (built lazily
+               unless the startup preload got there first)
+
+Usage:
+    python benchmarks/bench_startup.py                     # mock provider, 5 runs
+    python benchmarks/bench_startup.py --provider groq     # Groq configured (no network needed)
+    python benchmarks/bench_startup.py --preload           # background preload on, as in production
+    python benchmarks/bench_startup.py --importtime 15     # slowest imports under main
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {backend!r})
+import main
+t_import = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    t_ready = time.perf_counter()
+    print("READY", flush=True)
+    timings = {{"import": (t_import - t0) * 1000}}
+    for path in ("/health", "/api/agents", "/api/templates"):
+        start = time.perf_counter()
+        client.get(path)
+        timings[path] = (time.perf_counter() - start) * 1000
+    timings["startup"] = (t_ready - t_import) * 1000
+    # A lazy_import()ed module sits in sys.modules before it has been executed
+    loaded = [m for m in ("numpy", "groq", "requests")
+              if m in sys.modules and type(sys.modules[m]).__name__ != "_LazyModule"]
+    print(json.dumps({{"timings": timings, "modules": loaded}}), flush=True)
+"""
+
+METRICS = ("process", "import", "startup", "/health", "/api/agents", "/api/templates")
+
+
+def child_env(provider: str, preload: bool) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "AI_PROVIDER": provider,
+        "SERVICE_PRELOAD": "1" if preload else "0",
+        "OLLAMA_WARMUP": "0",
+        "LOG_LEVEL": "WARNING",
+    })
+    if provider == "groq":
+        env.setdefault("GROQ_API_KEY", "bench-placeholder")
+    return env
+
+
+def run_once(provider: str, preload: bool) -> dict:
+    """One cold start in a fresh interpreter and data directory"""
+    workdir = Path(tempfile.mkdtemp(prefix="mm-startup-"))
+    try:
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-c", CHILD.format(backend=str(BACKEND_DIR))],
+            cwd=workdir, env=child_env(provider, preload),
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+        process_ms = None
+        result = None
+        for line in proc.stdout:
+            line = line.strip()
+            if line == "READY":
+                process_ms = (time.perf_counter() - start) * 1000
+            elif line.startswith("{"):
+                result = json.loads(line)
+        proc.wait()
+        if proc.returncode != 0 or result is None:
+            raise RuntimeError(f"Benchmark child exited with {proc.returncode}")
+        result["timings"]["process"] = process_ms
+        return result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def import_profile(provider: str, top: int) -> list:
+    """Slowest modules imported (directly or not) while importing main, by cumulative time"""
+    workdir = Path(tempfile.mkdtemp(prefix="mm-startup-"))
+    try:
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import sys; sys.path.insert(0, {str(BACKEND_DIR)!r}); import main"],
+            cwd=workdir, env=child_env(provider, False), capture_output=True, text=True
+        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        fields = line[len("import time:"):].split("|")
+        if not line.startswith("import time:") or len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        self_us, cumulative_us, name = (f.strip() for f in fields)
+        rows.append({"module": name, "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    rows.sort(key=lambda r: r["cumulative_ms"], reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark backend cold start")
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts to time (median is reported)")
+    parser.add_argument("--provider", default="mock", choices=["mock", "groq", "ollama"],
+                        help="AI_PROVIDER for the child processes")
+    parser.add_argument("--preload", action="store_true",
+                        help="Leave the background service preload on (first requests may then find "
+                             "services already built)")
+    parser.add_argument("--importtime", type=int, default=0, metavar="N",
+                        help="Also list the N slowest imports under main")
+    parser.add_argument("--output", default=None, help="Also write the raw runs as JSON here")
+    args = parser.parse_args()
+
+    runs = [run_once(args.provider, args.preload) for _ in range(args.runs)]
+
+    print(f"Cold start, AI_PROVIDER={args.provider}, preload {'on' if args.preload else 'off'}, {args.runs} runs")
+    print(f"Heavy modules loaded by the end of a run: {', '.join(runs[-1]['modules']) or 'none'}")
+    print()
+    print(f"{'phase':<16} {'median ms':>10} {'min ms':>9} {'max ms':>9}")
+    print("-" * 47)
+    for metric in METRICS:
+        values = [r["timings"][metric] for r in runs]
+        print(f"{metric:<16} {statistics.median(values):>10.1f} {min(values):>9.1f} {max(values):>9.1f}")
+
+    if args.importtime:
+        print()
+        print(f"{'module':<48} {'cumulative ms':>14} {'self ms':>9}")
+        print("-" * 73)
+        for row in import_profile(args.provider, args.importtime):
+            print(f"{row['module']:<48} {row['cumulative_ms']:>14.1f} {row['self_ms']:>9.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"provider": args.provider, "preload": args.preload, "runs": runs}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test for the FastAPI backend
+
+Drives complete debate flows (openings -> N continues -> judge -> history
+list and fetch -> template listing) at a fixed concurrency and reports
+throughput, p50/p95/p99 latency per endpoint and time spent in the JSON
+storage layer. By default the app runs in-process against the mock LLM
+provider (AI_PROVIDER=mock) with its data files in a temporary directory,
+so runs are reproducible and never touch data/ or a real model.
+
+A run with failed flows or endpoint errors always fails (exit status 1)
+and can't be saved as the baseline.
+
+Usage:
+    python benchmarks/load_test.py                            # compare against baseline.json
+    python benchmarks/load_test.py --flows 200 --concurrency 16
+    python benchmarks/load_test.py --save-baseline            # record a new baseline
+    python benchmarks/load_test.py --url http://localhost:8000 # drive a running server
+    python benchmarks/load_test.py --record traffic.jsonl.gz  # capture the LLM calls
+    python benchmarks/load_test.py --replay traffic.jsonl.gz  # rerun recorded LLM traffic
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+TEMPLATES_FILE = BACKEND_DIR / "data" / "debate_templates.json"
+
+# Modules whose read_json/write_json calls count as storage time
+STORAGE_MODULES = ("agent_service", "debate_history_service", "metrics_service", "template_store")
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class Recorder:
+    """Thread-safe latency samples, in milliseconds, keyed by endpoint or storage call"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def add(self, key: str, ms: float, ok: bool = True):
+        with self._lock:
+            self.samples[key].append(ms)
+            if not ok:
+                self.errors[key] += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            items = {k: sorted(v) for k, v in self.samples.items()}
+            errors = dict(self.errors)
+        return {
+            key: {
+                "count": len(values),
+                "errors": errors.get(key, 0),
+                "p50_ms": round(percentile(values, 50), 2),
+                "p95_ms": round(percentile(values, 95), 2),
+                "p99_ms": round(percentile(values, 99), 2),
+                "total_ms": round(sum(values), 1),
+            }
+            for key, values in sorted(items.items())
+        }
+
+
+def instrument_storage(recorder: Recorder):
+    """Time every JSON read/write the services make"""
+    import importlib
+
+    def timed(fn, key):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                recorder.add(key, (time.perf_counter() - start) * 1000)
+        return wrapper
+
+    for name in STORAGE_MODULES:
+        module = importlib.import_module(f"services.{name}")
+        for op in ("read_json", "write_json"):
+            if hasattr(module, op):
+                setattr(module, op, timed(getattr(module, op), f"{name}.{op}"))
+
+
+def load_app(args, data_dir: Path):
+    """Import main against the mock (or replay) provider with its storage rooted in data_dir"""
+    os.environ.update({
+        "AI_PROVIDER": "replay" if args.replay else "mock",
+        "MOCK_LLM_SEED": str(args.seed),
+        "MOCK_LLM_LATENCY_DIST": args.llm_dist,
+        "MOCK_LLM_MEDIAN_MS": str(args.llm_median_ms),
+        "MOCK_LLM_TOKENS_PER_S": str(args.llm_tokens_per_s),
+        "MOCK_LLM_ERROR_RATE": str(args.llm_error_rate),
+        "OLLAMA_WARMUP": "0",
+    })
+    if args.replay:
+        os.environ["LLM_REPLAY_PATH"] = str(Path(args.replay).resolve())
+        os.environ["LLM_REPLAY_TIME_SCALE"] = str(args.replay_time_scale)
+    if args.record:
+        os.environ["LLM_RECORD_PATH"] = str(Path(args.record).resolve())
+    # Services resolve their storage relative to the working directory
+    (data_dir / "data").mkdir(parents=True, exist_ok=True)
+    os.chdir(data_dir)
+    sys.path.insert(0, str(BACKEND_DIR))
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main
+    return main
+
+
+@contextlib.contextmanager
+def quiet_logging():
+    """
+    Hold back INFO and lower records (the app's own, and httpx's line per
+    TestClient request) while the run is in progress; warnings still show.
+    """
+    logging.disable(logging.INFO)
+    try:
+        yield
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+def make_dilemmas() -> list:
+    with open(TEMPLATES_FILE, "r", encoding="utf-8") as f:
+        templates = json.load(f)
+    return [{
+        "title": t["title"],
+        "A": t["option_a"],
+        "B": t["option_b"],
+        "constraints": t.get("context", "")
+    } for t in templates]
+
+
+class Driver:
+    """Runs debate flows through one HTTP client per worker thread"""
+
+    def __init__(self, client_factory, recorder: Recorder, rounds: int, judge_mode: str):
+        self.client_factory = client_factory
+        self.recorder = recorder
+        self.rounds = rounds
+        self.judge_mode = judge_mode
+        self._local = threading.local()
+
+    @property
+    def client(self):
+        if not hasattr(self._local, "client"):
+            self._local.client = self.client_factory()
+        return self._local.client
+
+    def call(self, key: str, method: str, path: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.client.request(method, path, **kwargs)
+            ok = response.status_code < 400
+        except Exception:
+            response, ok = None, False
+        self.recorder.add(key, (time.perf_counter() - start) * 1000, ok)
+        if not ok:
+            raise RuntimeError(f"{method} {path} failed")
+        return response.json() if response.content else None
+
+    def run_flow(self, dilemma: dict):
+        turns = self.call("POST /openings", "POST", "/openings", json=dilemma)["turns"]
+        for _ in range(self.rounds):
+            new = self.call("POST /continue", "POST", "/continue", params={"judge_mode": self.judge_mode},
+                            json={"dilemma": dilemma, "turns": turns})["turns"]
+            turns = turns + new
+        self.call("POST /judge", "POST", "/judge", params={"mode": self.judge_mode},
+                  json={"dilemma": dilemma, "turns": turns})
+
+        history = self.call("GET /api/debates", "GET", "/api/debates", params={"limit": 20})
+        if history and history.get("debates"):
+            debate_id = history["debates"][0]["id"]
+            self.call("GET /api/debates/{id}", "GET", f"/api/debates/{debate_id}")
+        self.call("GET /api/templates", "GET", "/api/templates")
+
+
+def run(args) -> dict:
+    recorder = Recorder()
+    storage = Recorder()
+    tmp = None
+    cwd = os.getcwd()
+    app_module = None
+
+    if args.url:
+        import requests
+
+        class Session(requests.Session):
+            def request(self, method, url, *a, **kw):
+                return super().request(method, args.url.rstrip("/") + url, *a, **kw)
+
+        client_factory = Session
+    else:
+        from fastapi.testclient import TestClient
+        tmp = Path(tempfile.mkdtemp(prefix="mm-loadtest-"))
+        app_module = load_app(args, tmp)
+        instrument_storage(storage)
+        client_factory = lambda: TestClient(app_module.app)
+
+    driver = Driver(client_factory, recorder, args.rounds, args.judge_mode)
+    rng = random.Random(args.seed)
+    dilemmas = make_dilemmas()
+    flows = [rng.choice(dilemmas) for _ in range(args.flows)]
+
+    quiet = io.StringIO() if not args.verbose else None
+    failed = 0
+    try:
+        with contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext(), \
+                quiet_logging() if quiet else contextlib.nullcontext():
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                futures = [pool.submit(driver.run_flow, d) for d in flows]
+                for future in as_completed(futures):
+                    if future.exception() is not None:
+                        failed += 1
+            elapsed = time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+        if app_module is not None and app_module.llm_recorder is not None:
+            app_module.llm_recorder.close()
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    endpoints = recorder.summary()
+    requests_total = sum(e["count"] for e in endpoints.values())
+    storage_summary = storage.summary()
+    replay = None
+    if args.replay and app_module is not None:
+        replay = app_module.llm_service.providers[0].members[0].snapshot()
+    return {
+        "config": {
+            "flows": args.flows,
+            "concurrency": args.concurrency,
+            "rounds": args.rounds,
+            "judge_mode": args.judge_mode,
+            "llm_dist": args.llm_dist,
+            "llm_median_ms": args.llm_median_ms,
+            "llm_tokens_per_s": args.llm_tokens_per_s,
+            "llm_error_rate": args.llm_error_rate,
+            "seed": args.seed,
+            "target": args.url or "in-process",
+            "replay": args.replay,
+        },
+        "elapsed_s": round(elapsed, 3),
+        "flows_completed": args.flows - failed,
+        "flows_failed": failed,
+        "throughput": {
+            "flows_per_s": round((args.flows - failed) / elapsed, 3),
+            "requests_per_s": round(requests_total / elapsed, 3),
+        },
+        "endpoints": endpoints,
+        "storage": {
+            "total_ms": round(sum(s["total_ms"] for s in storage_summary.values()), 1),
+            "calls": storage_summary,
+        },
+        "replay": replay,
+    }
+
+
+def failures(result: dict) -> list:
+    """Failed flows and endpoint errors; a run with any is broken, whatever its timings"""
+    problems = []
+    if result["flows_failed"]:
+        problems.append(f"{result['flows_failed']} of {result['config']['flows']} flows failed")
+    for key, stats in result["endpoints"].items():
+        if stats["errors"]:
+            problems.append(f"{key}: {stats['errors']} of {stats['count']} requests failed")
+    return problems
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    """List regressions beyond `tolerance` (e.g. 0.2 = 20%) against the baseline"""
+    regressions = []
+    if baseline.get("config") != result["config"]:
+        print("Note: baseline was recorded with a different configuration")
+
+    old = baseline["throughput"]["flows_per_s"]
+    new = result["throughput"]["flows_per_s"]
+    if old and new < old * (1 - tolerance):
+        regressions.append(f"throughput {new:.2f} flows/s vs baseline {old:.2f}")
+
+    for key, stats in result["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(key)
+        if not base:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            if base[metric] and stats[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f"{key} {metric} {stats[metric]:.1f} vs baseline {base[metric]:.1f}")
+
+    old_storage = baseline.get("storage", {}).get("total_ms")
+    new_storage = result["storage"]["total_ms"]
+    if old_storage and new_storage > old_storage * (1 + tolerance):
+        regressions.append(f"storage time {new_storage:.0f}ms vs baseline {old_storage:.0f}ms")
+    return regressions
+
+
+def print_report(result: dict, baseline: dict = None):
+    cfg = result["config"]
+    print(f"{result['flows_completed']}/{cfg['flows']} flows in {result['elapsed_s']:.2f}s "
+          f"(concurrency {cfg['concurrency']}, {cfg['rounds']} rounds, judge={cfg['judge_mode']}, "
+          f"target {cfg['target']})")
+    print(f"Throughput: {result['throughput']['flows_per_s']:.2f} flows/s, "
+          f"{result['throughput']['requests_per_s']:.2f} requests/s")
+    if result.get("replay"):
+        r = result["replay"]
+        print(f"Replay: {r['exact']} exact, {r['fallback']} fallback, {r['miss']} missed "
+              f"of {r['recorded']} recorded calls")
+    print()
+    print(f"{'endpoint':<24} {'count':>6} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'base p95':>9}")
+    print("-" * 76)
+    for key, s in result["endpoints"].items():
+        base = (baseline or {}).get("endpoints", {}).get(key, {}).get("p95_ms")
+        base_text = f"{base:>9.1f}" if base is not None else f"{'-':>9}"
+        print(f"{key:<24} {s['count']:>6} {s['errors']:>4} {s['p50_ms']:>9.1f} "
+              f"{s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f} {base_text}")
+
+    if result["storage"]["calls"]:
+        print()
+        print(f"Storage layer: {result['storage']['total_ms']:.0f}ms total")
+        for key, s in result["storage"]["calls"].items():
+            print(f"  {key:<38} {s['count']:>6} calls  p50 {s['p50_ms']:>7.2f}ms  p95 {s['p95_ms']:>7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the debate API with the mock LLM")
+    parser.add_argument("--flows", type=int, default=50, help="Debate flows to run")
+    parser.add_argument("--concurrency", type=int, default=8, help="Flows run in parallel")
+    parser.add_argument("--rounds", type=int, default=3, help="/continue calls per flow")
+    parser.add_argument("--judge-mode", default="full", choices=["full", "incremental", "ensemble"],
+                        help="mode passed to /judge")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for dilemma choice and the mock LLM")
+    parser.add_argument("--llm-dist", default="lognormal",
+                        choices=["fixed", "lognormal", "exponential", "uniform"],
+                        help="Mock time-to-first-token distribution")
+    parser.add_argument("--llm-median-ms", type=float, default=50, help="Mock median time to first token")
+    parser.add_argument("--llm-tokens-per-s", type=float, default=2000, help="Mock generation speed")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Share of mock calls that fail")
+    parser.add_argument("--record", default=None, help="Record the LLM traffic to this archive")
+    parser.add_argument("--replay", default=None,
+                        help="Serve LLM calls from a recorded archive instead of the mock")
+    parser.add_argument("--replay-time-scale", type=float, default=1.0,
+                        help="Multiplier on recorded latencies (0 = no delay)")
+    parser.add_argument("--url", default=None,
+                        help="Drive a running server instead (storage time is not measured)")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH), help="Baseline results file")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed slowdown versus the baseline before flagging a regression")
+    parser.add_argument("--strict", action="store_true", help="Exit non-zero on regressions")
+    parser.add_argument("--output", default=None, help="Also write the full JSON results here")
+    parser.add_argument("--verbose", action="store_true", help="Show the app's own output")
+    args = parser.parse_args()
+
+    result = run(args)
+
+    baseline = None
+    baseline_path = Path(args.baseline)
+    if baseline_path.exists() and not args.save_baseline:
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print_report(result, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    problems = failures(result)
+    if problems:
+        print()
+        print("Errors:")
+        for line in problems:
+            print(f"  {line}")
+        if args.save_baseline:
+            print("Not saving a baseline from a run with errors")
+        sys.exit(1)
+
+    if args.save_baseline:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nBaseline written to {baseline_path}")
+        return
+
+    if baseline is not None:
+        regressions = compare(result, baseline, args.tolerance)
+        print()
+        if regressions:
+            print(f"Regressions (>{args.tolerance:.0%} vs baseline):")
+            for line in regressions:
+                print(f"  {line}")
+            if args.strict:
+                sys.exit(1)
+        else:
+            print(f"No regressions beyond {args.tolerance:.0%} of baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,78 +1,225 @@
 # backend/main.py
 import json
-import requests
+import logging
+import threading
+from functools import partial
 from typing import List, Optional
 from pathlib import Path
-from fastapi import FastAPI, HTTPException
+from fastapi import BackgroundTasks, FastAPI, Header, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel, Field
 import re
 
 # -------------------- AI PROVIDER CONFIG --------------------
 import os
 from dotenv import load_dotenv
-from groq import Groq
 
 # Load environment variables from .env file
 load_dotenv()
 
 # Configuration
-AI_PROVIDER = os.getenv("AI_PROVIDER", "groq")  # "groq" or "ollama"
+AI_PROVIDER = os.getenv("AI_PROVIDER", "groq")  # "groq", "ollama", "mock" or "replay"
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
 OLLAMA_API_KEY = os.getenv("OLLAMA_API_KEY")
 OLLAMA_MODEL = "qwen2.5:7b-instruct-q4_K_M"
 OLLAMA_API = "http://localhost:11434/api/generate"
+JUDGE_ENSEMBLE_K = int(os.getenv("JUDGE_ENSEMBLE_K", "3"))
+# Longest /judge?mode=ensemble waits for its quorum; clients may ask for less
+JUDGE_ENSEMBLE_TIMEOUT_S = float(os.getenv("JUDGE_ENSEMBLE_TIMEOUT_S", "60"))
+
+# Services and clients that are slow to build are wrapped in LazyService and
+# built on first use, or by the background preload once the app is up
+from services.lazy import LazyService, preload
+
+def _groq_client(api_key: str):
+    # The SDK takes a few hundred milliseconds to import
+    from groq import Groq
+    return Groq(api_key=api_key)
 
 # Initialize Groq client
-groq_client = Groq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
+groq_client = LazyService(partial(_groq_client, GROQ_API_KEY), name="groq_client") if GROQ_API_KEY else None
+
+# Provider layer: Groq first (when configured), Ollama as local/fallback
+from services.rate_limiter import RateLimiter
+from services.token_budget import BudgetController
+from services.telemetry import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsRegistry
+from services.tracing import TracingMiddleware, tracer
+from services.logging_config import configure_logging, parse_levels, parse_sample_rates
+from services.profiling import ProfilingMiddleware, profiled_route, profiler
+
+# Request tracing: recent traces in memory for /api/traces, slow ones optionally on disk
+tracer.configure(
+    enabled=os.getenv("TRACING", "1").lower() not in ("0", "false", "no"),
+    capacity=int(os.getenv("TRACE_BUFFER_SIZE", "200")),
+    path=os.getenv("TRACE_FILE") or None,
+    slow_ms=float(os.getenv("TRACE_SLOW_MS", "1000"))
+)
 
-def call_ollama(system_prompt: str, user_prompt: str, num_predict: int = 400, temp: float = 0.7, top_p: float = 0.9, repeat_penalty: float = 1.1) -> str:
-    """Unified AI call function - supports both Groq and Ollama"""
-    
-    if AI_PROVIDER == "groq" and groq_client:
-        # Use Groq API
-        try:
-            chat_completion = groq_client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                model=GROQ_MODEL,
-                temperature=temp,
-                max_tokens=num_predict,
-                top_p=top_p,
-            )
-            return chat_completion.choices[0].message.content.strip()
-        except Exception as e:
-            print(f"Groq API error: {e}, falling back to Ollama")
-            # Fall back to Ollama if Groq fails
-    
-    # Use Ollama (local or fallback)
-    payload = {
-        "model": OLLAMA_MODEL,
-        "prompt": f"<|system|>\n{system_prompt}\n<|user|>\n{user_prompt}\n",
-        "options": {
-            "temperature": temp,
-            "top_p": top_p,
-            "repeat_penalty": repeat_penalty,
-            "num_predict": num_predict
-        },
-        "stream": False,
-    }
-    
-    headers = {"Content-Type": "application/json"}
-    if OLLAMA_API_KEY:
-        headers["Authorization"] = f"Bearer {OLLAMA_API_KEY}"
-   
-    r = requests.post(OLLAMA_API, json=payload, headers=headers, timeout=240)
-    r.raise_for_status()
-    return r.json().get("response", "").strip()
+# Logging: records are queued and written by a background thread; LOG_LEVELS
+# sets per-module levels ("services.llm_service=DEBUG,main=INFO") and
+# LOG_SAMPLE_RATES thins out noisy levels ("DEBUG=0.05")
+log_handle = configure_logging(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    levels=parse_levels(os.getenv("LOG_LEVELS", "")),
+    fmt=os.getenv("LOG_FORMAT", "text"),
+    sample_rates=parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", "")),
+    max_field_chars=int(os.getenv("LOG_MAX_FIELD_CHARS", "500")),
+    queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+    trace_id=tracer.current_trace_id
+)
+log = logging.getLogger(__name__)
+
+# On-demand profiling: X-Profile: cprofile|sample on a request, or a random
+# PROFILE_SAMPLE_RATE of requests; results on /api/profiles. Requesting a
+# profile and reading results (or traces and LLM stats) need X-Profile-Token
+# to match PROFILE_TOKEN; with PROFILE_TOKEN unset only sampling is available
+profiler.configure(
+    enabled=os.getenv("PROFILING", "1").lower() not in ("0", "false", "no"),
+    sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+    mode=os.getenv("PROFILE_MODE", "sample"),
+    interval_ms=float(os.getenv("PROFILE_INTERVAL_MS", "5")),
+    top_n=int(os.getenv("PROFILE_TOP_N", "25")),
+    capacity=int(os.getenv("PROFILE_BUFFER_SIZE", "50")),
+    token=os.getenv("PROFILE_TOKEN") or None,
+    trace_id=tracer.current_trace_id
+)
+from services.llm_replay import ReplayProvider, TrafficRecorder
+from services.llm_service import (
+    LLMService, LLMMetrics, GroqProvider, OllamaProvider, ProviderPool, CircuitBreaker, CancelToken,
+    AGENT_TURN_SCHEMA, VERDICT_SCHEMA, agent_group, agent_turn_schema
+)
 
+# Prometheus scrape registry served on /metrics (debate statistics stay on /api/metrics)
+metrics_registry = MetricsRegistry()
+metrics_registry.gauge(
+    "log_records_discarded", "Log records not written, by reason (queue full or sampled out)", ["reason"],
+    callback=lambda: [(("queue_full",), log_handle.handler.dropped), (("sampled",), log_handle.sampler.sampled_out)]
+)
+
+LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "1").lower() not in ("0", "false", "no")
+
+# Client-side Groq quota scheduler (one per key/model); GROQ_RPM=0 disables it
+GROQ_RPM = int(os.getenv("GROQ_RPM", "30"))
+GROQ_TPM = int(os.getenv("GROQ_TPM", "12000"))
+
+# Provider pools: GROQ_API_KEYS / GROQ_MODELS / OLLAMA_HOSTS are comma-separated
+# and default to the single-key, single-model, local-host setup
+def _env_list(name: str, default: str) -> List[str]:
+    return [x.strip() for x in os.getenv(name, default or "").split(",") if x.strip()]
+
+GROQ_API_KEYS = _env_list("GROQ_API_KEYS", GROQ_API_KEY)
+GROQ_MODELS = _env_list("GROQ_MODELS", GROQ_MODEL)
+OLLAMA_HOSTS = _env_list("OLLAMA_HOSTS", OLLAMA_API.rsplit("/api/", 1)[0])
+# /api/chat keeps system prompts as a stable, cacheable prefix; keep_alive holds the model in memory
+OLLAMA_CHAT_MODE = os.getenv("OLLAMA_CHAT_MODE", "1").lower() not in ("0", "false", "no")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_WARMUP = os.getenv("OLLAMA_WARMUP", "1" if AI_PROVIDER == "ollama" else "0").lower() not in ("0", "false", "no")
+
+def _breaker():
+    return CircuitBreaker(
+        error_rate=float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5")),
+        window_seconds=float(os.getenv("LLM_BREAKER_WINDOW_S", "30")),
+        min_calls=int(os.getenv("LLM_BREAKER_MIN_CALLS", "5")),
+        open_seconds=float(os.getenv("LLM_BREAKER_OPEN_S", "15"))
+    )
+
+def _mock_llm():
+    # Offline stand-in for load tests; see services/mock_llm.py
+    from services.mock_llm import MockLLM
+    return MockLLM(
+        seed=int(os.getenv("MOCK_LLM_SEED", "0")),
+        latency_dist=os.getenv("MOCK_LLM_LATENCY_DIST", "lognormal"),
+        median_ms=float(os.getenv("MOCK_LLM_MEDIAN_MS", "300")),
+        sigma=float(os.getenv("MOCK_LLM_SIGMA", "0.5")),
+        tokens_per_s=float(os.getenv("MOCK_LLM_TOKENS_PER_S", "200")),
+        error_rate=float(os.getenv("MOCK_LLM_ERROR_RATE", "0")),
+        rate_limit_rate=float(os.getenv("MOCK_LLM_RATE_LIMIT_RATE", "0")),
+        malformed_rate=float(os.getenv("MOCK_LLM_MALFORMED_RATE", "0"))
+    )
+
+# Record LLM traffic (LLM_RECORD_PATH) and serve it back with AI_PROVIDER=replay;
+# see services/llm_replay.py
+LLM_RECORD_PATH = os.getenv("LLM_RECORD_PATH")
+LLM_REPLAY_PATH = os.getenv("LLM_REPLAY_PATH", LLM_RECORD_PATH)
+OFFLINE_PROVIDER = AI_PROVIDER in ("mock", "replay")
+
+_providers = []
+if AI_PROVIDER == "mock":
+    from services.mock_llm import MockProvider
+    _providers.append(ProviderPool("mock", [MockProvider(_mock_llm())], breaker_factory=_breaker))
+elif AI_PROVIDER == "replay":
+    if not LLM_REPLAY_PATH:
+        raise RuntimeError("AI_PROVIDER=replay needs LLM_REPLAY_PATH")
+    _providers.append(ProviderPool("replay", [ReplayProvider.from_archive(
+        LLM_REPLAY_PATH,
+        time_scale=float(os.getenv("LLM_REPLAY_TIME_SCALE", "1")),
+        strict=os.getenv("LLM_REPLAY_STRICT", "0").lower() not in ("0", "false", "no")
+    )], breaker_factory=_breaker))
+elif AI_PROVIDER == "groq" and GROQ_API_KEYS:
+    _groq_members = []
+    for i, key in enumerate(GROQ_API_KEYS):
+        client = (groq_client if key == GROQ_API_KEY and groq_client
+                  else LazyService(partial(_groq_client, key), name=f"groq_client[{i}]"))
+        for model in GROQ_MODELS:
+            _groq_members.append(GroqProvider(
+                client, model,
+                limiter=RateLimiter(rpm=GROQ_RPM, tpm=GROQ_TPM) if GROQ_RPM > 0 and GROQ_TPM > 0 else None,
+                queue_timeout=float(os.getenv("GROQ_QUEUE_TIMEOUT_S", "20")),
+                name=f"groq[{i}]:{model}"
+            ))
+    _providers.append(ProviderPool("groq", _groq_members, breaker_factory=_breaker))
+if not OFFLINE_PROVIDER:
+    _providers.append(ProviderPool("ollama", [
+        OllamaProvider(host, OLLAMA_MODEL, api_key=OLLAMA_API_KEY, name=f"ollama@{host}",
+                       use_chat=OLLAMA_CHAT_MODE, keep_alive=OLLAMA_KEEP_ALIVE or None)
+        for host in OLLAMA_HOSTS
+    ], breaker_factory=_breaker))
+
+llm_service = LLMService(
+    _providers,
+    structured_output=LLM_STRUCTURED_OUTPUT,
+    hedge=os.getenv("LLM_HEDGE", "1").lower() not in ("0", "false", "no"),
+    hedge_percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "95")),
+    hedge_min_delay=float(os.getenv("LLM_HEDGE_MIN_MS", "500")) / 1000,
+    hedge_max_delay=float(os.getenv("LLM_HEDGE_MAX_MS", "8000")) / 1000,
+    breaker_factory=_breaker,
+    # Identical concurrent prompts share one call; endpoints wanting diverse samples stay out
+    coalesce_endpoints=_env_list("LLM_COALESCE_ENDPOINTS", "openings,agent"),
+    # Learn max_tokens per endpoint/agent; callers' num_predict values become ceilings
+    budgets=BudgetController(
+        percentile=float(os.getenv("LLM_BUDGET_PERCENTILE", "95")),
+        margin=float(os.getenv("LLM_BUDGET_MARGIN", "1.25"))
+    ) if os.getenv("LLM_ADAPTIVE_BUDGET", "1").lower() not in ("0", "false", "no") else None,
+    metrics=LLMMetrics(metrics_registry)
+)
+llm_recorder = TrafficRecorder(LLM_RECORD_PATH) if LLM_RECORD_PATH else None
+
+def call_ollama(system_prompt: str, user_prompt: str, num_predict: int = 400, temp: float = 0.7, top_p: float = 0.9, repeat_penalty: float = 1.1,
+                schema: Optional[dict] = None, endpoint: str = "default", priority: Optional[int] = None,
+                budget_key: Optional[str] = None, stop_at_brace: bool = False,
+                cancel: Optional[CancelToken] = None, provider: Optional[str] = None,
+                model: Optional[str] = None) -> str:
+    """Unified AI call function - supports both Groq and Ollama"""
+    generate = partial(llm_service.generate, system_prompt, user_prompt, num_predict=num_predict, temp=temp,
+                       top_p=top_p, repeat_penalty=repeat_penalty, schema=schema, endpoint=endpoint,
+                       priority=priority, budget_key=budget_key, stop_at_brace=stop_at_brace, cancel=cancel,
+                       provider=provider, model=model)
+    if llm_recorder is None:
+        return generate()
+    return llm_recorder.call(
+        generate, endpoint, system_prompt, user_prompt,
+        # The schema providers actually see, so replays match under the same setting
+        schema=schema if llm_service.structured_output else None,
+        params={"num_predict": num_predict, "temp": temp, "top_p": top_p, "repeat_penalty": repeat_penalty,
+                "budget_key": budget_key, "stop_at_brace": stop_at_brace}
+    )
 
 
 import re
 
+@tracer.traced("parse.clamp_json")
 def clamp_json(s: str, fallback: dict) -> dict:
     """
     Robust JSON extractor:
@@ -200,6 +347,7 @@ class AgentTurn(BaseModel):
 class Transcript(BaseModel):
     dilemma: Dilemma
     turns: List[AgentTurn]
+    session_id: Optional[str] = Field(None, description="Client debate session ID, if any")
 
 # Import custom agent models
 from models.custom_agent import CustomAgent, AgentCreationRequest, AgentUpdateRequest, AgentRating
@@ -207,19 +355,66 @@ from services.agent_service import AgentService
 from services.enhancement_service import EnhancementService
 from services.metrics_service import MetricsService
 from services.debate_history_service import DebateHistoryService
+from services.template_store import TemplateStore
+from services.debate_context_service import DebateContextService
+from services.judge_service import JudgeService
 
-# Import deduplication service
-from services.debate_deduplication_service import DebateDeduplicationService
+# Get the directory where main.py is located
+BASE_DIR = Path(__file__).resolve().parent
+TEMPLATES_PATH = BASE_DIR / "data" / "debate_templates.json"
+
+def _deduplication_service():
+    # Imported here: the embedding service pulls in numpy
+    from services.debate_deduplication_service import DebateDeduplicationService
+    return DebateDeduplicationService(
+        templates_path=str(TEMPLATES_PATH),
+        groq_client=groq_client if not OFFLINE_PROVIDER else None,
+        template_store=template_store
+    )
 
-# Initialize services
-agent_service = AgentService()
-enhancement_service = EnhancementService()
-metrics_service = MetricsService()
-debate_history_service = DebateHistoryService()
-deduplication_service = DebateDeduplicationService(groq_client=groq_client)
+# Initialize services (storage-backed ones on first use)
+agent_service = LazyService(AgentService, name="agent_service")
+enhancement_service = LazyService(partial(EnhancementService, llm=call_ollama), name="enhancement_service")
+metrics_service = LazyService(MetricsService, name="metrics_service")
+debate_history_service = LazyService(DebateHistoryService, name="debate_history_service")
+template_store = TemplateStore(TEMPLATES_PATH)
+deduplication_service = LazyService(_deduplication_service, name="deduplication_service")
+debate_context_service = DebateContextService(llm=partial(call_ollama, endpoint="summary", budget_key="summary"))
+def _ensemble_llms():
+    """One judge callable per configured provider and model, so ensemble members disagree independently"""
+    routes = llm_service.routes()
+    if len(routes) < 2:
+        # A single provider serving a single model (e.g. the mock): members
+        # differ only by temperature, through the normal routed call
+        return [partial(call_ollama, schema=VERDICT_SCHEMA, endpoint="judge_ensemble")]
+    return [partial(call_ollama, schema=VERDICT_SCHEMA, endpoint="judge_ensemble", provider=name, model=model)
+            for name, model in routes]
+
+judge_service = JudgeService(
+    llm=partial(call_ollama, endpoint="judge_incremental"),
+    parse=clamp_json,
+    ensemble_llms=_ensemble_llms()
+)
 
 # -------------------- APP CONFIG --------------------
-app = FastAPI(title="MirrorMinds API")
+# Responses are encoded by the shared serializer: orjson when installed
+# (several times faster), the stdlib json module otherwise
+from services import serialization
+
+
+class SerializedJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return serialization.dumps(content)
+
+
+app = FastAPI(
+    title="MirrorMinds API",
+    default_response_class=SerializedJSONResponse
+)
+# Endpoints run under the request's profiler when one was asked for
+app.router.route_class = profiled_route(profiler)
 
 app.add_middleware(
     CORSMiddleware,
@@ -227,8 +422,40 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Trace-Id", "X-Profile-Id"],
 )
 
+# Inside the tracing middleware so profiles carry the request's trace id
+app.add_middleware(ProfilingMiddleware, profiler=profiler, skip_paths={"/", "/health", "/metrics"},
+                   skip_prefixes=("/api/traces", "/api/profiles"))
+
+# Scrapes, polling and trace queries would crowd real requests out of the trace buffer
+app.add_middleware(TracingMiddleware, tracer=tracer, skip_paths={"/", "/health", "/metrics"},
+                   skip_prefixes=("/api/traces",))
+
+SERVICE_PRELOAD = os.getenv("SERVICE_PRELOAD", "1").lower() not in ("0", "false", "no")
+
+def _preload_services():
+    timings = preload([agent_service, enhancement_service, metrics_service, debate_history_service,
+                       deduplication_service] + ([groq_client] if groq_client is not None else []))
+    log.info("Services preloaded", extra={"seconds": timings})
+
+@app.on_event("startup")
+def preload_services():
+    """Build the lazily constructed services in the background; requests are accepted meanwhile"""
+    if SERVICE_PRELOAD:
+        threading.Thread(target=_preload_services, name="service-preload", daemon=True).start()
+
+@app.on_event("startup")
+def warmup_llm():
+    """Load the Ollama model and prime the agent/judge prompts without blocking startup"""
+    if OLLAMA_WARMUP:
+        threading.Thread(
+            target=llm_service.warmup,
+            args=([DEON_SYS, CONSE_SYS, VIRTUE_SYS, JUDGE_SYS],),
+            daemon=True
+        ).start()
+
 @app.get("/")
 @app.head("/")
 def root():
@@ -310,28 +537,36 @@ def openings(d: Dilemma):
 
     def gen(role: str, sys: str):
         try:
-            raw = call_ollama(sys, base + "\n" + OPENING_INSTRUCT, num_predict=480, temp=0.65)
-            print(f"DEBUG {role} raw response: {raw[:200]}...")  # Debug output
+            raw = call_ollama(sys, base + "\n" + OPENING_INSTRUCT, num_predict=480, temp=0.65,
+                              schema=AGENT_TURN_SCHEMA, endpoint="openings",
+                              budget_key=f"openings:{role}", stop_at_brace=True)
+            log.debug("Agent raw response", extra={"agent": role, "endpoint": "openings", "raw": raw})
             
             j = clamp_json(raw, {"stance": "A", "argument": f"[{role} failed to generate proper response]", "_raw": raw[:200]})
-            print(f"DEBUG {role} parsed JSON: {j}")  # Debug output
+            llm_service.record_parse("openings", "_debug" not in j)
+            log.debug("Agent parsed JSON", extra={"agent": role, "endpoint": "openings", "parsed": j})
             
             # If we got the fallback, try once more with different params
             if j.get("argument") == "—" or "[failed to generate]" in j.get("argument", ""):
-                print(f"DEBUG {role} retrying...")
-                raw2 = call_ollama(sys, base + "\n" + OPENING_INSTRUCT, num_predict=400, temp=0.8)
+                log.info("Agent retrying", extra={"agent": role, "endpoint": "openings"})
+                llm_service.record_retry("openings")
+                raw2 = call_ollama(sys, base + "\n" + OPENING_INSTRUCT, num_predict=400, temp=0.8,
+                                   schema=AGENT_TURN_SCHEMA, endpoint="openings",
+                                   budget_key=f"openings:{role}", stop_at_brace=True)
                 j2 = clamp_json(raw2, j)
                 if j2.get("argument", "—") not in ["—", "-"]:
                     j = j2
             
             return AgentTurn(agent=role, stance=j.get("stance","A"), argument=j.get("argument","—"))
         except Exception as e:
-            print(f"DEBUG {role} exception: {str(e)}")  # Debug output
+            log.warning("Agent turn failed: %s", e, extra={"agent": role, "endpoint": "openings"})
             return AgentTurn(agent=role, stance="A", argument=f"[{role} error: {str(e)[:100]}]")
 
-    return {"turns": [gen("Deon", DEON_SYS).dict(),
-                      gen("Conse", CONSE_SYS).dict(),
-                      gen("Virtue", VIRTUE_SYS).dict()]}
+    turns = []
+    for role, sys in (("Deon", DEON_SYS), ("Conse", CONSE_SYS), ("Virtue", VIRTUE_SYS)):
+        with tracer.span("agent.opening", agent=role):
+            turns.append(gen(role, sys).model_dump())
+    return {"turns": turns}
 
 # New endpoint for single agent response
 @app.post("/agent/{agent_name}")
@@ -343,31 +578,53 @@ def single_agent(agent_name: str, d: Dilemma):
     role = get_agent_display_name(agent_name)
     
     try:
-        raw = call_ollama(sys_prompt, base + "\n" + OPENING_INSTRUCT, num_predict=150, temp=0.65)
-        print(f"DEBUG {role} raw response: {raw[:200]}...")
+        raw = call_ollama(sys_prompt, base + "\n" + OPENING_INSTRUCT, num_predict=150, temp=0.65,
+                          schema=AGENT_TURN_SCHEMA, endpoint="agent",
+                          budget_key=f"agent:{agent_group(role)}", stop_at_brace=True)
+        log.debug("Agent raw response", extra={"agent": role, "endpoint": "agent", "raw": raw})
         
         j = clamp_json(raw, {"stance": "A", "argument": f"[{role} failed to generate proper response]"})
-        print(f"DEBUG {role} parsed JSON: {j}")
+        llm_service.record_parse("agent", "_debug" not in j)
+        log.debug("Agent parsed JSON", extra={"agent": role, "endpoint": "agent", "parsed": j})
         
         if j.get("argument") == "—" or "[failed to generate]" in j.get("argument", ""):
-            print(f"DEBUG {role} retrying...")
-            raw2 = call_ollama(sys_prompt, base + "\n" + OPENING_INSTRUCT, num_predict=150, temp=0.8)
+            log.info("Agent retrying", extra={"agent": role, "endpoint": "agent"})
+            llm_service.record_retry("agent")
+            raw2 = call_ollama(sys_prompt, base + "\n" + OPENING_INSTRUCT, num_predict=150, temp=0.8,
+                               schema=AGENT_TURN_SCHEMA, endpoint="agent",
+                               budget_key=f"agent:{agent_group(role)}", stop_at_brace=True)
             j2 = clamp_json(raw2, j)
             if j2.get("argument", "—") not in ["—", "-"]:
                 j = j2
         
-        return AgentTurn(agent=role, stance=j.get("stance","A"), argument=j.get("argument","—")).dict()
+        return AgentTurn(agent=role, stance=j.get("stance","A"), argument=j.get("argument","—")).model_dump()
     except Exception as e:
-        print(f"DEBUG {role} exception: {str(e)}")
-        return AgentTurn(agent=role, stance="A", argument=f"[{role} error: {str(e)[:100]}]").dict()
+        log.warning("Agent turn failed: %s", e, extra={"agent": role, "endpoint": "agent"})
+        return AgentTurn(agent=role, stance="A", argument=f"[{role} error: {str(e)[:100]}]").model_dump()
 
 @app.post("/continue")
-def continue_round(t: Transcript):
+def continue_round(t: Transcript, background_tasks: BackgroundTasks, judge_mode: str = "full"):
+    """
+    Next round of arguments from every agent in the transcript.
+
+    judge_mode=incremental is for clients that will call /judge?mode=incremental:
+    completed rounds are then scored in the background after responding.
+    Other modes judge the whole transcript at the end, so nothing is scored here.
+    """
     base = mk_base(t.dilemma)
     latest = latest_by_agent(t.turns)
     
     # Get all agent names from the transcript (supports custom agents)
     all_agent_names = list(set(turn.agent for turn in t.turns))
+    
+    # Compact summary of earlier rounds, refreshed once per completed round
+    transcript_dict = t.model_dump()
+    with tracer.span("debate.summary"):
+        debate_summary = debate_context_service.get_summary(transcript_dict, all_agent_names)
+    
+    if judge_mode == "incremental":
+        # Score completed rounds for the incremental judge after responding
+        background_tasks.add_task(judge_service.update_round, transcript_dict, all_agent_names)
 
     def respond(role: str, sys: str = None):
         # Get system prompt if not provided
@@ -379,33 +636,50 @@ def continue_round(t: Transcript):
         # Build a cleaner summary
         opp_lines = []
         for name in opponents:
-            arg_preview = latest[name].argument[:80].replace("\n", " ")
+            arg_preview = " ".join(latest[name].argument.split())[:160]
             opp_lines.append(f"{name}: {arg_preview}...")
 
         summary_for_user = "\n".join(opp_lines) if opp_lines else "No opponents to address."
+        context = f"Debate so far: {debate_summary}\n\n" if debate_summary else ""
+
+        if llm_service.structured_output and opponents:
+            json_hint = 'JSON: {"stance":"A or B","opponent":"Name","argument":"Name, your brief response..."}'
+        else:
+            json_hint = 'JSON: {"stance":"A or B","argument":"Name, your brief response..."}'
 
         # Shorter, more direct prompt
         prompt = (
-            f"You are {role}. Opponents said:\n{summary_for_user}\n\n"
+            f"You are {role}. {context}Opponents said:\n{summary_for_user}\n\n"
             f"Pick ONE opponent ({', '.join(opponents)}) and respond in 2-3 sentences.\n"
             f"Start with their name + comma. Be direct and concise.\n"
-            'JSON: {"stance":"A or B","argument":"Name, your brief response..."}'
+            + json_hint
         )
 
         # first try
-        raw = call_ollama(sys, prompt, num_predict=200, temp=0.65)
+        raw = call_ollama(sys, prompt, num_predict=200, temp=0.65,
+                          schema=agent_turn_schema(opponents), endpoint="continue",
+                          budget_key=f"continue:{agent_group(role)}", stop_at_brace=True)
         j = clamp_json(raw, {"stance": "same", "argument": "—"})
+        llm_service.record_parse("continue", "_debug" not in j)
         arg = j.get("argument", "—").strip()
 
+        # Structured turns name their target; address it rather than regenerating
+        target = j.get("opponent")
+        if target in opponents and len(arg) > 30 and not has_valid_opponent(arg, role, all_agent_names):
+            arg = f"{target}, {arg}"
+
         # validate: must mention opponent and have content; else retry
         if (arg in ["—", "-", ""]) or (not has_valid_opponent(arg, role, all_agent_names)):
+            llm_service.record_retry("continue")
             retry_prompt = (
                 f"You are {role}. Respond to {opponents[0] if opponents else 'opponent'}.\n"
                 f"Start with: \"{opponents[0] if opponents else 'Opponent'}, \"\n"
                 f"Write 2-3 sentences max. Be concise.\n"
                 'JSON: {"stance":"A","argument":"Name, your response..."}'
             )
-            raw2 = call_ollama(sys, retry_prompt, num_predict=180, temp=0.7)
+            raw2 = call_ollama(sys, retry_prompt, num_predict=180, temp=0.7,
+                               schema=AGENT_TURN_SCHEMA, endpoint="continue",
+                               budget_key=f"continue:{agent_group(role)}", stop_at_brace=True)
             j2 = clamp_json(raw2, {"stance": "same", "argument": "—"})
             if j2.get("argument", "—") not in ["—", "-", ""]:
                 j = j2
@@ -428,29 +702,67 @@ def continue_round(t: Transcript):
         return AgentTurn(agent=role, stance=final_stance, argument=arg)
 
     # Use all agents from the transcript (works for both default and custom agents)
-    return {"turns": [respond(agent_name).dict() for agent_name in all_agent_names]}
+    turns = []
+    for agent_name in all_agent_names:
+        with tracer.span("agent.respond", agent=agent_name):
+            turns.append(respond(agent_name).model_dump())
+    return {"turns": turns}
+
+@app.post("/judge/round")
+def judge_round(t: Transcript):
+    """Score completed rounds now and return the running per-dimension scores"""
+    all_agent_names = list(set(turn.agent for turn in t.turns))
+    return judge_service.update_round(t.model_dump(), all_agent_names)
 
 @app.post("/judge")
-def judge(t: Transcript):
-    judge_input = {"dilemma": t.dilemma.dict(), "transcript": [x.dict() for x in t.turns]}
-    raw = call_ollama(JUDGE_SYS, json.dumps(judge_input), num_predict=600, temp=0.25)
-    print(f"DEBUG Judge raw response: {raw[:500]}...")
-    verdict = clamp_json(raw, {"scores":{}, "final_recommendation":"A","confidence":50,"verdict":"—"})
-    print(f"DEBUG Judge parsed verdict: {verdict}")
+def judge(t: Transcript, mode: str = "full", k: int = JUDGE_ENSEMBLE_K, quorum: Optional[int] = None,
+          timeout: Optional[float] = None):
+    """
+    Judge the debate.
+    
+    mode=full sends the whole transcript in one call. mode=incremental
+    consolidates the running scores kept by /continue?judge_mode=incremental
+    and /judge/round, plus any turns not yet scored, in one short call.
+    mode=ensemble fires k judge calls concurrently, one per configured
+    provider and model in turn, and aggregates the first `quorum` verdicts
+    that arrive within `timeout` seconds (at most JUDGE_ENSEMBLE_TIMEOUT_S).
+    """
+    if mode == "incremental":
+        all_agent_names = list(set(turn.agent for turn in t.turns))
+        verdict = judge_service.final_verdict(t.model_dump(), all_agent_names)
+        log.debug("Judge verdict", extra={"mode": mode, "verdict": verdict})
+    elif mode == "ensemble":
+        judge_input = {"dilemma": t.dilemma.model_dump(), "transcript": [x.model_dump() for x in t.turns]}
+        try:
+            budget = min(timeout, JUDGE_ENSEMBLE_TIMEOUT_S) if timeout and timeout > 0 else JUDGE_ENSEMBLE_TIMEOUT_S
+            verdict = judge_service.ensemble_verdict(JUDGE_SYS, json.dumps(judge_input), k=min(k, 7),
+                                                     quorum=quorum, timeout=budget)
+        except Exception as e:
+            log.warning("Judge ensemble failed: %s", e)
+            verdict = {"scores":{}, "final_recommendation":"A","confidence":50,"verdict":"—"}
+        log.debug("Judge verdict", extra={"mode": mode, "verdict": verdict})
+    else:
+        judge_input = {"dilemma": t.dilemma.model_dump(), "transcript": [x.model_dump() for x in t.turns]}
+        raw = call_ollama(JUDGE_SYS, json.dumps(judge_input), num_predict=600, temp=0.25,
+                          schema=VERDICT_SCHEMA, endpoint="judge", budget_key="judge")
+        log.debug("Judge raw response", extra={"raw": raw})
+        verdict = clamp_json(raw, {"scores":{}, "final_recommendation":"A","confidence":50,"verdict":"—"})
+        llm_service.record_parse("judge", "_debug" not in verdict)
+        log.debug("Judge verdict", extra={"mode": mode, "verdict": verdict})
     
     # Record debate metrics in background
     try:
-        transcript_dict = {"dilemma": t.dilemma.dict(), "turns": [x.dict() for x in t.turns]}
+        transcript_dict = {"dilemma": t.dilemma.model_dump(), "turns": [x.model_dump() for x in t.turns]}
         metrics_service.record_debate(transcript_dict, verdict)
     except Exception as e:
-        print(f"Failed to record metrics: {e}")
+        log.warning("Failed to record metrics: %s", e)
         # Don't fail the request if metrics recording fails
     
     # Save debate to history
     try:
         debate_history_service.save_debate(transcript_dict, verdict)
     except Exception as e:
-        print(f"Failed to save debate history: {e}")
+        log.warning("Failed to save debate history: %s", e)
         # Don't fail the request if history saving fails
     
     return verdict
@@ -470,24 +782,30 @@ def get_agent_response(agent_name: str, dilemma: Dilemma):
         # Generate response using the same logic as the opening round
         base = mk_base(dilemma)
         
-        raw = call_ollama(sys_prompt, base + "\n" + OPENING_INSTRUCT, num_predict=300, temp=0.65)
-        print(f"DEBUG {display_name} raw response: {raw[:300]}...")
+        raw = call_ollama(sys_prompt, base + "\n" + OPENING_INSTRUCT, num_predict=300, temp=0.65,
+                          schema=AGENT_TURN_SCHEMA, endpoint="agent",
+                          budget_key=f"agent:{agent_group(display_name)}", stop_at_brace=True)
+        log.debug("Agent raw response", extra={"agent": display_name, "endpoint": "agent", "raw": raw})
         
         j = clamp_json(raw, {"stance": "A", "argument": f"[{display_name} failed to generate proper response]"})
-        print(f"DEBUG {display_name} parsed JSON: {j}")
+        llm_service.record_parse("agent", "_debug" not in j)
+        log.debug("Agent parsed JSON", extra={"agent": display_name, "endpoint": "agent", "parsed": j})
         
         if j.get("argument") == "—" or "[failed to generate]" in j.get("argument", ""):
-            print(f"DEBUG {display_name} retrying...")
-            raw2 = call_ollama(sys_prompt, base + "\n" + OPENING_INSTRUCT, num_predict=250, temp=0.8)
+            log.info("Agent retrying", extra={"agent": display_name, "endpoint": "agent"})
+            llm_service.record_retry("agent")
+            raw2 = call_ollama(sys_prompt, base + "\n" + OPENING_INSTRUCT, num_predict=250, temp=0.8,
+                               schema=AGENT_TURN_SCHEMA, endpoint="agent",
+                               budget_key=f"agent:{agent_group(display_name)}", stop_at_brace=True)
             j2 = clamp_json(raw2, j)
             if j2.get("argument", "—") not in ["—", "-"]:
                 j = j2
         
-        return AgentTurn(agent=display_name, stance=j.get("stance","A"), argument=j.get("argument","—")).dict()
+        return AgentTurn(agent=display_name, stance=j.get("stance","A"), argument=j.get("argument","—")).model_dump()
         
     except Exception as e:
-        print(f"DEBUG {agent_name} exception: {str(e)}")
-        return AgentTurn(agent=agent_name, stance="A", argument=f"[{agent_name} error: {str(e)[:100]}]").dict()
+        log.warning("Agent turn failed: %s", e, extra={"agent": agent_name, "endpoint": "agent"})
+        return AgentTurn(agent=agent_name, stance="A", argument=f"[{agent_name} error: {str(e)[:100]}]").model_dump()
 
 # -------------------- CUSTOM AGENT ENDPOINTS --------------------
 
@@ -512,8 +830,8 @@ def create_custom_agent(request: AgentCreationRequest):
         )
         
         return {
-            "agent": agent.dict(),
-            "enhancement": enhancement.dict()
+            "agent": agent.model_dump(mode="json"),
+            "enhancement": enhancement.model_dump(mode="json")
         }
         
     except ValueError as e:
@@ -522,11 +840,11 @@ def create_custom_agent(request: AgentCreationRequest):
         raise HTTPException(status_code=500, detail=f"Failed to create agent: {str(e)}")
 
 @app.get("/api/agents")
-def list_agents(public_only: bool = True, search: Optional[str] = None, limit: int = 50):
+def list_agents(public_only: bool = True, search: Optional[str] = None, limit: int = 50, offset: int = 0):
     """List all available agents"""
     try:
-        agents = agent_service.list_agents(public_only, search, limit)
-        return {"agents": [agent.dict() for agent in agents]}
+        agents = agent_service.list_agents(public_only, search, limit, offset)
+        return {"agents": [agent.model_dump(mode="json") for agent in agents]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list agents: {str(e)}")
 
@@ -546,7 +864,7 @@ def get_agent(agent_id: str):
         agent = agent_service.get_agent(agent_id)
         if not agent:
             raise HTTPException(status_code=404, detail="Agent not found")
-        return {"agent": agent.dict()}
+        return {"agent": agent.model_dump(mode="json")}
     except HTTPException:
         raise
     except Exception as e:
@@ -578,7 +896,7 @@ def update_agent(agent_id: str, request: AgentUpdateRequest):
         if not agent:
             raise HTTPException(status_code=404, detail="Agent not found")
         
-        return {"agent": agent.dict()}
+        return {"agent": agent.model_dump(mode="json")}
         
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -614,7 +932,7 @@ def enhance_description(request: dict):
             agent_name = "Agent"
         
         enhancement = enhancement_service.enhance_agent_description(description, agent_name.strip())
-        return enhancement.dict()
+        return enhancement.model_dump(mode="json")
         
     except HTTPException:
         raise
@@ -646,8 +964,8 @@ def regenerate_agent_prompt(agent_id: str):
         )
         
         return {
-            "agent": updated_agent.dict(),
-            "enhancement": enhancement.dict()
+            "agent": updated_agent.model_dump(mode="json"),
+            "enhancement": enhancement.model_dump(mode="json")
         }
         
     except HTTPException:
@@ -680,7 +998,7 @@ def get_agent_system_prompt(agent_name: str) -> str:
             return agent.system_prompt
         
         # Fallback to default if not found
-        print(f"WARNING: Agent '{agent_name}' not found, using default Deon prompt")
+        log.warning("Agent %r not found, using default Deon prompt", agent_name)
         return DEON_SYS
 
 def get_agent_display_name(agent_identifier: str) -> str:
@@ -721,14 +1039,95 @@ def get_metrics_summary():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get summary: {str(e)}")
 
+# -------------------- OBSERVABILITY ENDPOINTS --------------------
+# Traces, profiles and LLM stats carry prompts and timings: like profiles,
+# they need X-Profile-Token to match PROFILE_TOKEN. /metrics stays open for
+# the Prometheus scraper and holds only aggregate series.
+
+def require_admin(token: Optional[str]) -> None:
+    """Reject the request unless token matches PROFILE_TOKEN"""
+    if not profiler.authorized(token):
+        raise HTTPException(status_code=403, detail="Invalid profile token")
+
+@app.get("/api/traces")
+def list_traces(limit: int = 50, min_ms: float = 0, name: Optional[str] = None, errors: bool = False,
+                x_profile_token: Optional[str] = Header(None)):
+    """
+    Recent request traces, newest first.
+
+    min_ms=10000 lists only requests that took 10s or more; name filters on
+    the root span (e.g. "/continue"); errors=true keeps traces with a failed span.
+    """
+    require_admin(x_profile_token)
+    return {"enabled": tracer.enabled, "traces": tracer.recent(min(limit, 500), min_ms, name, errors)}
+
+@app.get("/api/traces/{trace_id}")
+def get_trace(trace_id: str, x_profile_token: Optional[str] = Header(None)):
+    """All spans of one trace (request -> agent turn -> LLM call -> parse -> storage)"""
+    require_admin(x_profile_token)
+    trace = tracer.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found (it may have left the buffer)")
+    return trace
+
+@app.get("/api/profiles")
+def list_profiles(limit: int = 20, route: Optional[str] = None,
+                  x_profile_token: Optional[str] = Header(None)):
+    """Recent request profiles, newest first; route filters on the endpoint path"""
+    require_admin(x_profile_token)
+    return {
+        "enabled": profiler.enabled,
+        "sample_rate": profiler.sample_rate,
+        "profiles": profiler.recent(min(limit, 200), route)
+    }
+
+@app.get("/api/profiles/{profile_id}")
+def get_profile(profile_id: str, sort: str = "total", x_profile_token: Optional[str] = Header(None)):
+    """Top functions of one profile; sort=self orders them by time spent in the function itself"""
+    require_admin(x_profile_token)
+    profile = profiler.get(profile_id, sort)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found (it may have left the buffer)")
+    return profile
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """LLM call latency, time to first token, queue wait, tokens, retries and parse failures for Prometheus"""
+    return PlainTextResponse(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/api/llm/stats")
+def get_llm_stats(x_profile_token: Optional[str] = Header(None)):
+    """LLM calls, parse failures and retries per endpoint; latency, hedging, circuit state and pool load per provider"""
+    require_admin(x_profile_token)
+    return {
+        "structured_output": llm_service.structured_output,
+        "endpoints": llm_service.stats.snapshot(),
+        **llm_service.latency_snapshot(),
+        "breakers": llm_service.breaker_snapshot(),
+        "pools": llm_service.pool_snapshot(),
+        "budgets": llm_service.budget_snapshot()
+    }
+
 # -------------------- DEBATE HISTORY ENDPOINTS --------------------
 
 @app.get("/api/debates")
-def get_debate_history(limit: int = 50):
-    """Get all debate history"""
+def get_debate_history(limit: int = 50, cursor: Optional[str] = None, view: str = "summary"):
+    """
+    Get debate history, most recent first.
+    
+    Returns lightweight summaries (title, date, recommendation, confidence) by
+    default; fetch /api/debates/{id} for the full transcript. Pass the returned
+    next_cursor to get the following page. view=full returns complete entries.
+    """
     try:
-        debates = debate_history_service.get_all_debates(limit)
-        return {"debates": debates, "count": len(debates)}
+        if view == "full":
+            debates = debate_history_service.get_all_debates(limit)
+            return {"debates": debates, "count": len(debates)}
+        
+        debates, next_cursor = debate_history_service.list_summaries(limit, cursor)
+        return {"debates": debates, "count": len(debates), "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get debate history: {str(e)}")
 
@@ -769,34 +1168,34 @@ def get_debate_stats():
 
 # -------------------- DEBATE TEMPLATES ENDPOINTS --------------------
 
-# Get the directory where main.py is located
-BASE_DIR = Path(__file__).resolve().parent
+def cached_json_response(request: Request, body: bytes, etag: str) -> Response:
+    """Serve a pre-serialized JSON body, answering 304 when the client's ETag matches"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        client_tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if "*" in client_tags or etag in client_tags:
+            return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @app.get("/api/templates")
-def get_debate_templates():
+def get_debate_templates(request: Request):
     """Get all debate templates from the library"""
     try:
-        templates_path = BASE_DIR / "data" / "debate_templates.json"
-        if templates_path.exists():
-            with open(templates_path, 'r', encoding='utf-8') as f:
-                templates = json.load(f)
-            return {"templates": templates, "count": len(templates)}
-        return {"templates": [], "count": 0, "debug": str(templates_path)}
+        body, etag = template_store.list_payload()
+        return cached_json_response(request, body, etag)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to load templates: {str(e)}")
 
 @app.get("/api/templates/{slug}")
-def get_debate_template(slug: str):
+def get_debate_template(slug: str, request: Request):
     """Get a specific debate template by slug"""
     try:
-        templates_path = BASE_DIR / "data" / "debate_templates.json"
-        if templates_path.exists():
-            with open(templates_path, 'r', encoding='utf-8') as f:
-                templates = json.load(f)
-            for template in templates:
-                if template.get("slug") == slug:
-                    return {"template": template}
-        raise HTTPException(status_code=404, detail="Template not found")
+        payload = template_store.template_payload(slug)
+        if payload is None:
+            raise HTTPException(status_code=404, detail="Template not found")
+        body, etag = payload
+        return cached_json_response(request, body, etag)
     except HTTPException:
         raise
     except Exception as e:
@@ -832,25 +1231,24 @@ def submit_debate(submission: DebateSubmission):
             'option_b': submission.option_b
         }
         
-        print(f"DEBUG: Submitting debate: {submission.title}")
+        log.debug("Submitting debate", extra={"title": submission.title})
         
         # Submit through deduplication service
         result = deduplication_service.submit_custom_debate(debate)
         
-        print(f"DEBUG: Result - Success: {result.success}, Duplicate: {result.is_duplicate}, Message: {result.message}")
+        log.info("Debate submission: %s", result.message,
+                 extra={"success": result.success, "duplicate": result.is_duplicate})
         
         # Return appropriate status code
         if not result.success:
             raise HTTPException(status_code=400, detail=result.message)
         
-        result_dict = result.to_dict()
-        print(f"DEBUG: Returning result: {result_dict}")
-        return result_dict
+        return result.to_dict()
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"DEBUG: Exception in submit_debate: {str(e)}")
+        log.exception("Debate submission failed")
         raise HTTPException(status_code=500, detail=f"Failed to submit debate: {str(e)}")
 
 # -------------------- DEBATE EXPORT & SHARING ENDPOINTS --------------------
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Local mock LLM server for offline load testing
+
+Speaks Ollama (/api/generate, /api/chat) and Groq/OpenAI
+(/openai/v1/chat/completions), streaming included. Point the backend at it:
+
+    OLLAMA_HOSTS=http://127.0.0.1:11435 AI_PROVIDER=ollama uvicorn main:app
+    GROQ_BASE_URL=http://127.0.0.1:11435 GROQ_API_KEY=mock uvicorn main:app
+
+Or skip HTTP entirely with AI_PROVIDER=mock.
+
+Usage:
+    python mock_llm_server.py                                # 300ms median, lognormal
+    python mock_llm_server.py --median-ms 800 --sigma 1.0    # heavy tail
+    python mock_llm_server.py --error-rate 0.02 --malformed-rate 0.05
+"""
+import argparse
+
+from services.mock_llm import MockLLM, MockLLMServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a deterministic mock LLM over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-dist", default="lognormal", choices=MockLLM.LATENCY_DISTS,
+                        help="Time-to-first-token distribution")
+    parser.add_argument("--median-ms", type=float, default=300, help="Median time to first token")
+    parser.add_argument("--sigma", type=float, default=0.5, help="Lognormal shape (tail weight)")
+    parser.add_argument("--tokens-per-s", type=float, default=200, help="Generation speed (0 = instant)")
+    parser.add_argument("--turn-tokens", type=int, default=70, help="Mean agent argument length")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls answered with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of calls answered with 429")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Share of outputs that aren't clean JSON")
+    args = parser.parse_args()
+
+    llm = MockLLM(
+        seed=args.seed,
+        latency_dist=args.latency_dist,
+        median_ms=args.median_ms,
+        sigma=args.sigma,
+        tokens_per_s=args.tokens_per_s,
+        turn_tokens=args.turn_tokens,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        malformed_rate=args.malformed_rate
+    )
+    server = MockLLMServer(llm, host=args.host, port=args.port)
+    print(f"🧪 Mock LLM listening on {server.url} "
+          f"({args.latency_dist}, median {args.median_ms}ms, {args.tokens_per_s} tok/s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
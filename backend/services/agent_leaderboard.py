@@ -0,0 +1,103 @@
+# backend/services/agent_leaderboard.py
+"""
+Agents kept in ranking order.
+
+Listings rank custom agents by average rating, then usage count. Rather
+than sorting every agent on every request, AgentLeaderboard keeps the
+ranking in sorted lists (one over all agents, one over public agents) and
+moves an agent with two bisects when its rating or usage changes, so the
+top k agents, or any page of k, are a slice.
+"""
+import bisect
+import itertools
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# (-average_rating, -usage_count, sequence, agent_id): ascending order is rank order
+RankKey = Tuple[float, int, int, str]
+
+
+class AgentLeaderboard:
+    """Agent ids ordered by (average_rating, usage_count), best first"""
+
+    def __init__(self):
+        self._all: List[RankKey] = []
+        self._public: List[RankKey] = []
+        # agent_id -> (current key, is_public)
+        self._entries: Dict[str, Tuple[RankKey, bool]] = {}
+        # Ties keep the order agents were first added in, like a stable sort of the file
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _key(record: dict, sequence: int, agent_id: str) -> RankKey:
+        return (-float(record.get('average_rating') or 0.0), -int(record.get('usage_count') or 0),
+                sequence, agent_id)
+
+    def update(self, agent_id: str, record: dict) -> None:
+        """Add an agent or move it to match its current rating, usage and visibility"""
+        public = bool(record.get('is_public', True))
+        with self._lock:
+            entry = self._entries.get(agent_id)
+            sequence = entry[0][2] if entry else next(self._sequence)
+            key = self._key(record, sequence, agent_id)
+            if entry == (key, public):
+                return
+            if entry:
+                self._discard(*entry)
+            bisect.insort(self._all, key)
+            if public:
+                bisect.insort(self._public, key)
+            self._entries[agent_id] = (key, public)
+
+    def remove(self, agent_id: str) -> None:
+        """Drop an agent; unknown ids are ignored"""
+        with self._lock:
+            entry = self._entries.pop(agent_id, None)
+            if entry:
+                self._discard(*entry)
+
+    def _discard(self, key: RankKey, public: bool) -> None:
+        for ranking in (self._all, self._public) if public else (self._all,):
+            position = bisect.bisect_left(ranking, key)
+            if position < len(ranking) and ranking[position] == key:
+                del ranking[position]
+
+    def rebuild(self, agents: Dict[str, dict]) -> None:
+        """Replace the ranking with these agents, ties in dict order"""
+        with self._lock:
+            self._sequence = itertools.count()
+            self._entries = {
+                agent_id: (self._key(record, next(self._sequence), agent_id), bool(record.get('is_public', True)))
+                for agent_id, record in agents.items()
+            }
+            self._all = sorted(key for key, _ in self._entries.values())
+            self._public = sorted(key for key, public in self._entries.values() if public)
+
+    def page(self, offset: int = 0, limit: int = 50, public_only: bool = True) -> List[str]:
+        """
+        Agent ids of one page of the ranking.
+
+        Args:
+            offset: Agents to skip from the top
+            limit: Maximum number of ids
+            public_only: Rank public agents only
+
+        Returns:
+            Up to limit ids, best first
+        """
+        offset = max(offset, 0)
+        with self._lock:
+            ranking = self._public if public_only else self._all
+            return [key[-1] for key in ranking[offset:offset + max(limit, 0)]]
+
+    def rank(self, agent_id: str, public_only: bool = False) -> Optional[int]:
+        """Zero-based position of an agent, or None if it isn't ranked"""
+        with self._lock:
+            entry = self._entries.get(agent_id)
+            if entry is None or (public_only and not entry[1]):
+                return None
+            return bisect.bisect_left(self._public if public_only else self._all, entry[0])
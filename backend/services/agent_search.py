@@ -0,0 +1,168 @@
+# backend/services/agent_search.py
+"""
+Inverted index for custom agent search.
+
+Agent names, descriptions and enhanced prompts are split into case-folded
+word tokens, in any script; each token maps to the agents containing it,
+weighted by the field it appears in (a hit in the name counts more than one
+buried in the prompt). A query matches agents containing every query term, where a term
+also matches the tokens it is a prefix of ("ethic" finds "ethicist"), and
+results are ranked by a TF-IDF style score.
+"""
+import bisect
+import math
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# How much a token occurrence counts, per indexed field
+FIELD_WEIGHTS = {"name": 3.0, "description": 1.5, "enhanced_prompt": 1.0}
+
+# Score multiplier for a prefix expansion relative to an exact token match
+PREFIX_DISCOUNT = 0.6
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Case-folded word tokens of text, in any script ("Zoë" -> "zoë")"""
+    return TOKEN_PATTERN.findall((text or "").casefold())
+
+
+class AgentSearchIndex:
+    """Token -> agent postings with prefix lookup and ranked search"""
+
+    def __init__(self, min_prefix: int = 2):
+        """
+        Initialize an empty index.
+
+        Args:
+            min_prefix: Shortest query term that is expanded to the tokens
+                it prefixes; shorter terms only match exactly
+        """
+        self.min_prefix = min_prefix
+        # token -> {agent_id: weight}
+        self._postings: Dict[str, Dict[str, float]] = {}
+        # agent_id -> tokens it was indexed under, for removal
+        self._agent_tokens: Dict[str, Tuple[str, ...]] = {}
+        # Sorted distinct tokens; a prefix's expansions are a contiguous slice
+        self._vocabulary: List[str] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._agent_tokens)
+
+    @staticmethod
+    def _weights(record: dict) -> Dict[str, float]:
+        weights: Dict[str, float] = {}
+        for field, field_weight in FIELD_WEIGHTS.items():
+            counts: Dict[str, int] = {}
+            for token in tokenize(record.get(field)):
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                # Damped term frequency: repeating a word 50 times doesn't win
+                weights[token] = weights.get(token, 0.0) + field_weight * (1 + math.log(count))
+        return weights
+
+    def add(self, agent_id: str, record: dict) -> None:
+        """Index (or re-index) one agent record"""
+        weights = self._weights(record)
+        with self._lock:
+            self._remove(agent_id)
+            self._add(agent_id, weights)
+
+    def _add(self, agent_id: str, weights: Dict[str, float]) -> None:
+        for token, weight in weights.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                bisect.insort(self._vocabulary, token)
+            postings[agent_id] = weight
+        self._agent_tokens[agent_id] = tuple(weights)
+
+    def remove(self, agent_id: str) -> None:
+        """Drop an agent from the index; unknown ids are ignored"""
+        with self._lock:
+            self._remove(agent_id)
+
+    def _remove(self, agent_id: str) -> None:
+        for token in self._agent_tokens.pop(agent_id, ()):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(agent_id, None)
+            if not postings:
+                del self._postings[token]
+                position = bisect.bisect_left(self._vocabulary, token)
+                if position < len(self._vocabulary) and self._vocabulary[position] == token:
+                    del self._vocabulary[position]
+
+    def rebuild(self, agents: Dict[str, dict]) -> None:
+        """Replace the index contents with these agents"""
+        weights = {agent_id: self._weights(record) for agent_id, record in agents.items()}
+        with self._lock:
+            self._postings = {}
+            self._agent_tokens = {}
+            for agent_id, agent_weights in weights.items():
+                for token, weight in agent_weights.items():
+                    self._postings.setdefault(token, {})[agent_id] = weight
+                self._agent_tokens[agent_id] = tuple(agent_weights)
+            # One sort instead of an insort per new token
+            self._vocabulary = sorted(self._postings)
+
+    def expand(self, term: str, prefix: bool = True) -> List[str]:
+        """Indexed tokens a query term matches: itself, plus the tokens it prefixes"""
+        with self._lock:
+            return self._expand(term, prefix)
+
+    def _expand(self, term: str, prefix: bool) -> List[str]:
+        if not prefix or len(term) < self.min_prefix:
+            return [term] if term in self._postings else []
+        start = bisect.bisect_left(self._vocabulary, term)
+        # Every token starting with term sorts before term + the highest code point
+        end = bisect.bisect_left(self._vocabulary, term + "\U0010ffff", start)
+        return self._vocabulary[start:end]
+
+    def search(self, query: str, prefix: bool = True, limit: Optional[int] = None,
+               allowed: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Rank agents matching every term of the query.
+
+        Args:
+            query: Free text; tokenized like the indexed fields
+            prefix: Let terms match the tokens they are a prefix of
+            limit: Maximum number of results (None for all)
+            allowed: Only consider these agent ids
+
+        Returns:
+            (agent_id, score) pairs, best first; empty for a query without terms
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        allowed = set(allowed) if allowed is not None else None
+
+        with self._lock:
+            total = max(len(self._agent_tokens), 1)
+            scores: Optional[Dict[str, float]] = None
+            for term in terms:
+                term_scores: Dict[str, float] = {}
+                for token in self._expand(term, prefix):
+                    postings = self._postings[token]
+                    idf = math.log(1 + total / len(postings))
+                    factor = idf if token == term else idf * PREFIX_DISCOUNT
+                    for agent_id, weight in postings.items():
+                        # A term counts once per agent, through its best-scoring token
+                        score = weight * factor
+                        if score > term_scores.get(agent_id, 0.0):
+                            term_scores[agent_id] = score
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {a: s + term_scores[a] for a, s in scores.items() if a in term_scores}
+                if not scores:
+                    return []
+
+        ranked = [(a, s) for a, s in scores.items() if allowed is None or a in allowed]
+        ranked.sort(key=lambda item: (-item[1], item[0]))
+        return ranked if limit is None else ranked[:max(limit, 0)]
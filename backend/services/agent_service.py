@@ -1,11 +1,15 @@
 # backend/services/agent_service.py
 import json
 import os
+import threading
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 from pathlib import Path
 
 from models.custom_agent import CustomAgent, AgentRating, AgentCreationRequest, AgentUpdateRequest
+from services.agent_leaderboard import AgentLeaderboard
+from services.agent_search import AgentSearchIndex
+from services.serialization import read_json, write_json
 
 
 class AgentService:
@@ -14,6 +18,14 @@ class AgentService:
         self.agents_file = self.storage_path / "custom_agents.json"
         self.ratings_file = self.storage_path / "agent_ratings.json"
         
+        # Parsed agents, search index and ranking, valid while the file signature matches
+        self._cache_signature = None
+        self._cached_agents: Dict[str, dict] = {}
+        self._search_index = AgentSearchIndex()
+        self._leaderboard = AgentLeaderboard()
+        # Serializes load -> modify -> write -> cache update, and cache rebuilds
+        self._lock = threading.RLock()
+        
         # Create storage directory if it doesn't exist
         self.storage_path.mkdir(parents=True, exist_ok=True)
         
@@ -26,48 +38,90 @@ class AgentService:
     def _load_agents(self) -> Dict[str, dict]:
         """Load agents from JSON file"""
         try:
-            with open(self.agents_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return read_json(self.agents_file)
         except (FileNotFoundError, json.JSONDecodeError):
             return {}
 
-    def _save_agents(self, agents: Dict[str, dict]) -> None:
-        """Save agents to JSON file"""
-        with open(self.agents_file, 'w', encoding='utf-8') as f:
-            json.dump(agents, f, indent=2, ensure_ascii=False, default=str)
+    def _save_agents(self, agents: Dict[str, dict], changed: Iterable[str] = (), text_changed: bool = True) -> None:
+        """
+        Save agents to JSON file.
+        
+        Args:
+            agents: Every agent record, as written
+            changed: Ids of the agents added, edited or removed; only these
+                are re-ranked and re-indexed
+            text_changed: Whether their name, description or prompts changed
+                (False for rating and usage updates, which skip the search index)
+        """
+        with self._lock:
+            in_sync = self._cache_signature is not None and self._cache_signature == self._file_signature()
+            write_json(self.agents_file, agents)
+            if not in_sync:
+                # Someone else wrote the file since we last read it: rebuild on next read
+                self._cache_signature = None
+                return
+            self._cached_agents = agents
+            for agent_id in changed:
+                if agent_id in agents:
+                    self._leaderboard.update(agent_id, agents[agent_id])
+                    if text_changed:
+                        self._search_index.add(agent_id, agents[agent_id])
+                else:
+                    self._leaderboard.remove(agent_id)
+                    self._search_index.remove(agent_id)
+            self._cache_signature = self._file_signature()
+
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.agents_file.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_agents(self) -> Dict[str, dict]:
+        """Cached agents for read-only use; reloads and re-indexes only when the file changes"""
+        with self._lock:
+            if self._cache_signature is None or self._cache_signature != self._file_signature():
+                # Signature first: a write landing mid-load then forces another rebuild
+                signature = self._file_signature()
+                agents = self._load_agents()
+                self._search_index.rebuild(agents)
+                self._leaderboard.rebuild(agents)
+                self._cached_agents = agents
+                self._cache_signature = signature
+            return self._cached_agents
 
     def _load_ratings(self) -> Dict[str, dict]:
         """Load ratings from JSON file"""
         try:
-            with open(self.ratings_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return read_json(self.ratings_file)
         except (FileNotFoundError, json.JSONDecodeError):
             return {}
 
     def _save_ratings(self, ratings: Dict[str, dict]) -> None:
         """Save ratings to JSON file"""
-        with open(self.ratings_file, 'w', encoding='utf-8') as f:
-            json.dump(ratings, f, indent=2, ensure_ascii=False, default=str)
+        write_json(self.ratings_file, ratings)
 
     def create_agent(self, request: AgentCreationRequest, enhanced_prompt: str, system_prompt: str) -> CustomAgent:
         """Create a new custom agent"""
-        # Check for duplicate names (including default agents)
-        self._check_duplicate_name(request.name)
-        
-        agent = CustomAgent(
-            name=request.name,
-            avatar=request.avatar,
-            description=request.description,
-            enhanced_prompt=enhanced_prompt,
-            system_prompt=system_prompt
-        )
-        
-        # Load existing agents
-        agents = self._load_agents()
-        
-        # Save agent
-        agents[agent.id] = agent.dict()
-        self._save_agents(agents)
+        with self._lock:
+            # Check for duplicate names (including default agents)
+            self._check_duplicate_name(request.name)
+            
+            agent = CustomAgent(
+                name=request.name,
+                avatar=request.avatar,
+                description=request.description,
+                enhanced_prompt=enhanced_prompt,
+                system_prompt=system_prompt
+            )
+            
+            # Load existing agents
+            agents = self._load_agents()
+            
+            # Save agent
+            agents[agent.id] = agent.model_dump(mode="json")
+            self._save_agents(agents, changed=[agent.id])
         
         return agent
     
@@ -105,103 +159,112 @@ class AgentService:
                 return CustomAgent(**agent_data)
         return None
 
-    def list_agents(self, public_only: bool = True, search: Optional[str] = None, limit: int = 50) -> List[CustomAgent]:
-        """List all agents with optional filtering"""
-        agents = self._load_agents()
-        agent_list = []
-        
-        for agent_data in agents.values():
-            agent = CustomAgent(**agent_data)
-            
-            # Filter by public status
-            if public_only and not agent.is_public:
-                continue
-            
-            # Filter by search term
-            if search:
-                search_lower = search.lower()
-                if (search_lower not in agent.name.lower() and 
-                    search_lower not in agent.description.lower()):
-                    continue
+    def list_agents(self, public_only: bool = True, search: Optional[str] = None, limit: int = 50,
+                    offset: int = 0) -> List[CustomAgent]:
+        """
+        List agents, best rated first, or the best matches for a search.
+        
+        Args:
+            public_only: Leave out private agents
+            search: Words to find in the name, description or enhanced prompt;
+                each must match a word or the start of one ("envir" finds
+                "environmental"). Results are ranked by relevance.
+            limit: Maximum number of agents
+            offset: Agents to skip, for paging
+        """
+        with self._lock:
+            agents = self._read_agents()
             
-            agent_list.append(agent)
-        
-        # Sort by usage count and rating
-        agent_list.sort(key=lambda a: (a.average_rating, a.usage_count), reverse=True)
-        
-        return agent_list[:limit]
+            if search and search.strip():
+                # Skip ids the snapshot doesn't have, should the index ever disagree with it
+                matches = [m for m in self._search_index.search(search) if m[0] in agents]
+                if public_only:
+                    matches = [m for m in matches if agents[m[0]].get('is_public', True)]
+                # Equal relevance: fall back to the leaderboard order, unranked agents last
+                ranks = {agent_id: self._leaderboard.rank(agent_id) for agent_id, _ in matches}
+                matches.sort(key=lambda m: (-m[1], len(agents) if ranks[m[0]] is None else ranks[m[0]]))
+                agent_ids = [agent_id for agent_id, _ in matches[max(offset, 0):max(offset, 0) + max(limit, 0)]]
+            else:
+                agent_ids = self._leaderboard.page(offset, limit, public_only)
+            records = [agents[agent_id] for agent_id in agent_ids if agent_id in agents]
+        
+        return [CustomAgent(**record) for record in records]
 
     def update_agent(self, agent_id: str, request: AgentUpdateRequest, 
                     enhanced_prompt: Optional[str] = None, 
                     system_prompt: Optional[str] = None) -> Optional[CustomAgent]:
         """Update an existing agent"""
-        agents = self._load_agents()
-        
-        if agent_id not in agents:
-            return None
-        
-        agent_data = agents[agent_id]
-        
-        # Update fields if provided
-        if request.name is not None:
-            # Check for duplicate names (excluding current agent)
-            for aid, existing_agent in agents.items():
-                if (aid != agent_id and 
-                    existing_agent.get('name', '').lower() == request.name.lower()):
-                    raise ValueError(f"Agent with name '{request.name}' already exists")
-            agent_data['name'] = request.name
-        
-        if request.avatar is not None:
-            agent_data['avatar'] = request.avatar
-        
-        if request.description is not None:
-            agent_data['description'] = request.description
-        
-        if enhanced_prompt is not None:
-            agent_data['enhanced_prompt'] = enhanced_prompt
-        
-        if system_prompt is not None:
-            agent_data['system_prompt'] = system_prompt
-        
-        # Save updated agents
-        self._save_agents(agents)
+        with self._lock:
+            agents = self._load_agents()
+            
+            if agent_id not in agents:
+                return None
+            
+            agent_data = agents[agent_id]
+            
+            # Update fields if provided
+            if request.name is not None:
+                # Check for duplicate names (excluding current agent)
+                for aid, existing_agent in agents.items():
+                    if (aid != agent_id and 
+                        existing_agent.get('name', '').lower() == request.name.lower()):
+                        raise ValueError(f"Agent with name '{request.name}' already exists")
+                agent_data['name'] = request.name
+            
+            if request.avatar is not None:
+                agent_data['avatar'] = request.avatar
+            
+            if request.description is not None:
+                agent_data['description'] = request.description
+            
+            if enhanced_prompt is not None:
+                agent_data['enhanced_prompt'] = enhanced_prompt
+            
+            if system_prompt is not None:
+                agent_data['system_prompt'] = system_prompt
+            
+            # Save updated agents
+            self._save_agents(agents, changed=[agent_id])
         
         return CustomAgent(**agent_data)
 
     def delete_agent(self, agent_id: str) -> bool:
         """Delete an agent"""
-        agents = self._load_agents()
-        
-        if agent_id in agents:
-            del agents[agent_id]
-            self._save_agents(agents)
+        with self._lock:
+            agents = self._load_agents()
             
-            # Also delete associated ratings
-            ratings = self._load_ratings()
-            ratings = {rid: rating for rid, rating in ratings.items() 
-                      if rating.get('agent_id') != agent_id}
-            self._save_ratings(ratings)
+            if agent_id in agents:
+                del agents[agent_id]
+                self._save_agents(agents, changed=[agent_id])
+            
+                # Also delete associated ratings
+                ratings = self._load_ratings()
+                ratings = {rid: rating for rid, rating in ratings.items() 
+                          if rating.get('agent_id') != agent_id}
+                self._save_ratings(ratings)
             
-            return True
+                return True
         
         return False
 
     def increment_usage(self, agent_id: str) -> None:
         """Increment usage count for an agent"""
-        agents = self._load_agents()
-        
-        if agent_id in agents:
-            agents[agent_id]['usage_count'] = agents[agent_id].get('usage_count', 0) + 1
-            self._save_agents(agents)
+        with self._lock:
+            agents = self._load_agents()
+            
+            if agent_id in agents:
+                agents[agent_id]['usage_count'] = agents[agent_id].get('usage_count', 0) + 1
+                self._save_agents(agents, changed=[agent_id], text_changed=False)
 
     def add_rating(self, rating: AgentRating) -> None:
         """Add a rating for an agent"""
-        ratings = self._load_ratings()
-        ratings[rating.id] = rating.dict()
-        self._save_ratings(ratings)
-        
-        # Update agent's average rating
-        self._update_agent_rating(rating.agent_id)
+        with self._lock:
+            ratings = self._load_ratings()
+            ratings[rating.id] = rating.model_dump(mode="json")
+            self._save_ratings(ratings)
+            
+            # Update agent's average rating
+            self._update_agent_rating(rating.agent_id)
 
     def _update_agent_rating(self, agent_id: str) -> None:
         """Recalculate and update agent's average rating"""
@@ -223,11 +286,12 @@ class AgentService:
         rating_count = len(agent_ratings)
         
         # Update agent data
-        agents = self._load_agents()
-        if agent_id in agents:
-            agents[agent_id]['average_rating'] = round(average_rating, 2)
-            agents[agent_id]['rating_count'] = rating_count
-            self._save_agents(agents)
+        with self._lock:
+            agents = self._load_agents()
+            if agent_id in agents:
+                agents[agent_id]['average_rating'] = round(average_rating, 2)
+                agents[agent_id]['rating_count'] = rating_count
+                self._save_agents(agents, changed=[agent_id], text_changed=False)
 
     def get_agent_ratings(self, agent_id: str) -> List[AgentRating]:
         """Get all ratings for a specific agent"""
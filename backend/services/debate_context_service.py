@@ -0,0 +1,180 @@
+# backend/services/debate_context_service.py
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+
+SUMMARY_SYS = (
+    "You maintain a running summary of an ethical debate between several agents. "
+    "Merge the new turns into the existing summary. For each agent keep their current stance, "
+    "their strongest arguments, and who they rebutted. Drop repetition and filler. "
+    "Write plain prose, no JSON, no headings, at most {max_words} words."
+)
+
+
+def transcript_digest(turns: List[dict]) -> str:
+    """Stable digest of a list of turns"""
+    payload = json.dumps([(t.get("agent"), t.get("stance"), t.get("argument")) for t in turns],
+                         ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def session_key(transcript: dict, agents: List[str]) -> str:
+    """
+    Identify a debate session.
+
+    Uses the client's session_id when given, else the dilemma plus the opening
+    round; openings are sampled per debate, so two runs of the same template
+    get different keys.
+    """
+    if transcript.get("session_id"):
+        return str(transcript["session_id"])
+    turns = transcript.get("turns", [])
+    opening = turns[:max(len(agents), 1)]
+    payload = json.dumps(transcript.get("dilemma", {}), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1((payload + transcript_digest(opening)).encode("utf-8")).hexdigest()
+
+
+class SessionCache:
+    """Bounded LRU of per-session state with idle expiry"""
+
+    def __init__(self, max_sessions: int = 500, ttl_seconds: float = 3600):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key: str, factory: Callable[[], object]):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None and now - entry[0] <= self.ttl_seconds:
+                self._items.move_to_end(key)
+                self._items[key] = (now, entry[1])
+                return entry[1]
+
+            value = factory()
+            self._items[key] = (now, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_sessions:
+                self._items.popitem(last=False)
+            return value
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class _SessionSummary:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.summary = ""
+        self.covered = 0
+        self.covered_digest = transcript_digest([])
+
+
+class DebateContextService:
+    """
+    Rolling, compact summary of a debate for /continue prompts.
+
+    The summary covers every round except the latest complete one (whose
+    arguments are quoted directly in the prompt) and is folded forward with
+    one summarizer call when a round completes, not once per agent, so prompt
+    size per call stays bounded as debates grow.
+    """
+
+    def __init__(self, llm: Optional[Callable[..., str]] = None,
+                 max_summary_words: int = 150,
+                 max_sessions: int = 500,
+                 ttl_seconds: float = 3600):
+        """
+        Initialize the context service.
+
+        Args:
+            llm: Callable (system_prompt, user_prompt, num_predict=..., temp=...) -> str
+            max_summary_words: Target summary length
+            max_sessions: Sessions kept in memory
+            ttl_seconds: Idle time after which a session's summary is dropped
+        """
+        self.llm = llm
+        self.max_summary_words = max_summary_words
+        self.max_summary_chars = max_summary_words * 8
+        self.sessions = SessionCache(max_sessions, ttl_seconds)
+
+    def get_summary(self, transcript: dict, agents: List[str]) -> str:
+        """
+        Return the compact summary of the debate's earlier rounds,
+        refreshing it if a new round has completed since the last refresh.
+
+        Args:
+            transcript: {"dilemma": {...}, "turns": [...], "session_id": optional}
+            agents: Agents taking part in the debate
+        """
+        turns = transcript.get("turns", [])
+        n_agents = max(len(agents), 1)
+        # Everything before the latest complete round goes into the summary
+        target = max(len(turns) // n_agents - 1, 0) * n_agents
+        if target == 0:
+            return ""
+
+        state = self.sessions.get_or_create(session_key(transcript, agents), _SessionSummary)
+
+        with state.lock:
+            if state.covered > target or state.covered_digest != transcript_digest(turns[:state.covered]):
+                # Different or rewritten transcript under this key: start over
+                state.summary, state.covered = "", 0
+
+            if state.covered < target:
+                new_turns = turns[state.covered:target]
+                state.summary = self._fold(transcript.get("dilemma", {}), state.summary, new_turns)
+                state.covered = target
+                state.covered_digest = transcript_digest(turns[:target])
+
+            return state.summary
+
+    def _fold(self, dilemma: dict, summary: str, new_turns: List[dict]) -> str:
+        """Merge new turns into the summary with one LLM call"""
+        if self.llm is not None:
+            lines = "\n".join(
+                f"{t.get('agent')} ({t.get('stance') or '?'}): {' '.join(t.get('argument', '').split())}"
+                for t in new_turns
+            )
+            prompt = (
+                f"Dilemma: {dilemma.get('title', '')}\n"
+                f"Option A: {dilemma.get('A', '')}\nOption B: {dilemma.get('B', '')}\n\n"
+                f"Current summary:\n{summary or '(none yet)'}\n\n"
+                f"New turns:\n{lines}\n\n"
+                f"Updated summary:"
+            )
+            try:
+                updated = self.llm(
+                    SUMMARY_SYS.format(max_words=self.max_summary_words),
+                    prompt,
+                    num_predict=int(self.max_summary_words * 1.5),
+                    temp=0.2
+                )
+                updated = " ".join(updated.split())
+                if updated:
+                    return updated[:self.max_summary_chars]
+            except Exception as e:
+                log.warning("Debate summary failed, using extractive fallback: %s", e)
+
+        return self._extractive(summary, new_turns)
+
+    def _extractive(self, summary: str, new_turns: List[dict]) -> str:
+        """Fallback: keep each agent's most recent position, one line per agent"""
+        positions: Dict[str, str] = {}
+        for line in summary.split("\n"):
+            agent, sep, _ = line.partition(" (")
+            if sep:
+                positions[agent] = line
+        per_agent = max(self.max_summary_chars // max(len(positions) + len(new_turns), 1), 80)
+        for t in new_turns:
+            argument = " ".join(t.get("argument", "").split())
+            positions[t.get("agent")] = f"{t.get('agent')} ({t.get('stance') or '?'}): {argument[:per_agent]}"
+        return "\n".join(positions.values())[:self.max_summary_chars]
@@ -1,11 +1,16 @@
 # backend/services/debate_deduplication_service.py
 import json
+import logging
 import os
 from pathlib import Path
 from typing import List, Optional, Dict
 from datetime import datetime
 import re
 from services.embedding_service import EmbeddingService
+from services.serialization import read_json, write_json
+from services.template_store import TemplateStore
+
+log = logging.getLogger(__name__)
 
 
 class DeduplicationResult:
@@ -45,9 +50,13 @@ class DebateDeduplicationService:
     - Adding unique debates to library
     """
     
+    # High similarity threshold - only exact/near-exact matches
+    HIGH_SIMILARITY_THRESHOLD = 0.95
+    
     def __init__(self, templates_path: str = "data/debate_templates.json", 
                  embedding_service: Optional[EmbeddingService] = None,
-                 groq_client = None):
+                 groq_client = None,
+                 template_store: Optional[TemplateStore] = None):
         """
         Initialize the deduplication service.
         
@@ -55,9 +64,11 @@ class DebateDeduplicationService:
             templates_path: Path to debate templates JSON file
             embedding_service: Optional embedding service (creates new one if not provided)
             groq_client: Optional Groq client for LLM-based comparison
+            template_store: Optional in-memory template store to invalidate on writes
         """
         self.templates_path = Path(templates_path)
         self.embedding_service = embedding_service or EmbeddingService(groq_client=groq_client)
+        self.template_store = template_store
         
         # Ensure data directory exists
         self.templates_path.parent.mkdir(parents=True, exist_ok=True)
@@ -134,9 +145,6 @@ class DebateDeduplicationService:
         if not templates:
             return None
         
-        # High similarity threshold - only exact/near-exact matches
-        HIGH_SIMILARITY_THRESHOLD = 0.95
-        
         # Generate embedding for candidate debate
         candidate_embedding = self.embedding_service.generate_debate_embedding(debate)
         
@@ -155,7 +163,7 @@ class DebateDeduplicationService:
                 best_match = template
         
         # Only return match if similarity is very high
-        if best_similarity >= HIGH_SIMILARITY_THRESHOLD:
+        if best_similarity >= self.HIGH_SIMILARITY_THRESHOLD:
             result = best_match.copy()
             result['similarity_score'] = best_similarity
             return result
@@ -210,12 +218,11 @@ class DebateDeduplicationService:
             if not self.templates_path.exists():
                 return []
             
-            with open(self.templates_path, 'r', encoding='utf-8') as f:
-                templates = json.load(f)
+            templates = read_json(self.templates_path)
             
             return templates if isinstance(templates, list) else []
         except (json.JSONDecodeError, IOError) as e:
-            print(f"Error loading templates: {e}")
+            log.warning("Error loading templates: %s", e)
             return []
     
     def _save_templates(self, templates: List[dict]) -> None:
@@ -223,21 +230,11 @@ class DebateDeduplicationService:
         Persist templates back to JSON file.
         Uses atomic write (write to temp, then rename) for safety.
         """
-        # Write to temporary file first
-        temp_path = self.templates_path.with_suffix('.tmp')
+        write_json(self.templates_path, templates)
         
-        try:
-            with open(temp_path, 'w', encoding='utf-8') as f:
-                json.dump(templates, f, indent=2, ensure_ascii=False)
-            
-            # Atomic rename
-            temp_path.replace(self.templates_path)
-            
-        except Exception as e:
-            # Clean up temp file if it exists
-            if temp_path.exists():
-                temp_path.unlink()
-            raise e
+        # Served templates must reflect the new library immediately
+        if self.template_store is not None:
+            self.template_store.invalidate()
     
     def _generate_slug(self, title: str, existing_templates: List[dict]) -> str:
         """
@@ -1,17 +1,33 @@
 # backend/services/debate_history_service.py
+import base64
 import json
 import os
+import threading
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 from uuid import uuid4
 
+from services.serialization import read_json, write_json
+
+# Fields the history list needs; full transcripts are only served per debate
+SUMMARY_FIELDS = ("id", "title", "date", "timestamp", "recommendation", "confidence")
+
 
 class DebateHistoryService:
     def __init__(self, storage_path: str = "data"):
         self.storage_path = Path(storage_path)
         self.history_file = self.storage_path / "debate_history.json"
         
+        # Parsed history and summary index, valid while the file signature matches
+        self._cache_signature = None
+        self._cached_history: List[dict] = []
+        self._by_id: Dict[str, dict] = {}
+        self._summaries: List[dict] = []
+        # Serializes load -> modify -> write -> re-index, and cache refreshes, so
+        # the cached history always matches the file signature stored with it
+        self._lock = threading.RLock()
+        
         # Create storage directory if it doesn't exist
         self.storage_path.mkdir(parents=True, exist_ok=True)
         
@@ -22,18 +38,59 @@ class DebateHistoryService:
     def _load_history(self) -> List[dict]:
         """Load debate history from JSON file"""
         try:
-            with open(self.history_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return read_json(self.history_file)
         except (FileNotFoundError, json.JSONDecodeError):
             return []
 
     def _save_history(self, history: List[dict]) -> None:
-        """Save debate history to JSON file"""
-        with open(self.history_file, 'w', encoding='utf-8') as f:
-            json.dump(history, f, indent=2, ensure_ascii=False, default=str)
+        """Save debate history to JSON file and refresh the cache from what was written"""
+        with self._lock:
+            write_json(self.history_file, history)
+            self._rebuild_index(history)
+
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.history_file.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _rebuild_index(self, history: List[dict]) -> None:
+        """Refresh the cached history, id map and summary index"""
+        self._cached_history = history
+        self._by_id = {d.get("id"): d for d in history}
+        self._summaries = [{k: d.get(k) for k in SUMMARY_FIELDS} for d in history]
+        self._cache_signature = self._file_signature()
+
+    def _read_history(self) -> List[dict]:
+        """Cached history for read-only use; reloads only when the file changes"""
+        with self._lock:
+            if self._cache_signature is None or self._cache_signature != self._file_signature():
+                self._rebuild_index(self._load_history())
+            return self._cached_history
+
+    @staticmethod
+    def encode_cursor(summary: dict) -> str:
+        """Opaque pagination cursor pointing just after this debate"""
+        raw = f"{summary.get('timestamp', 0)}|{summary.get('id', '')}"
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[float, str]:
+        """Decode a cursor into (timestamp, id); raises ValueError if malformed"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+            timestamp, debate_id = raw.split("|", 1)
+            return float(timestamp), debate_id
+        except Exception:
+            raise ValueError("Invalid cursor")
 
     def save_debate(self, transcript: dict, verdict: dict) -> dict:
         """Save a completed debate to history"""
+        with self._lock:
+            return self._save_debate(transcript, verdict)
+
+    def _save_debate(self, transcript: dict, verdict: dict) -> dict:
         history = self._load_history()
         
         debate_entry = {
@@ -59,29 +116,60 @@ class DebateHistoryService:
 
     def get_all_debates(self, limit: int = 50) -> List[dict]:
         """Get all debates, most recent first"""
-        history = self._load_history()
+        history = self._read_history()
         return history[:limit]
 
+    def list_summaries(self, limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        Get one page of debate summaries, most recent first.
+        
+        Args:
+            limit: Maximum number of summaries to return
+            cursor: Cursor returned with the previous page
+        
+        Returns:
+            (summaries, next_cursor) - next_cursor is None on the last page
+        """
+        with self._lock:
+            self._read_history()
+            summaries = self._summaries
+        
+        start = 0
+        if cursor:
+            timestamp, debate_id = self.decode_cursor(cursor)
+            position = next((i for i, d in enumerate(summaries) if d.get("id") == debate_id), None)
+            if position is not None:
+                start = position + 1
+            else:
+                # Cursor debate was deleted: resume at the first older debate
+                start = next((i for i, d in enumerate(summaries)
+                              if (d.get("timestamp") or 0) < timestamp), len(summaries))
+        
+        page = summaries[start:start + max(limit, 0)]
+        has_more = start + len(page) < len(summaries)
+        next_cursor = self.encode_cursor(page[-1]) if page and has_more else None
+        
+        return [dict(d) for d in page], next_cursor
+
     def get_debate_by_id(self, debate_id: str) -> Optional[dict]:
         """Get a specific debate by ID"""
-        history = self._load_history()
-        for debate in history:
-            if debate.get("id") == debate_id:
-                return debate
-        return None
+        with self._lock:
+            self._read_history()
+            return self._by_id.get(debate_id)
 
     def delete_debate(self, debate_id: str) -> bool:
         """Delete a debate from history"""
-        history = self._load_history()
-        original_length = len(history)
-        
-        history = [d for d in history if d.get("id") != debate_id]
-        
-        if len(history) < original_length:
-            self._save_history(history)
-            return True
-        
-        return False
+        with self._lock:
+            history = self._load_history()
+            original_length = len(history)
+            
+            history = [d for d in history if d.get("id") != debate_id]
+            
+            if len(history) < original_length:
+                self._save_history(history)
+                return True
+            
+            return False
 
     def clear_all_history(self) -> bool:
         """Clear all debate history (use with caution)"""
@@ -90,7 +178,7 @@ class DebateHistoryService:
 
     def get_stats(self) -> dict:
         """Get statistics about debate history"""
-        history = self._load_history()
+        history = self._read_history()
         
         if not history:
             return {
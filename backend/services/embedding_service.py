@@ -4,8 +4,11 @@ import os
 from typing import Optional, List
 from groq import Groq
 import json
+import logging
 import hashlib
 
+log = logging.getLogger(__name__)
+
 
 class EmbeddingService:
     """
@@ -23,7 +26,7 @@ class EmbeddingService:
             groq_client: Optional Groq client for LLM-based semantic comparison
         """
         self.groq_client = groq_client
-        print("✓ Using Groq LLM for semantic embeddings (fast, free with existing API key)")
+        log.info("Using Groq LLM for semantic embeddings")
     
     def generate_debate_embedding(self, debate: dict) -> np.ndarray:
         """
@@ -1,8 +1,10 @@
 # backend/services/enhancement_service.py
+import logging
 import re
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional
 from models.custom_agent import EnhancementRequest
-from main import call_ollama  # Import the existing Ollama function
+
+log = logging.getLogger(__name__)
 
 
 class PromptAnalyzer:
@@ -131,6 +133,16 @@ class PromptAnalyzer:
 
 class PromptEnhancer:
     """Enhances user descriptions using AI"""
+
+    def __init__(self, llm: Optional[Callable[..., str]] = None):
+        """
+        Initialize the enhancer.
+
+        Args:
+            llm: call_ollama-style function (system prompt, user prompt, num_predict,
+                temp, endpoint); without one the rule-based fallback is used
+        """
+        self.llm = llm
     
     ENHANCER_SYSTEM_PROMPT = (
         "You are an expert at creating ethical AI agent personalities. Your job is to take a user's "
@@ -171,13 +183,16 @@ class PromptEnhancer:
             f"Return ONLY the expanded personality text (4-5 sentences), nothing else."
         )
         
+        if self.llm is None:
+            return self._fallback_enhancement(description, agent_name, scores, suggestions)
+
         try:
-            # Use existing Ollama integration to enhance
-            enhanced_prompt = call_ollama(
+            enhanced_prompt = self.llm(
                 self.ENHANCER_SYSTEM_PROMPT,
                 enhancement_prompt,
                 num_predict=500,
-                temp=0.7
+                temp=0.7,
+                endpoint="enhancement"
             )
             
             # Clean up the response - remove any JSON instructions or extra formatting
@@ -187,7 +202,9 @@ class PromptEnhancer:
             
             # Check quality - if too short or doesn't mention agent name, retry with more explicit instructions
             if len(enhanced_prompt.split()) < 50 or agent_name.lower() not in enhanced_prompt.lower():
-                print(f"Enhancement quality check failed, retrying... (length: {len(enhanced_prompt.split())}, has name: {agent_name.lower() in enhanced_prompt.lower()})")
+                log.info("Enhancement quality check failed, retrying", extra={
+                    "words": len(enhanced_prompt.split()), "has_name": agent_name.lower() in enhanced_prompt.lower()
+                })
                 
                 retry_prompt = (
                     f"AGENT NAME: {agent_name}\n"
@@ -205,11 +222,12 @@ class PromptEnhancer:
                     f"Write ONLY the personality description, nothing else:"
                 )
                 
-                enhanced_prompt = call_ollama(
+                enhanced_prompt = self.llm(
                     self.ENHANCER_SYSTEM_PROMPT,
                     retry_prompt,
                     num_predict=500,
-                    temp=0.75
+                    temp=0.75,
+                    endpoint="enhancement"
                 ).strip()
                 
                 # Clean again
@@ -228,7 +246,7 @@ class PromptEnhancer:
             )
             
         except Exception as e:
-            print(f"Enhancement error: {e}")
+            log.warning("Enhancement error: %s", e)
             # Fallback enhancement if AI fails
             return self._fallback_enhancement(description, agent_name, scores, suggestions)
     
@@ -295,9 +313,15 @@ class PromptEnhancer:
 class EnhancementService:
     """Main service for handling agent enhancement requests"""
     
-    def __init__(self):
+    def __init__(self, llm: Optional[Callable[..., str]] = None):
+        """
+        Initialize the enhancement service.
+
+        Args:
+            llm: LLM call used to expand descriptions (main passes call_ollama)
+        """
         self.analyzer = PromptAnalyzer()
-        self.enhancer = PromptEnhancer()
+        self.enhancer = PromptEnhancer(llm)
     
     def enhance_agent_description(self, description: str, agent_name: str = "Agent") -> EnhancementRequest:
         """Main method to enhance an agent description"""
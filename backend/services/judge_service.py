@@ -0,0 +1,395 @@
+# backend/services/judge_service.py
+import contextvars
+import copy
+import inspect
+import json
+import logging
+import statistics
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Sequence
+
+from services.debate_context_service import SessionCache, session_key, transcript_digest
+from services.llm_service import CancelToken
+
+log = logging.getLogger(__name__)
+
+DIMENSIONS = ["harm_minimization", "rule_consistency", "autonomy_respect", "honesty", "fairness"]
+
+ROUND_JUDGE_SYS = (
+    "You are the Judge, a neutral evaluator of ethical reasoning, scoring a debate round by round. "
+    "Given the dilemma, your running scores and the newest turns, update the scores. "
+    "Each dimension is scored 0-2 for each option.\n"
+    "Respond with compact JSON only:\n"
+    '{"scores":{"option_a":{"harm_minimization":0-2,"rule_consistency":0-2,"autonomy_respect":0-2,"honesty":0-2,"fairness":0-2},'
+    '"option_b":{...same keys...}},"leaning":"A or B","confidence":0-100,"rationale":"1-2 sentences"}'
+)
+
+CONSOLIDATE_SYS = (
+    "You are the Judge, a neutral evaluator of ethical reasoning. You have scored the debate round by round. "
+    "Given your running scores, your notes and any final turns not yet scored, give the final verdict.\n"
+    "Respond with compact JSON only:\n"
+    '{"scores":{"option_a":{"harm_minimization":0-2,"rule_consistency":0-2,"autonomy_respect":0-2,"honesty":0-2,"fairness":0-2},'
+    '"option_b":{...same keys...}},"final_recommendation":"A or B","confidence":0-100,'
+    '"verdict":"2-3 sentence explanation of your decision"}'
+)
+
+
+def _clamp_score(value, default: float) -> float:
+    try:
+        score = min(max(float(value), 0.0), 2.0)
+    except (TypeError, ValueError):
+        return default
+    return int(score) if score.is_integer() else round(score, 2)
+
+
+def _clamp_confidence(value, default: int) -> int:
+    try:
+        return int(min(max(float(value), 0.0), 100.0))
+    except (TypeError, ValueError):
+        return default
+
+
+def _recommendation(value, default: str) -> str:
+    value = str(value or "").strip().upper()
+    if value in ("A", "B"):
+        return value
+    if "A" in value and "B" not in value:
+        return "A"
+    if "B" in value and "A" not in value:
+        return "B"
+    return default
+
+
+def format_turns(turns: List[dict]) -> str:
+    return "\n".join(
+        f"{t.get('agent')} ({t.get('stance') or '?'}): {' '.join(t.get('argument', '').split())}"
+        for t in turns
+    )
+
+
+def _accepts_cancel(fn: Callable) -> bool:
+    """Whether an LLM callable takes a `cancel` keyword"""
+    try:
+        parameters = inspect.signature(fn).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    return any(p.name == "cancel" or p.kind is inspect.Parameter.VAR_KEYWORD for p in parameters)
+
+
+class JudgeState:
+    """Running per-dimension scores and notes for one debate"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget all scored rounds; the lock is kept, since callers may be holding it"""
+        self.scores: Dict[str, Dict[str, float]] = {
+            option: {d: 1 for d in DIMENSIONS} for option in ("option_a", "option_b")
+        }
+        self.leaning = "A"
+        self.confidence = 50
+        self.rationale = ""
+        self.rounds_scored = 0
+        self.covered = 0
+        self.covered_digest = transcript_digest([])
+
+    def merge(self, update: dict) -> bool:
+        """Apply a parsed round update, ignoring malformed fields; returns whether it held any valid score"""
+        accepted = False
+        scores = update.get("scores")
+        if isinstance(scores, dict):
+            for option in ("option_a", "option_b"):
+                option_scores = scores.get(option)
+                if isinstance(option_scores, dict):
+                    for d in DIMENSIONS:
+                        score = _clamp_score(option_scores.get(d), None)
+                        if score is not None:
+                            self.scores[option][d] = score
+                            accepted = True
+        self.leaning = _recommendation(update.get("leaning"), self.leaning)
+        self.confidence = _clamp_confidence(update.get("confidence"), self.confidence)
+        rationale = " ".join(str(update.get("rationale", "")).split())
+        if rationale:
+            self.rationale = rationale[:400]
+        return accepted
+
+    def compact(self) -> dict:
+        return {
+            "scores": self.scores,
+            "leaning": self.leaning,
+            "confidence": self.confidence,
+            "notes": self.rationale,
+            "rounds_scored": self.rounds_scored
+        }
+
+
+class JudgeService:
+    """
+    Incremental judging.
+
+    After each completed round a small call updates running per-dimension
+    scores and a short rationale. The final verdict is then one short
+    consolidation call over that compact state plus any turns not yet scored,
+    instead of one large call over the whole transcript.
+    """
+
+    def __init__(self, llm: Callable[..., str], parse: Callable[[str, dict], dict],
+                 max_sessions: int = 500, ttl_seconds: float = 3600,
+                 ensemble_llms: Optional[Sequence[Callable[..., str]]] = None,
+                 ensemble_temperatures: Sequence[float] = (0.25, 0.5, 0.75)):
+        """
+        Initialize the judge service.
+
+        Args:
+            llm: Callable (system_prompt, user_prompt, num_predict=..., temp=...) -> str
+            parse: JSON extractor (raw_text, fallback) -> dict
+            max_sessions: Debates whose running scores are kept in memory
+            ttl_seconds: Idle time after which a debate's state is dropped
+            ensemble_llms: Callables ensemble members rotate through
+                           (e.g. one per provider and model); defaults to llm
+            ensemble_temperatures: Temperatures ensemble members rotate through
+        """
+        self.llm = llm
+        self.parse = parse
+        self.sessions = SessionCache(max_sessions, ttl_seconds)
+        self.ensemble_llms = list(ensemble_llms) if ensemble_llms else [llm]
+        self.ensemble_temperatures = list(ensemble_temperatures)
+
+    def _state(self, transcript: dict, agents: List[str]) -> JudgeState:
+        return self.sessions.get_or_create(session_key(transcript, agents), JudgeState)
+
+    def _sync(self, state: JudgeState, turns: List[dict]) -> None:
+        """Reset state that was built from a different transcript"""
+        if state.covered > len(turns) or state.covered_digest != transcript_digest(turns[:state.covered]):
+            state.reset()
+
+    def update_round(self, transcript: dict, agents: List[str]) -> dict:
+        """
+        Score any completed rounds that have not been scored yet.
+
+        Args:
+            transcript: {"dilemma": {...}, "turns": [...], "session_id": optional}
+            agents: Agents taking part in the debate
+
+        Returns:
+            Compact running state
+        """
+        turns = transcript.get("turns", [])
+        n_agents = max(len(agents), 1)
+        target = (len(turns) // n_agents) * n_agents
+
+        state = self._state(transcript, agents)
+        with state.lock:
+            self._sync(state, turns)
+            if state.covered < target:
+                new_turns = turns[state.covered:target]
+                prompt = (
+                    f"{self._dilemma_text(transcript)}\n"
+                    f"Running state: {json.dumps(state.compact(), separators=(',', ':'))}\n\n"
+                    f"New turns:\n{format_turns(new_turns)}"
+                )
+                try:
+                    raw = self.llm(ROUND_JUDGE_SYS, prompt, num_predict=220, temp=0.25)
+                    parsed = self.parse(raw, {})
+                except Exception as e:
+                    log.warning("Incremental judge update failed: %s", e)
+                    parsed = None
+                if parsed is None or not state.merge(parsed):
+                    # Leave the turns unscored: the next update or the final
+                    # verdict sends them again
+                    log.warning("Incremental judge update scored nothing; %d turns stay unscored",
+                                target - state.covered)
+                    return copy.deepcopy(state.compact())
+                state.rounds_scored += (target - state.covered) // n_agents
+                state.covered = target
+                state.covered_digest = transcript_digest(turns[:target])
+            return copy.deepcopy(state.compact())
+
+    def final_verdict(self, transcript: dict, agents: List[str]) -> dict:
+        """
+        Consolidate the running state into a verdict with one short call.
+
+        Returns a verdict in the same shape as the full /judge call.
+        """
+        turns = transcript.get("turns", [])
+        state = self._state(transcript, agents)
+
+        with state.lock:
+            self._sync(state, turns)
+            remaining = turns[state.covered:]
+            prompt = (
+                f"{self._dilemma_text(transcript)}\n"
+                f"Running state: {json.dumps(state.compact(), separators=(',', ':'))}\n\n"
+                f"Final turns not yet scored:\n{format_turns(remaining) or '(none)'}"
+            )
+            fallback = self.fallback_verdict(state)
+            try:
+                raw = self.llm(CONSOLIDATE_SYS, prompt, num_predict=300, temp=0.25)
+                parsed = self.parse(raw, {})
+            except Exception as e:
+                log.warning("Judge consolidation failed, using running scores: %s", e)
+                parsed = {}
+
+            state.merge({k: v for k, v in parsed.items() if k in ("scores", "confidence")})
+            verdict = {
+                "scores": state.scores,
+                "final_recommendation": _recommendation(parsed.get("final_recommendation"),
+                                                        fallback["final_recommendation"]),
+                "confidence": state.confidence,
+                "verdict": " ".join(str(parsed.get("verdict", "")).split()) or fallback["verdict"],
+                "judge_mode": "incremental",
+                "rounds_scored": state.rounds_scored
+            }
+            return copy.deepcopy(verdict)
+
+    def fallback_verdict(self, state: JudgeState) -> dict:
+        """Verdict derived from the running scores alone"""
+        total_a = sum(state.scores["option_a"].values())
+        total_b = sum(state.scores["option_b"].values())
+        if total_a == total_b:
+            recommendation = state.leaning
+        else:
+            recommendation = "A" if total_a > total_b else "B"
+        return {
+            "scores": state.scores,
+            "final_recommendation": recommendation,
+            "confidence": state.confidence,
+            "verdict": state.rationale or "—"
+        }
+
+    def ensemble_verdict(self, system_prompt: str, user_prompt: str, k: int = 3,
+                         quorum: Optional[int] = None, num_predict: int = 600,
+                         timeout: Optional[float] = None) -> dict:
+        """
+        Fire k judge calls concurrently and aggregate the verdicts.
+
+        Members rotate through ensemble_llms and ensemble_temperatures. Returns
+        as soon as `quorum` valid verdicts (default: a majority of k) have
+        arrived. Members that haven't started are dropped; running ones are
+        signalled through a cancel token (for ensemble callables that take a
+        `cancel` argument), so stragglers waiting for rate-limit budget are
+        never sent and streaming ones close their connection. A completion
+        the provider is already generating remotely can't be recalled; its
+        result is discarded.
+
+        Args:
+            system_prompt: Judge system prompt
+            user_prompt: Judge input
+            k: Number of concurrent judge calls
+            quorum: Valid verdicts needed before returning
+            num_predict: Token budget per call
+            timeout: Overall wait limit in seconds
+
+        Returns:
+            Aggregated verdict with an 'ensemble' block describing agreement
+        """
+        k = max(int(k), 1)
+        quorum = min(max(int(quorum or k // 2 + 1), 1), k)
+
+        cancel = CancelToken()
+
+        def member(i: int) -> dict:
+            llm = self.ensemble_llms[i % len(self.ensemble_llms)]
+            temp = self.ensemble_temperatures[i % len(self.ensemble_temperatures)]
+            kwargs = {"cancel": cancel} if _accepts_cancel(llm) else {}
+            verdict = self.parse(llm(system_prompt, user_prompt, num_predict=num_predict, temp=temp, **kwargs), {})
+            if not isinstance(verdict.get("scores"), dict) and "final_recommendation" not in verdict:
+                raise ValueError("judge response had no verdict")
+            return verdict
+
+        executor = ThreadPoolExecutor(max_workers=k, thread_name_prefix="judge-ensemble")
+        # Each member runs in a copy of the caller's context so its spans join the request trace
+        pending = {executor.submit(contextvars.copy_context().run, member, i) for i in range(k)}
+        verdicts, errors = [], []
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        try:
+            while pending and len(verdicts) < quorum:
+                remaining = max(deadline - time.monotonic(), 0) if deadline is not None else None
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    try:
+                        verdicts.append(future.result())
+                    except Exception as e:
+                        errors.append(str(e))
+        finally:
+            cancel.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if not verdicts:
+            raise RuntimeError(f"No judge in the ensemble returned a verdict: {errors[:3]}")
+
+        aggregated = self.aggregate_verdicts(verdicts)
+        aggregated["ensemble"].update({"requested": k, "quorum": quorum, "failed": len(errors)})
+        return aggregated
+
+    @staticmethod
+    def aggregate_verdicts(verdicts: List[dict]) -> dict:
+        """
+        Combine several judge verdicts robustly.
+
+        Scores are the per-dimension median; the recommendation is the majority
+        vote (ties broken by total median score); confidence is the median
+        confidence of the agreeing judges scaled by the agreement ratio.
+        """
+        scores = {}
+        for option in ("option_a", "option_b"):
+            scores[option] = {}
+            for d in DIMENSIONS:
+                values = [
+                    _clamp_score(v["scores"][option][d], None)
+                    for v in verdicts
+                    if isinstance(v.get("scores"), dict)
+                    and isinstance(v["scores"].get(option), dict)
+                    and d in v["scores"][option]
+                ]
+                values = [x for x in values if x is not None]
+                if values:
+                    scores[option][d] = _clamp_score(statistics.median(values), 1)
+
+        votes = {"A": 0, "B": 0}
+        for v in verdicts:
+            votes[_recommendation(v.get("final_recommendation"), "A")] += 1
+        if votes["A"] != votes["B"]:
+            recommendation = "A" if votes["A"] > votes["B"] else "B"
+        else:
+            total_a = sum(scores["option_a"].values())
+            total_b = sum(scores["option_b"].values())
+            recommendation = "B" if total_b > total_a else "A"
+        agreement = votes[recommendation] / len(verdicts)
+
+        agreeing = [v for v in verdicts if _recommendation(v.get("final_recommendation"), "A") == recommendation]
+        confidences = [_clamp_confidence(v.get("confidence"), 50) for v in agreeing] or [50]
+        median_confidence = statistics.median(confidences)
+
+        # Explanation from the agreeing judge closest to the median confidence
+        representative = min(agreeing or verdicts,
+                             key=lambda v: abs(_clamp_confidence(v.get("confidence"), 50) - median_confidence))
+
+        return {
+            "scores": scores,
+            "final_recommendation": recommendation,
+            "confidence": int(round(median_confidence * agreement)),
+            "verdict": representative.get("verdict", "—"),
+            "judge_mode": "ensemble",
+            "ensemble": {
+                "responded": len(verdicts),
+                "votes": votes,
+                "agreement": round(agreement, 2),
+                "confidence_spread": max(confidences) - min(confidences)
+            }
+        }
+
+    @staticmethod
+    def _dilemma_text(transcript: dict) -> str:
+        d = transcript.get("dilemma", {})
+        return (
+            f"DILEMMA: {d.get('title', '')}\n"
+            f"Option A: {d.get('A', '')}\nOption B: {d.get('B', '')}\n"
+            f"Constraints: {d.get('constraints', '')}"
+        )
@@ -0,0 +1,123 @@
+# backend/services/lazy.py
+"""
+Deferred construction of module-level services.
+
+main used to build every service (and import everything they need: numpy,
+the Groq SDK) before the app could accept a connection. Wrapping a
+constructor in LazyService postpones it to the first attribute access, and
+preload() builds the wrapped services from a background thread once the
+server is up, so the first request rarely waits either. lazy_import()
+does the same for a module only some code paths need.
+"""
+import importlib.util
+import logging
+import sys
+import threading
+import time
+import types
+from typing import Callable, Dict, Iterable, Optional
+
+log = logging.getLogger(__name__)
+
+
+class LazyService:
+    """Stands in for a service and builds it on first use"""
+
+    def __init__(self, factory: Callable[[], object], name: Optional[str] = None):
+        """
+        Initialize the proxy.
+
+        Args:
+            factory: Builds the service; called once, under a lock
+            name: Label for logs and preload timings
+        """
+        self._factory = factory
+        self._name = name or getattr(factory, "__name__", "service")
+        self._instance = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def get(self):
+        """The service, built on the first call"""
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+                instance = self._instance
+        return instance
+
+    def __getattr__(self, attr: str):
+        # Only reached for names the proxy itself doesn't have
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
+
+    def __repr__(self) -> str:
+        return f"<LazyService {self._name} {'loaded' if self.loaded else 'pending'}>"
+
+
+class _LazyModule(types.ModuleType):
+    """A module whose body runs on its first attribute access, once, under a lock"""
+
+    def __getattribute__(self, attr):
+        state = object.__getattribute__(self, "__spec__").loader_state
+        with state["lock"]:
+            # Threads that waited here find the module loaded; the loading
+            # thread itself sees the partial module, as in an import cycle
+            if object.__getattribute__(self, "__class__") is _LazyModule and not state["loading"]:
+                state["loading"] = True
+                try:
+                    state["loader"].exec_module(self)
+                finally:
+                    state["loading"] = False
+                self.__class__ = types.ModuleType
+        return types.ModuleType.__getattribute__(self, attr)
+
+
+def lazy_import(name: str):
+    """
+    A module that is only executed when one of its attributes is first used.
+
+    importlib's LazyLoader recipe, except that the first access holds a lock
+    until the module body has finished: before Python 3.12, LazyLoader let
+    a second thread read attributes of a module still being executed.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named {name!r}")
+    if not hasattr(spec.loader, "exec_module"):
+        raise TypeError(f"{name!r} has a loader that cannot be deferred")
+    spec.loader_state = {"loader": spec.loader, "lock": threading.RLock(), "loading": False}
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    module.__class__ = _LazyModule
+    return module
+
+
+def preload(services: Iterable[LazyService]) -> Dict[str, float]:
+    """
+    Build services that haven't been built yet.
+
+    Returns:
+        Seconds spent per service name; failures are logged and left for
+        the first request to retry
+    """
+    timings = {}
+    for service in services:
+        if service.loaded:
+            continue
+        start = time.perf_counter()
+        try:
+            service.get()
+        except Exception as e:
+            log.warning("Preloading %s failed: %s", service._name, e)
+            continue
+        timings[service._name] = round(time.perf_counter() - start, 4)
+    return timings
@@ -0,0 +1,314 @@
+# backend/services/library_audit_service.py
+import os
+import tempfile
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from services.debate_deduplication_service import DebateDeduplicationService
+
+
+class DuplicateCluster:
+    """A group of library templates that are near-duplicates of each other"""
+
+    def __init__(self, canonical: dict, duplicates: List[dict],
+                 min_score: float, max_score: float):
+        self.canonical = canonical
+        self.duplicates = duplicates
+        self.min_score = min_score
+        self.max_score = max_score
+
+    @property
+    def size(self) -> int:
+        return 1 + len(self.duplicates)
+
+    def to_dict(self) -> dict:
+        """Convert to dictionary for reports"""
+        return {
+            'canonical': {k: self.canonical.get(k) for k in ('id', 'slug', 'title')},
+            'duplicates': [
+                {'id': d.get('id'), 'slug': d.get('slug'), 'title': d.get('title'),
+                 'similarity_score': round(d.get('similarity_score', 0.0), 4)}
+                for d in self.duplicates
+            ],
+            'size': self.size,
+            'min_score': round(self.min_score, 4),
+            'max_score': round(self.max_score, 4)
+        }
+
+
+class LibraryAuditService:
+    """
+    Offline audit of the debate template library.
+
+    Finds near-duplicate templates that slipped in before deduplication existed
+    (or through manual edits) by computing the all-pairs similarity structure
+    with blocked matrix multiplication. Only one block x block tile of scores is
+    held in memory at a time, and embeddings are spilled to a disk-backed
+    memmap for large libraries, so memory stays bounded at 100k+ templates.
+    """
+
+    def __init__(self, deduplication_service: Optional[DebateDeduplicationService] = None,
+                 threshold: Optional[float] = None,
+                 block_size: int = 2048,
+                 memmap_threshold: int = 20000):
+        """
+        Initialize the audit service.
+
+        Args:
+            deduplication_service: Service owning the templates file (creates default if not provided)
+            threshold: Similarity at or above which two templates are duplicates
+                       (defaults to the live deduplication threshold)
+            block_size: Rows/columns per similarity tile
+            memmap_threshold: Library size above which embeddings are stored on disk
+        """
+        self.deduplication_service = deduplication_service or DebateDeduplicationService()
+        self.embedding_service = self.deduplication_service.embedding_service
+        self.threshold = threshold if threshold is not None else DebateDeduplicationService.HIGH_SIMILARITY_THRESHOLD
+        self.block_size = block_size
+        self.memmap_threshold = memmap_threshold
+
+    def compute_embeddings(self, templates: List[dict], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Embed every template into a (n, dim) float32 matrix of unit vectors.
+
+        Args:
+            templates: Library templates
+            out: Optional preallocated (possibly memmapped) array to fill
+
+        Returns:
+            Embedding matrix
+        """
+        for i, template in enumerate(templates):
+            embedding = self.embedding_service.generate_debate_embedding(template)
+            if out is None:
+                out = np.empty((len(templates), embedding.shape[0]), dtype=np.float32)
+            out[i] = embedding
+
+        if out is None:
+            out = np.empty((0, 0), dtype=np.float32)
+
+        return out
+
+    def iter_similar_pairs(self, embeddings: np.ndarray) -> Iterator[Tuple[int, int, float]]:
+        """
+        Yield (i, j, score) for every pair i < j with similarity >= threshold.
+
+        Embeddings are already L2-normalised, so a tile of cosine similarities
+        is a single matrix product. Tiles below the diagonal are skipped.
+
+        Args:
+            embeddings: (n, dim) matrix of unit vectors
+        """
+        n = embeddings.shape[0]
+        block = self.block_size
+
+        for i0 in range(0, n, block):
+            i1 = min(i0 + block, n)
+            rows = np.asarray(embeddings[i0:i1])
+
+            for j0 in range(i0, n, block):
+                j1 = min(j0 + block, n)
+                cols = np.asarray(embeddings[j0:j1])
+
+                scores = rows @ cols.T
+                if j0 == i0:
+                    # Diagonal tile: only keep the strict upper triangle
+                    scores = np.triu(scores, k=1)
+
+                hit_rows, hit_cols = np.nonzero(scores >= self.threshold)
+                for r, c in zip(hit_rows.tolist(), hit_cols.tolist()):
+                    yield i0 + r, j0 + c, float(min(scores[r, c], 1.0))
+
+    def find_clusters(self, templates: Optional[List[dict]] = None) -> List[DuplicateCluster]:
+        """
+        Group the library into clusters of near-duplicate templates.
+
+        Candidates are the connected components of the "similarity >= threshold"
+        graph. Only a parent array and a best-score array of length n are kept,
+        so memory does not grow with the number of matching pairs. Components
+        are chained (A~B and B~C does not mean A~C), so each one is then split
+        around its canonical template: only members at or above the threshold
+        against the canonical join its cluster, and the rest are grouped again
+        among themselves.
+
+        Args:
+            templates: Templates to audit (defaults to the library on disk)
+
+        Returns:
+            Clusters with two or more members, largest first
+        """
+        if templates is None:
+            templates = self.deduplication_service._load_templates()
+
+        n = len(templates)
+        if n < 2:
+            return []
+
+        parent = np.arange(n, dtype=np.int64)
+        best_score = np.zeros(n, dtype=np.float32)
+
+        def find(x: int) -> int:
+            root = x
+            while parent[root] != root:
+                root = parent[root]
+            # Path compression
+            while parent[x] != root:
+                parent[x], x = root, parent[x]
+            return int(root)
+
+        with tempfile.TemporaryDirectory(prefix="library_audit_") as tmp_dir:
+            out = None
+            if n > self.memmap_threshold:
+                dim = self.embedding_service.generate_debate_embedding(templates[0]).shape[0]
+                out = np.lib.format.open_memmap(
+                    os.path.join(tmp_dir, "embeddings.npy"),
+                    mode='w+', dtype=np.float32, shape=(n, dim)
+                )
+
+            embeddings = self.compute_embeddings(templates, out=out)
+
+            for i, j, score in self.iter_similar_pairs(embeddings):
+                best_score[i] = max(best_score[i], score)
+                best_score[j] = max(best_score[j], score)
+                root_i, root_j = find(i), find(j)
+                if root_i != root_j:
+                    parent[max(root_i, root_j)] = min(root_i, root_j)
+
+            members = {}
+            for i in range(n):
+                if best_score[i] > 0:
+                    members.setdefault(find(i), []).append(i)
+
+            clusters = []
+            for indices in members.values():
+                clusters.extend(self._split_component(templates, embeddings, indices))
+
+            del embeddings, out
+
+        clusters.sort(key=lambda c: (c.size, c.max_score), reverse=True)
+        return clusters
+
+    def merge_clusters(self, clusters: List[DuplicateCluster],
+                       templates: Optional[List[dict]] = None) -> List[dict]:
+        """
+        Collapse each cluster into its canonical template and persist the library.
+
+        Removed slugs are recorded on the canonical template under 'merged_slugs'
+        so existing links keep resolving.
+
+        Args:
+            clusters: Clusters returned by find_clusters
+            templates: Library templates (defaults to the library on disk)
+
+        Returns:
+            The merged library
+        """
+        if templates is None:
+            templates = self.deduplication_service._load_templates()
+
+        removed_ids = set()
+        merged_slugs = {}
+        for cluster in clusters:
+            canonical_id = cluster.canonical.get('id')
+            for duplicate in cluster.duplicates:
+                removed_ids.add(duplicate.get('id'))
+                slugs = [duplicate.get('slug')] + duplicate.get('merged_slugs', [])
+                merged_slugs.setdefault(canonical_id, []).extend(s for s in slugs if s)
+
+        merged = []
+        for template in templates:
+            template_id = template.get('id')
+            if template_id in removed_ids:
+                continue
+            if template_id in merged_slugs:
+                template = template.copy()
+                existing = template.get('merged_slugs', [])
+                template['merged_slugs'] = existing + [s for s in merged_slugs[template_id] if s not in existing]
+            merged.append(template)
+
+        self.deduplication_service._save_templates(merged)
+        return merged
+
+    def run(self, merge: bool = False) -> dict:
+        """
+        Audit the library and optionally merge the duplicates found.
+
+        Args:
+            merge: Rewrite the library with each cluster collapsed
+
+        Returns:
+            Report dictionary
+        """
+        templates = self.deduplication_service._load_templates()
+        clusters = self.find_clusters(templates)
+
+        report = {
+            'audited_at': datetime.now().isoformat(),
+            'templates_path': str(self.deduplication_service.templates_path),
+            'total_templates': len(templates),
+            'threshold': self.threshold,
+            'cluster_count': len(clusters),
+            'duplicate_count': sum(len(c.duplicates) for c in clusters),
+            'clusters': [c.to_dict() for c in clusters],
+            'merged': False
+        }
+
+        if merge and clusters:
+            merged = self.merge_clusters(clusters, templates)
+            report['merged'] = True
+            report['templates_after_merge'] = len(merged)
+
+        return report
+
+    def _split_component(self, templates: List[dict], embeddings: np.ndarray,
+                         indices: List[int]) -> List[DuplicateCluster]:
+        """
+        Split one connected component into clusters whose members are all
+        duplicates of the cluster's canonical template.
+
+        Args:
+            templates: Library templates
+            embeddings: (n, dim) matrix of unit vectors
+            indices: Template positions in the component
+
+        Returns:
+            Clusters with two or more members
+        """
+        clusters = []
+        remaining = list(indices)
+        while len(remaining) >= 2:
+            canonical = self._choose_canonical([templates[i] for i in remaining])
+            canonical_index = next(i for i in remaining if templates[i] is canonical)
+            scores = np.asarray(embeddings[remaining]) @ np.asarray(embeddings[canonical_index])
+
+            duplicates = []
+            rest = []
+            for i, score in zip(remaining, scores.tolist()):
+                if i == canonical_index:
+                    continue
+                if score >= self.threshold:
+                    duplicate = templates[i].copy()
+                    duplicate['similarity_score'] = float(min(score, 1.0))
+                    duplicates.append(duplicate)
+                else:
+                    rest.append(i)
+            remaining = rest
+
+            if not duplicates:
+                continue
+            dup_scores = [d['similarity_score'] for d in duplicates]
+            canonical = canonical.copy()
+            canonical['similarity_score'] = max(dup_scores)
+            clusters.append(DuplicateCluster(
+                canonical=canonical,
+                duplicates=duplicates,
+                min_score=min(dup_scores),
+                max_score=max(dup_scores)
+            ))
+        return clusters
+
+    def _choose_canonical(self, group: List[dict]) -> dict:
+        """Prefer curated (non-custom) templates, then the oldest ID"""
+        return min(group, key=lambda t: (bool(t.get('is_custom', False)), t.get('id', 0)))
@@ -0,0 +1,229 @@
+# backend/services/llm_replay.py
+"""
+Record and replay of LLM traffic.
+
+TrafficRecorder sits around call_ollama and appends every call (prompts,
+parameters, raw response or error, latency) to a gzip'd JSON-lines
+archive. System prompts and schemas repeat on nearly every call, so each
+distinct one is written once and referenced by id.
+
+ReplayProvider serves an archive back through the provider interface
+(AI_PROVIDER=replay): each request gets the response recorded for the
+same prompts, in recorded order, after the recorded latency (optionally
+scaled). Malformed outputs and errors come back exactly as they did in
+production, so parsing, retry and judge changes can be measured on a
+real workload.
+"""
+import atexit
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterator, List, Optional
+
+
+class ReplayError(RuntimeError):
+    """A recorded upstream failure, or a request with no recording"""
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def replay_key(system_prompt: str, user_prompt: str, schema: Optional[dict], temp: float) -> str:
+    """
+    Match key for a request.
+
+    num_predict is left out on purpose: adaptive budgets change it between
+    the recording and the replay while the request stays the same.
+    """
+    payload = json.dumps([system_prompt, user_prompt, schema, round(float(temp), 3)], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TrafficRecorder:
+    """Appends LLM calls to a compact archive"""
+
+    def __init__(self, path: str):
+        """
+        Initialize the recorder.
+
+        Args:
+            path: Archive file; appended to (as a new gzip member) if it exists
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, "at", encoding="utf-8")
+        self._interned = set()
+        self.recorded = 0
+        atexit.register(self.close)
+
+    def call(self, fn: Callable[[], str], endpoint: str, system_prompt: str, user_prompt: str,
+             schema: Optional[dict] = None, params: Optional[Dict] = None) -> str:
+        """Run `fn` (the LLM call) and record it with its outcome and latency"""
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            self.record(endpoint, system_prompt, user_prompt, schema, params,
+                        error=f"{type(e).__name__}: {e}", latency=time.perf_counter() - start)
+            raise
+        self.record(endpoint, system_prompt, user_prompt, schema, params,
+                    response=result, latency=time.perf_counter() - start)
+        return result
+
+    def record(self, endpoint: str, system_prompt: str, user_prompt: str, schema: Optional[dict],
+               params: Optional[Dict], response: Optional[str] = None, error: Optional[str] = None,
+               latency: float = 0.0):
+        schema_text = json.dumps(schema, sort_keys=True) if schema is not None else None
+        entry = {
+            "t": "call",
+            "ts": round(time.time(), 3),
+            "endpoint": endpoint,
+            "system": _digest(system_prompt),
+            "schema": _digest(schema_text) if schema_text is not None else None,
+            "user": user_prompt,
+            "params": params or {},
+            "response": response,
+            "error": error,
+            "latency_ms": round(latency * 1000, 1)
+        }
+        with self._lock:
+            self._intern(entry["system"], system_prompt)
+            if schema_text is not None:
+                self._intern(entry["schema"], schema_text)
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+            self.recorded += 1
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def _intern(self, ref: str, text: str):
+        if ref not in self._interned:
+            self._interned.add(ref)
+            self._file.write(json.dumps({"t": "text", "id": ref, "text": text}, ensure_ascii=False) + "\n")
+
+
+def read_archive(path: str) -> Iterator[Dict]:
+    """Yield recorded calls with system prompts and schemas resolved"""
+    texts = {}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in _lines(f):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Torn final line from a process that was killed mid-write
+                continue
+            if entry.get("t") == "text":
+                texts[entry["id"]] = entry["text"]
+                continue
+            entry["system"] = texts.get(entry["system"], "")
+            schema_ref = entry.get("schema")
+            entry["schema"] = json.loads(texts[schema_ref]) if schema_ref in texts else None
+            yield entry
+
+
+def _shape(system_prompt: str, schema: Optional[dict]) -> str:
+    """System prompt plus output fields: tells e.g. an opening from a rebuttal by the same agent"""
+    fields = sorted((schema or {}).get("properties", {}))
+    return _digest(system_prompt + "\x00" + ",".join(fields))
+
+
+def _lines(f) -> Iterator[str]:
+    # Every record is flushed, so an archive whose writer was killed is
+    # readable up to the missing end-of-stream marker
+    try:
+        yield from f
+    except EOFError:
+        return
+
+
+class ReplayProvider:
+    """Serves recorded responses deterministically through the provider interface"""
+
+    name = "replay"
+
+    def __init__(self, calls: List[Dict], time_scale: float = 1.0, strict: bool = False,
+                 name: Optional[str] = None):
+        """
+        Initialize the replay provider.
+
+        Args:
+            calls: Recorded calls, as yielded by read_archive
+            time_scale: Multiplier on recorded latencies (1 = original
+                timing, 0 = no delay)
+            strict: Fail requests with no exact recording instead of serving
+                one made with the same system prompt and output fields
+            name: Label in stats and routing
+        """
+        if name:
+            self.name = name
+        self.time_scale = time_scale
+        self.strict = strict
+        self._exact: Dict[str, List[Dict]] = defaultdict(list)
+        self._by_shape: Dict[str, List[Dict]] = defaultdict(list)
+        for call in calls:
+            key = replay_key(call["system"], call["user"], call["schema"], call["params"].get("temp", 0.7))
+            self._exact[key].append(call)
+            self._by_shape[_shape(call["system"], call["schema"])].append(call)
+        self._cursor: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self.counts = {"exact": 0, "fallback": 0, "miss": 0}
+
+    @classmethod
+    def from_archive(cls, path: str, **kwargs) -> "ReplayProvider":
+        return cls(list(read_archive(path)), **kwargs)
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._exact.values())
+
+    def generate(self, system_prompt: str, user_prompt: str, num_predict: int, temp: float,
+                 top_p: float, repeat_penalty: float, schema: Optional[dict] = None,
+                 cancel: Optional[threading.Event] = None, priority: int = 1,
+                 stop: Optional[List[str]] = None) -> str:
+        call = self._lookup(system_prompt, user_prompt, schema, temp)
+        delay = call["latency_ms"] / 1000 * self.time_scale
+        if cancel is not None:
+            if cancel.wait(delay):
+                raise ReplayError("cancelled")
+        elif delay > 0:
+            time.sleep(delay)
+        if call["error"] is not None:
+            raise ReplayError(call["error"])
+        text = call["response"] or ""
+        for s in stop or ():
+            i = text.find(s)
+            if i >= 0:
+                text = text[:i]
+        return text
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {"recorded": len(self), **self.counts}
+
+    def _lookup(self, system_prompt: str, user_prompt: str, schema: Optional[dict], temp: float) -> Dict:
+        """Next recording for the request; repeated requests walk through their recordings in order"""
+        key = replay_key(system_prompt, user_prompt, schema, temp)
+        with self._lock:
+            if key in self._exact:
+                pool, kind = self._exact[key], "exact"
+            elif not self.strict and _shape(system_prompt, schema) in self._by_shape:
+                # Same agent and kind of call, different prompt text (another
+                # dilemma, or a transcript that has drifted from the recording)
+                key = _shape(system_prompt, schema)
+                pool, kind = self._by_shape[key], "fallback"
+            else:
+                self.counts["miss"] += 1
+                raise ReplayError("No recorded response for this request")
+            i = self._cursor[key]
+            self._cursor[key] = i + 1
+            self.counts[kind] += 1
+            return pool[i % len(pool)]
@@ -0,0 +1,1148 @@
+# backend/services/llm_service.py
+"""
+LLM provider layer.
+
+Wraps the Groq and Ollama backends behind one `generate` call that tries
+providers in order, and adds schema-constrained (JSON mode) generation so
+agent turns and verdicts come back parseable on the first attempt. When
+the primary provider is slower than its own p95, the request is hedged to
+the next provider and the first answer wins. Each provider sits behind a
+circuit breaker so a failing backend is skipped instead of waited on.
+Identical concurrent requests on opted-in endpoints share one upstream call.
+Every provider call is measured (latency, time to first token, queue wait,
+tokens) into Prometheus-style series.
+"""
+import contextvars
+import hashlib
+import itertools
+import json
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, CancelledError, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FuturesTimeout
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from services.lazy import lazy_import
+from services.telemetry import TOKEN_BUCKETS, MetricsRegistry
+from services.tracing import tracer
+from services.token_budget import BudgetController
+from services.rate_limiter import (
+    ENDPOINT_PRIORITIES, PRIORITY_DEBATE, RateLimiter, RateLimitExceeded, estimate_tokens
+)
+
+log = logging.getLogger(__name__)
+
+# Only Ollama needs requests; Groq-only deployments skip its import at startup
+requests = lazy_import("requests")
+
+
+# -------------------- OUTPUT SCHEMAS --------------------
+AGENT_TURN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "stance": {"type": "string", "enum": ["A", "B"]},
+        "argument": {"type": "string"}
+    },
+    "required": ["stance", "argument"]
+}
+
+_SCORE = {"type": "integer", "minimum": 0, "maximum": 2}
+_OPTION_SCORES = {
+    "type": "object",
+    "properties": {d: _SCORE for d in
+                   ("harm_minimization", "rule_consistency", "autonomy_respect", "honesty", "fairness")},
+    "required": ["harm_minimization", "rule_consistency", "autonomy_respect", "honesty", "fairness"]
+}
+
+VERDICT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "scores": {
+            "type": "object",
+            "properties": {"option_a": _OPTION_SCORES, "option_b": _OPTION_SCORES},
+            "required": ["option_a", "option_b"]
+        },
+        "final_recommendation": {"type": "string", "enum": ["A", "B"]},
+        "confidence": {"type": "integer", "minimum": 0, "maximum": 100},
+        "verdict": {"type": "string"}
+    },
+    "required": ["scores", "final_recommendation", "confidence", "verdict"]
+}
+
+
+def agent_turn_schema(opponents: Optional[List[str]] = None) -> dict:
+    """
+    Schema for a rebuttal turn.
+
+    Adds an `opponent` field restricted to the agents actually in the debate,
+    so a turn that forgets to name its target can be repaired instead of
+    regenerated.
+    """
+    if not opponents:
+        return AGENT_TURN_SCHEMA
+    return {
+        "type": "object",
+        "properties": {
+            "stance": {"type": "string", "enum": ["A", "B", "same"]},
+            "opponent": {"type": "string", "enum": list(opponents)},
+            "argument": {"type": "string"}
+        },
+        "required": ["stance", "opponent", "argument"]
+    }
+
+
+# -------------------- CALL DETAILS --------------------
+class CallInfo:
+    """What a provider learned about the call it served; unknowns stay None"""
+
+    __slots__ = ("prompt_tokens", "completion_tokens", "queue_wait", "ttft")
+
+    def __init__(self):
+        self.prompt_tokens: Optional[int] = None
+        self.completion_tokens: Optional[int] = None
+        self.queue_wait: Optional[float] = None
+        self.ttft: Optional[float] = None
+
+
+_CALL_INFO: ContextVar[Optional[CallInfo]] = ContextVar("llm_call_info", default=None)
+
+
+class CancelToken(threading.Event):
+    """
+    An Event that also sets the tokens derived from it. A hedged call runs
+    each leg under its own child token, so cancelling the caller's token
+    stops both legs while a lost race only stops the loser.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._children: List["CancelToken"] = []
+        self._children_lock = threading.Lock()
+
+    def child(self) -> "CancelToken":
+        token = CancelToken()
+        with self._children_lock:
+            self._children.append(token)
+            if self.is_set():
+                token.set()
+        return token
+
+    def set(self):
+        with self._children_lock:
+            super().set()
+            children = list(self._children)
+        for token in children:
+            token.set()
+
+
+def call_info() -> CallInfo:
+    """The CallInfo of the provider call in progress (a throwaway one outside LLMService)"""
+    info = _CALL_INFO.get()
+    return info if info is not None else CallInfo()
+
+
+# -------------------- PROVIDERS --------------------
+class GroqProvider:
+    """Groq chat completions; JSON mode via response_format"""
+
+    name = "groq"
+
+    def __init__(self, client, model: str, limiter: Optional[RateLimiter] = None,
+                 queue_timeout: float = 20, name: Optional[str] = None):
+        """
+        Args:
+            client: groq.Groq client (or a LazyService building one; it is
+                not touched until the first request)
+            model: Model name
+            limiter: Client-side RPM/TPM scheduler; requests wait for budget
+                instead of bursting into 429s
+            queue_timeout: Longest a request waits for budget before giving
+                up so the caller can fall back
+            name: Label in stats (defaults to "groq")
+        """
+        if name:
+            self.name = name
+        self.model = model
+        self.limiter = limiter
+        self.queue_timeout = queue_timeout
+        self._client = client
+        self._client_configured = limiter is None
+
+    @property
+    def client(self):
+        if not self._client_configured:
+            # The scheduler paces requests itself; the SDK's own 429 retries
+            # would only stall the fallback
+            self._client = self._client.with_options(max_retries=0)
+            self._client_configured = True
+        return self._client
+
+    def generate(self, system_prompt: str, user_prompt: str, num_predict: int, temp: float,
+                 top_p: float, repeat_penalty: float, schema: Optional[dict] = None,
+                 cancel: Optional[threading.Event] = None, priority: int = PRIORITY_DEBATE,
+                 stop: Optional[List[str]] = None) -> str:
+        # A remote completion can't be recalled once sent: `cancel` is only
+        # honoured up to that point, after that the result is discarded
+        kwargs = {}
+        if schema is not None:
+            # Groq's JSON mode guarantees a JSON object but not a particular schema;
+            # the prompt still describes the fields
+            kwargs["response_format"] = {"type": "json_object"}
+        if stop:
+            kwargs["stop"] = stop
+
+        info = call_info()
+        estimated = estimate_tokens(system_prompt, user_prompt, max_tokens=num_predict)
+        if self.limiter is not None:
+            waited = time.perf_counter()
+            granted = self.limiter.acquire(estimated, priority, self.queue_timeout)
+            info.queue_wait = time.perf_counter() - waited
+            if not granted:
+                raise RateLimitExceeded(f"Groq budget not available within {self.queue_timeout}s")
+        if cancel is not None and cancel.is_set():
+            # Cancelled while queued: hand the reserved budget back unsent
+            if self.limiter is not None:
+                self.limiter.reconcile(estimated, 0)
+            raise CancelledError("request cancelled")
+
+        try:
+            raw = self.client.chat.completions.with_raw_response.create(
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                model=self.model,
+                temperature=temp,
+                max_tokens=num_predict,
+                top_p=top_p,
+                **kwargs
+            )
+        except Exception as e:
+            response = getattr(e, "response", None)
+            if self.limiter is not None and response is not None:
+                self.limiter.update_from_headers(response.headers)
+            # JSON mode rejects output that doesn't validate, but still returns it;
+            # hand it to the caller's parser rather than paying for another call
+            failed = _failed_generation(e)
+            if failed:
+                return failed.strip()
+            raise
+
+        chat_completion = raw.parse()
+        usage = getattr(chat_completion, "usage", None)
+        if usage is not None:
+            info.prompt_tokens = getattr(usage, "prompt_tokens", None)
+            info.completion_tokens = getattr(usage, "completion_tokens", None)
+            # Groq reports server-side queueing and prompt processing separately
+            server_times = [getattr(usage, f, None) for f in ("queue_time", "prompt_time")]
+            if all(isinstance(t, (int, float)) for t in server_times):
+                info.ttft = sum(server_times)
+        if self.limiter is not None:
+            if usage is not None and getattr(usage, "total_tokens", None):
+                self.limiter.reconcile(estimated, usage.total_tokens)
+            # Headers already reflect this call, so they are applied last
+            self.limiter.update_from_headers(raw.headers)
+        return chat_completion.choices[0].message.content.strip()
+
+
+class OllamaProvider:
+    """
+    Ollama, via /api/chat (default) or the raw /api/generate prompt.
+
+    Chat mode sends the system prompt as its own message, so the model's
+    chat template puts it first and byte-identical across turns; the
+    server's prompt cache then reuses the evaluated agent persona and only
+    the new user turn is processed. Schemas go in the `format` field.
+    """
+
+    name = "ollama"
+
+    def __init__(self, host: str, model: str, api_key: Optional[str] = None, timeout: float = 240,
+                 name: Optional[str] = None, use_chat: bool = True, keep_alive: Optional[str] = "30m"):
+        """
+        Args:
+            host: Base URL, e.g. http://localhost:11434
+            model: Model tag
+            api_key: Bearer token for hosted Ollama
+            timeout: Request timeout, seconds
+            name: Label in stats (defaults to "ollama")
+            use_chat: Use /api/chat instead of a concatenated /api/generate prompt
+            keep_alive: How long the server keeps the model loaded after a
+                request ("30m", "-1" for always); None uses the server default
+        """
+        if name:
+            self.name = name
+        self.host = host.rstrip("/")
+        self.model = model
+        self.api_key = api_key
+        self.timeout = timeout
+        self.use_chat = use_chat
+        self.keep_alive = keep_alive
+
+    def generate(self, system_prompt: str, user_prompt: str, num_predict: int, temp: float,
+                 top_p: float, repeat_penalty: float, schema: Optional[dict] = None,
+                 cancel: Optional[threading.Event] = None, priority: int = PRIORITY_DEBATE,
+                 stop: Optional[List[str]] = None) -> str:
+        payload = {
+            "model": self.model,
+            "options": {
+                "temperature": temp,
+                "top_p": top_p,
+                "repeat_penalty": repeat_penalty,
+                "num_predict": num_predict
+            },
+            "stream": False,
+        }
+        if stop:
+            payload["options"]["stop"] = stop
+        if self.use_chat:
+            url = f"{self.host}/api/chat"
+            payload["messages"] = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ]
+        else:
+            url = f"{self.host}/api/generate"
+            payload["prompt"] = f"<|system|>\n{system_prompt}\n<|user|>\n{user_prompt}\n"
+        if schema is not None:
+            payload["format"] = schema
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+
+        info = call_info()
+        start = time.perf_counter()
+        if cancel is None:
+            r = requests.post(url, json=payload, headers=self._headers(), timeout=self.timeout)
+            r.raise_for_status()
+            body = r.json()
+            self._usage(body, info)
+            return self._text(body).strip()
+
+        # Cancellable: stream so a lost hedge can drop the connection, which
+        # makes Ollama stop generating instead of occupying the local model
+        payload["stream"] = True
+        parts = []
+        with requests.post(url, json=payload, headers=self._headers(),
+                           timeout=self.timeout, stream=True) as r:
+            r.raise_for_status()
+            for line in r.iter_lines():
+                if cancel.is_set():
+                    raise CancelledError("request cancelled")
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                text = self._text(chunk)
+                if text and info.ttft is None:
+                    info.ttft = time.perf_counter() - start
+                parts.append(text)
+                if chunk.get("done"):
+                    self._usage(chunk, info, streamed=True)
+                    break
+        return "".join(parts).strip()
+
+    def warmup(self, system_prompts: Iterable[str] = ()):
+        """
+        Load the model and evaluate the given system prompts once, so the
+        first real request pays neither the model load nor the persona prefix.
+        """
+        payload = {"model": self.model, "prompt": "", "stream": False}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        r = requests.post(f"{self.host}/api/generate", json=payload, headers=self._headers(), timeout=self.timeout)
+        r.raise_for_status()
+        for system_prompt in system_prompts:
+            self.generate(system_prompt, "Ready?", num_predict=1, temp=0, top_p=1, repeat_penalty=1)
+
+    def _headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    @staticmethod
+    def _usage(body: dict, info: CallInfo, streamed: bool = False):
+        """Token counts and (unless measured while streaming) time to first token from Ollama's timings"""
+        info.prompt_tokens = body.get("prompt_eval_count", info.prompt_tokens)
+        info.completion_tokens = body.get("eval_count", info.completion_tokens)
+        if not streamed and "prompt_eval_duration" in body:
+            # Nanoseconds; loading the model and evaluating the prompt precede the first token
+            info.ttft = (body.get("load_duration", 0) + body["prompt_eval_duration"]) / 1e9
+
+    def _text(self, body: dict) -> str:
+        if self.use_chat:
+            return (body.get("message") or {}).get("content", "")
+        return body.get("response", "")
+
+
+class ProviderPool:
+    """
+    Several interchangeable provider instances (API keys, models, hosts)
+    behind the provider interface.
+
+    Each call goes to the healthy member with the fewest requests in flight;
+    a member that fails or is out of quota is skipped and the next one tried.
+    Every member has its own circuit breaker. A call can be limited to the
+    members serving one model.
+    """
+
+    def __init__(self, name: str, members: List,
+                 breaker_factory: Optional[Callable[[], "CircuitBreaker"]] = None):
+        """
+        Args:
+            name: Label of the pool in stats and routing
+            members: Provider instances with distinct names
+            breaker_factory: Builds each member's circuit breaker
+        """
+        if not members:
+            raise ValueError(f"Provider pool '{name}' has no members")
+        self.name = name
+        self.members = list(members)
+        factory = breaker_factory or CircuitBreaker
+        self.breakers = {m.name: factory() for m in self.members}
+        self._outstanding = {m.name: 0 for m in self.members}
+        self._served = {m.name: 0 for m in self.members}
+        self._lock = threading.Lock()
+        self._rr = itertools.count()
+
+    def generate(self, system_prompt: str, user_prompt: str, num_predict: int, temp: float,
+                 top_p: float, repeat_penalty: float, schema: Optional[dict] = None,
+                 cancel: Optional[threading.Event] = None, priority: int = PRIORITY_DEBATE,
+                 stop: Optional[List[str]] = None, model: Optional[str] = None) -> str:
+        tried = set()
+        last_error: Optional[Exception] = None
+        while True:
+            member = self._checkout(tried, model)
+            if member is None:
+                break
+            tried.add(member.name)
+            breaker = self.breakers[member.name]
+            try:
+                result = member.generate(system_prompt, user_prompt, num_predict, temp, top_p,
+                                         repeat_penalty, schema=schema, cancel=cancel, priority=priority,
+                                         stop=stop)
+            except Exception as e:
+                last_error = e
+                if (cancel is not None and cancel.is_set()) or isinstance(e, RateLimitExceeded):
+                    breaker.release()
+                else:
+                    breaker.record_failure()
+                if cancel is not None and cancel.is_set():
+                    raise
+                continue
+            finally:
+                with self._lock:
+                    self._outstanding[member.name] -= 1
+            breaker.record_success()
+            with self._lock:
+                self._served[member.name] += 1
+            return result
+
+        if last_error is None:
+            serving = f" serving {model}" if model is not None else ""
+            raise CircuitOpenError(f"No healthy members{serving} in provider pool '{self.name}'")
+        raise last_error
+
+    def models(self) -> List[str]:
+        """Distinct models the members serve, in member order"""
+        return list(dict.fromkeys(_member_model(m) for m in self.members))
+
+    def warmup(self, system_prompts: Iterable[str] = ()):
+        """Warm every member that supports it"""
+        for member in self.members:
+            if hasattr(member, "warmup"):
+                try:
+                    member.warmup(system_prompts)
+                except Exception as e:
+                    log.warning("Warmup of %s failed: %s", member.name, e)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            outstanding, served = dict(self._outstanding), dict(self._served)
+        out = {}
+        for m in self.members:
+            out[m.name] = {
+                "outstanding": outstanding[m.name],
+                "served": served[m.name],
+                "circuit": self.breakers[m.name].snapshot()["state"]
+            }
+            limiter = getattr(m, "limiter", None)
+            if limiter is not None:
+                out[m.name]["rate_limit"] = limiter.snapshot()
+        return out
+
+    def _checkout(self, exclude, model: Optional[str] = None) -> Optional[object]:
+        """Pick and reserve the least-loaded healthy member not yet tried (serving model, if given)"""
+        with self._lock:
+            candidates = [m for m in self.members
+                          if m.name not in exclude and self.breakers[m.name].available()
+                          and (model is None or _member_model(m) == model)]
+            # Least outstanding requests; rotate the start point to spread ties
+            offset = next(self._rr) % len(self.members)
+            order = {m.name: (i - offset) % len(self.members) for i, m in enumerate(self.members)}
+            candidates.sort(key=lambda m: (self._outstanding[m.name], order[m.name]))
+            for member in candidates:
+                if self.breakers[member.name].acquire():
+                    self._outstanding[member.name] += 1
+                    return member
+        return None
+
+
+def _member_model(member) -> str:
+    """The model a pool member serves; members without one stand for themselves"""
+    return getattr(member, "model", None) or member.name
+
+
+def _failed_generation(error: Exception) -> Optional[str]:
+    """Extract Groq's `failed_generation` text from a json_validate_failed error"""
+    body = getattr(error, "body", None)
+    if isinstance(body, dict):
+        err = body.get("error", body)
+        if isinstance(err, dict) and err.get("code") == "json_validate_failed":
+            return err.get("failed_generation")
+    return None
+
+
+# -------------------- CIRCUIT BREAKER --------------------
+class CircuitOpenError(RuntimeError):
+    """Raised when every provider's circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker.
+
+    closed: calls flow; outcomes are kept for `window_seconds` and the
+        circuit opens once at least `min_calls` were seen and the error
+        rate reaches `error_rate`.
+    open: calls are refused for `open_seconds` (doubling on each failed
+        probe, up to `max_open_seconds`).
+    half_open: up to `probes` trial calls are let through; a success
+        closes the circuit, a failure reopens it.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, error_rate: float = 0.5, window_seconds: float = 30, min_calls: int = 5,
+                 open_seconds: float = 15, max_open_seconds: float = 120, probes: int = 1,
+                 clock=time.monotonic):
+        self.error_rate = error_rate
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.probes = probes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes = deque()  # (timestamp, ok)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._cooldown = open_seconds
+        self._probes_in_flight = 0
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._advance()
+            return self._state
+
+    def available(self) -> bool:
+        """Whether a call would currently be let through (does not reserve it)"""
+        with self._lock:
+            self._advance()
+            return self._state == self.CLOSED or (
+                self._state == self.HALF_OPEN and self._probes_in_flight < self.probes)
+
+    def acquire(self) -> bool:
+        """Reserve a call; in half-open this takes a probe slot"""
+        with self._lock:
+            self._advance()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and self._probes_in_flight < self.probes:
+                self._probes_in_flight += 1
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._state = self.CLOSED
+                self._outcomes.clear()
+                self._cooldown = self.open_seconds
+                self._probes_in_flight = 0
+                return
+            self._record(True)
+
+    def record_failure(self):
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+                self._cooldown = min(self._cooldown * 2, self.max_open_seconds)
+                self._open()
+                return
+            self._record(False)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            if (self._state == self.CLOSED and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.error_rate):
+                self._open()
+
+    def release(self):
+        """Give back a reservation without an outcome (e.g. a cancelled hedge)"""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            self._advance()
+            self._trim()
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            return {
+                "state": self._state,
+                "calls": len(self._outcomes),
+                "error_rate": round(failures / len(self._outcomes), 3) if self._outcomes else 0.0,
+                "trips": self.trips,
+                "retry_in_s": round(max(self._opened_at + self._cooldown - self._clock(), 0), 1)
+                if self._state == self.OPEN else 0
+            }
+
+    def _open(self):
+        self._state = self.OPEN
+        self._opened_at = self._clock()
+        self._outcomes.clear()
+        self.trips += 1
+
+    def _advance(self):
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self._cooldown:
+            self._state = self.HALF_OPEN
+            self._probes_in_flight = 0
+
+    def _record(self, ok: bool):
+        self._outcomes.append((self._clock(), ok))
+        self._trim()
+
+    def _trim(self):
+        cutoff = self._clock() - self.window_seconds
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            self._outcomes.popleft()
+
+
+# -------------------- COALESCING --------------------
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers with the same key share its outcome"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+
+    def do(self, key: str, fn: Callable[[], str]) -> Tuple[str, bool]:
+        """
+        Returns:
+            (result, shared) where shared is True if another caller's
+            in-flight call supplied the result
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+            return flight.result, False
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+
+def request_key(args: tuple) -> str:
+    """Hash of the prompts, sampling params and schema of a request"""
+    payload = json.dumps(list(args), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# -------------------- STATS --------------------
+class LatencyTracker:
+    """Rolling window of successful call latencies for one provider"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Nearest-rank percentile (q in 0-100), or None with no samples"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = min(len(samples) - 1, max(0, math.ceil(q / 100 * len(samples)) - 1))
+        return samples[rank]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class LLMStats:
+    """
+    Per-endpoint call, parse-failure and retry counters, split by whether
+    structured output was on. A process only runs in one mode, so the retry
+    rate JSON mode saves is read by comparing these counts across runs
+    (e.g. a load test with LLM_STRUCTURED_OUTPUT=0 and one without).
+    """
+
+    FIELDS = ("calls", "parse_failures", "retries", "provider_errors", "coalesced")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[tuple, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(self.FIELDS, 0))
+
+    def incr(self, endpoint: str, mode: str, field: str, n: int = 1):
+        with self._lock:
+            self._counts[(endpoint, mode)][field] += n
+
+    def snapshot(self) -> Dict:
+        """
+        Returns:
+            {endpoint: {"structured": {...}, "plain": {...}}}, each mode with its
+            raw counters and retry_rate; modes with no calls are left out
+        """
+        with self._lock:
+            counts = {k: dict(v) for k, v in self._counts.items()}
+
+        out: Dict[str, Dict] = {}
+        for (endpoint, mode), c in counts.items():
+            c["retry_rate"] = round(c["retries"] / c["calls"], 4) if c["calls"] else 0.0
+            out.setdefault(endpoint, {})[mode] = c
+        return out
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+class LLMMetrics:
+    """Prometheus series for provider calls, labelled by endpoint, agent and provider"""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        """
+        Args:
+            registry: Registry the series are exposed through; a private
+                one is created if omitted
+        """
+        self.registry = registry if registry is not None else MetricsRegistry()
+        r = self.registry
+        call_labels = ("endpoint", "agent", "provider")
+        self.requests = r.counter("llm_requests_total", "Provider calls by outcome (ok, error, cancelled)",
+                                  call_labels + ("outcome",))
+        self.latency = r.histogram("llm_request_duration_seconds", "Provider call latency", call_labels)
+        self.ttft = r.histogram("llm_time_to_first_token_seconds",
+                                "Time to first token, where the provider reports or streams it",
+                                ("endpoint", "provider"))
+        self.queue_wait = r.histogram("llm_queue_wait_seconds",
+                                      "Time spent waiting for client-side rate-limit budget",
+                                      ("endpoint", "provider"))
+        self.prompt_tokens = r.counter("llm_prompt_tokens_total", "Prompt tokens sent", call_labels)
+        self.completion_tokens = r.counter("llm_completion_tokens_total", "Completion tokens received",
+                                           call_labels)
+        self.completion_size = r.histogram("llm_completion_tokens", "Completion length per call",
+                                           ("endpoint",), buckets=TOKEN_BUCKETS)
+        self.retries = r.counter("llm_retries_total", "Regenerations caused by unusable output", ("endpoint",))
+        self.parse_failures = r.counter("llm_parse_failures_total", "Responses that failed to parse",
+                                        ("endpoint",))
+        self.coalesced = r.counter("llm_coalesced_total", "Requests served by an identical in-flight call",
+                                   ("endpoint",))
+
+    def observe(self, endpoint: str, agent: str, provider: str, outcome: str, seconds: float,
+                info: CallInfo, args: tuple, result: Optional[str] = None):
+        """Record one provider call; token counts are estimated when the provider didn't report them"""
+        labels = {"endpoint": endpoint, "agent": agent, "provider": provider}
+        self.requests.inc(outcome=outcome, **labels)
+        if info.queue_wait is not None:
+            self.queue_wait.observe(info.queue_wait, endpoint=endpoint, provider=provider)
+        if outcome != "ok":
+            return
+        self.latency.observe(seconds, **labels)
+        if info.ttft is not None:
+            self.ttft.observe(info.ttft, endpoint=endpoint, provider=provider)
+        prompt = info.prompt_tokens if info.prompt_tokens is not None else estimate_tokens(args[0], args[1])
+        completion = info.completion_tokens if info.completion_tokens is not None else estimate_tokens(result or "")
+        self.prompt_tokens.inc(prompt, **labels)
+        self.completion_tokens.inc(completion, **labels)
+        self.completion_size.observe(completion, endpoint=endpoint)
+
+
+# Agents that get their own metric series; user-created agents share "custom"
+DEFAULT_AGENTS = ("Deon", "Conse", "Virtue")
+
+
+def agent_group(name: str) -> str:
+    """A default agent's name, or "custom" for any user-created agent"""
+    for default in DEFAULT_AGENTS:
+        if name.strip().lower() == default.lower():
+            return default
+    return "custom"
+
+
+def agent_label(budget_key: Optional[str]) -> str:
+    """Agent label from a budget key such as "continue:Deon" ("" for keys without one)"""
+    return agent_group(budget_key.split(":", 1)[1]) if budget_key and ":" in budget_key else ""
+
+
+# -------------------- SERVICE --------------------
+class LLMService:
+    """Tries each provider in order and records per-endpoint stats"""
+
+    def __init__(self, providers: List, structured_output: bool = True,
+                 hedge: bool = True,
+                 hedge_percentile: float = 95,
+                 hedge_min_delay: float = 0.5,
+                 hedge_max_delay: float = 8.0,
+                 hedge_min_samples: int = 20,
+                 max_workers: int = 32,
+                 breaker_factory: Optional[Callable[[], CircuitBreaker]] = None,
+                 coalesce_endpoints: Iterable[str] = (),
+                 budgets: Optional[BudgetController] = None,
+                 metrics: Optional[LLMMetrics] = None):
+        """
+        Initialize the LLM service.
+
+        Args:
+            providers: Provider objects tried in order until one succeeds
+            structured_output: Send output schemas to providers (JSON mode)
+            hedge: Send a backup request to the next provider when the first is slow
+            hedge_percentile: Primary latency percentile used as the hedge deadline
+            hedge_min_delay: Lower bound on the hedge deadline, seconds
+            hedge_max_delay: Upper bound on the hedge deadline, and the deadline
+                used until `hedge_min_samples` latencies have been seen
+            max_workers: Threads available for hedged calls; a call queued for
+                a thread starts its hedge deadline only once it runs
+            breaker_factory: Builds each provider's circuit breaker
+            coalesce_endpoints: Endpoints whose identical concurrent requests
+                share one upstream call (leave out endpoints that want
+                independent samples)
+            budgets: Adaptive max_tokens controller; None keeps callers' limits
+            metrics: Prometheus series the calls are recorded into
+        """
+        self.providers = list(providers)
+        self.structured_output = structured_output
+        self.stats = LLMStats()
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_delay = hedge_max_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.latency: Dict[str, LatencyTracker] = defaultdict(LatencyTracker)
+        self.hedge_counts = {"fired": 0, "secondary_wins": 0}
+        self._hedge_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-hedge")
+        self.breakers: Dict[str, CircuitBreaker] = defaultdict(breaker_factory or CircuitBreaker)
+        self.coalesce_endpoints = set(coalesce_endpoints)
+        self.budgets = budgets
+        self.metrics = metrics if metrics is not None else LLMMetrics()
+        self._single_flight = SingleFlight()
+
+    @property
+    def mode(self) -> str:
+        return "structured" if self.structured_output else "plain"
+
+    def generate(self, system_prompt: str, user_prompt: str, num_predict: int = 400,
+                 temp: float = 0.7, top_p: float = 0.9, repeat_penalty: float = 1.1,
+                 schema: Optional[dict] = None, endpoint: str = "default",
+                 priority: Optional[int] = None, budget_key: Optional[str] = None,
+                 stop_at_brace: bool = False, cancel: Optional[CancelToken] = None,
+                 provider: Optional[str] = None, model: Optional[str] = None) -> str:
+        """
+        Generate a completion.
+
+        Args:
+            schema: JSON schema the output must follow; ignored when
+                structured output is off
+            endpoint: Label the call is counted under in stats
+            priority: Scheduling priority for rate-limited providers (lower
+                is served first); defaults from the endpoint
+            budget_key: Key (e.g. "continue:Deon") under which completion
+                lengths are learned; num_predict becomes the ceiling
+            stop_at_brace: Output is a flat JSON object; stop generating at
+                its closing brace. Only applied without a schema, since
+                schema-constrained output already ends with the object
+            cancel: Set to abandon the call: queued requests are not sent and
+                streaming ones are dropped. Ignored on coalesced endpoints,
+                where the upstream call is shared with other callers
+            provider: Send the call to this provider only, without hedging,
+                fallback or coalescing (see routes())
+            model: With provider, the model its pool members must serve
+
+        Returns:
+            The completion text
+        """
+        if not self.structured_output:
+            schema = None
+        self.stats.incr(endpoint, self.mode, "calls")
+        if priority is None:
+            priority = ENDPOINT_PRIORITIES.get(endpoint, PRIORITY_DEBATE)
+        if self.budgets is not None and budget_key:
+            num_predict = self.budgets.budget(budget_key, num_predict)
+        stop = ["}"] if stop_at_brace and schema is None else None
+        args = (system_prompt, user_prompt, num_predict, temp, top_p, repeat_penalty, schema, stop, priority)
+        agent = agent_label(budget_key)
+
+        with tracer.span("llm.generate", endpoint=endpoint, agent=agent, num_predict=num_predict) as span:
+            if endpoint in self.coalesce_endpoints and provider is None:
+                result, shared = self._single_flight.do(request_key(args[:8]),
+                                                        lambda: self._generate(args, endpoint, agent))
+                if shared:
+                    self.stats.incr(endpoint, self.mode, "coalesced")
+                    self.metrics.coalesced.inc(endpoint=endpoint)
+                    span.set(coalesced=True)
+            elif provider is not None:
+                result = self._call(self._provider(provider), args, cancel, endpoint=endpoint, agent=agent,
+                                    model=model)
+            else:
+                result = self._generate(args, endpoint, agent, cancel)
+            span.set(completion_chars=len(result))
+
+        if self.budgets is not None and budget_key:
+            self.budgets.record(budget_key, result, num_predict)
+        if stop and result.lstrip().startswith("{") and not result.rstrip().endswith("}"):
+            # The stop sequence itself is not returned
+            result = result.rstrip() + "}"
+        return result
+
+    def _generate(self, args: tuple, endpoint: str, agent: str = "",
+                  cancel: Optional[CancelToken] = None) -> str:
+        # Route around providers whose circuit is open
+        providers = [p for p in self.providers if self.breakers[p.name].available()]
+        if not providers:
+            self.stats.incr(endpoint, self.mode, "provider_errors")
+            raise CircuitOpenError("All LLM providers are unavailable (circuit open)")
+
+        if self.hedge and len(providers) >= 2:
+            done, result = self._generate_hedged(providers[0], providers[1], args, endpoint, agent, cancel)
+            if done:
+                return result
+            providers = providers[2:]
+            if not providers or (cancel is not None and cancel.is_set()):
+                raise result
+
+        last_error: Optional[Exception] = None
+        for i, provider in enumerate(providers):
+            try:
+                return self._call(provider, args, cancel, endpoint=endpoint, agent=agent)
+            except Exception as e:
+                last_error = e
+                if cancel is not None and cancel.is_set():
+                    raise
+                self.stats.incr(endpoint, self.mode, "provider_errors")
+                if i + 1 < len(providers):
+                    log.warning("%s API error: %s, falling back to %s", provider.name, e, providers[i + 1].name)
+        if last_error is None:
+            raise RuntimeError("No LLM providers configured")
+        raise last_error
+
+    def _provider(self, name: str):
+        for provider in self.providers:
+            if provider.name == name:
+                return provider
+        raise ValueError(f"Unknown LLM provider '{name}'")
+
+    def routes(self) -> List[Tuple[str, Optional[str]]]:
+        """
+        Distinct (provider, model) targets a call can be pinned to: one per
+        model of each pool, one per plain provider (model None).
+        """
+        return [(p.name, model) for p in self.providers
+                for model in (p.models() if isinstance(p, ProviderPool) else [None])]
+
+    def hedge_delay(self, provider) -> float:
+        """Seconds to wait on `provider` before hedging to the next one"""
+        tracker = self.latency[provider.name]
+        if len(tracker) < self.hedge_min_samples:
+            return self.hedge_max_delay
+        return min(self.hedge_max_delay, max(self.hedge_min_delay, tracker.percentile(self.hedge_percentile)))
+
+    def latency_snapshot(self) -> Dict[str, Dict]:
+        """Per-provider latency percentiles (ms) and hedge counters"""
+        out = {}
+        for name, tracker in list(self.latency.items()):
+            out[name] = {
+                "samples": len(tracker),
+                **{f"p{q}_ms": round(tracker.percentile(q) * 1000, 1) if len(tracker) else None
+                   for q in (50, 95, 99)}
+            }
+        with self._hedge_lock:
+            hedges = dict(self.hedge_counts)
+        return {"providers": out, "hedges": hedges}
+
+    def breaker_snapshot(self) -> Dict[str, Dict]:
+        """Per-provider circuit state"""
+        return {name: breaker.snapshot() for name, breaker in list(self.breakers.items())}
+
+    def warmup(self, system_prompts: Iterable[str] = ()):
+        """Load models and prime system-prompt prefixes on providers that support it"""
+        for provider in self.providers:
+            if hasattr(provider, "warmup"):
+                try:
+                    provider.warmup(list(system_prompts))
+                except Exception as e:
+                    log.warning("Warmup of %s failed: %s", provider.name, e)
+
+    def budget_snapshot(self) -> Dict[str, Dict]:
+        """Learned completion lengths per budget key"""
+        return self.budgets.snapshot() if self.budgets is not None else {}
+
+    def pool_snapshot(self) -> Dict[str, Dict]:
+        """Per-member load, health and quota for pooled providers"""
+        return {p.name: p.snapshot() for p in self.providers if isinstance(p, ProviderPool)}
+
+    def _call(self, provider, args, cancel: Optional[threading.Event] = None,
+              endpoint: str = "default", agent: str = "", model: Optional[str] = None) -> str:
+        breaker = self.breakers[provider.name]
+        if not breaker.acquire():
+            raise CircuitOpenError(f"{provider.name} circuit is open")
+        info = CallInfo()
+        token = _CALL_INFO.set(info)
+        with tracer.span("llm.provider", provider=provider.name) as span:
+            start = time.perf_counter()
+            try:
+                pinned = {"model": model} if model is not None else {}
+                result = provider.generate(*args[:6], schema=args[6], cancel=cancel, stop=args[7],
+                                           priority=args[8], **pinned)
+            except Exception as e:
+                cancelled = cancel is not None and cancel.is_set()
+                if cancelled or isinstance(e, RateLimitExceeded):
+                    # Lost a hedge race or ran out of local budget: says nothing
+                    # about the provider's health
+                    breaker.release()
+                else:
+                    breaker.record_failure()
+                self.metrics.observe(endpoint, agent, provider.name, "cancelled" if cancelled else "error",
+                                     time.perf_counter() - start, info, args)
+                span.set(outcome="cancelled" if cancelled else "error", queue_wait_s=info.queue_wait)
+                raise
+            finally:
+                _CALL_INFO.reset(token)
+            elapsed = time.perf_counter() - start
+            breaker.record_success()
+            self.latency[provider.name].record(elapsed)
+            self.metrics.observe(endpoint, agent, provider.name, "ok", elapsed, info, args, result)
+            span.set(outcome="ok", ttft_s=info.ttft, queue_wait_s=info.queue_wait,
+                     prompt_tokens=info.prompt_tokens, completion_tokens=info.completion_tokens)
+        return result
+
+    def _generate_hedged(self, primary, secondary, args, endpoint, agent="",
+                         cancel: Optional[CancelToken] = None):
+        """
+        Run `primary`; if it hasn't answered within its hedge deadline, also
+        run `secondary` and take whichever succeeds first, cancelling the other.
+
+        Returns:
+            (True, text) on success, (False, last_error) if both failed
+        """
+        def leg_token() -> CancelToken:
+            return cancel.child() if cancel is not None else CancelToken()
+
+        cancels = {}
+        primary_cancel = leg_token()
+        started = threading.Event()
+
+        def run_primary():
+            started.set()
+            return self._call(primary, args, primary_cancel, endpoint, agent)
+
+        # Copied contexts keep the hedged calls' spans under the caller's trace
+        primary_future = self._executor.submit(contextvars.copy_context().run, run_primary)
+        cancels[primary_future] = primary_cancel
+
+        # The hedge deadline runs from when the primary starts: time queued behind
+        # other calls in a saturated pool says nothing about the provider, and
+        # hedging then would only add load where there is none to spare
+        while not started.wait(0.05):
+            if cancel is not None and cancel.is_set() and primary_future.cancel():
+                return False, CancelledError("request cancelled")
+
+        try:
+            return True, primary_future.result(timeout=self.hedge_delay(primary))
+        except FuturesTimeout:
+            pass
+        except Exception as e:
+            if cancel is not None and cancel.is_set():
+                return False, e
+            # Failed fast: plain fallback, nothing to race
+            self.stats.incr(endpoint, self.mode, "provider_errors")
+            log.warning("%s API error: %s, falling back to %s", primary.name, e, secondary.name)
+            try:
+                return True, self._call(secondary, args, leg_token(), endpoint=endpoint, agent=agent)
+            except Exception as e2:
+                self.stats.incr(endpoint, self.mode, "provider_errors")
+                return False, e2
+
+        if cancel is not None and cancel.is_set():
+            return False, CancelledError("request cancelled")
+        with self._hedge_lock:
+            self.hedge_counts["fired"] += 1
+        secondary_cancel = leg_token()
+        secondary_future = self._executor.submit(contextvars.copy_context().run, self._call, secondary, args,
+                                                 secondary_cancel, endpoint, agent)
+        cancels[secondary_future] = secondary_cancel
+
+        pending = set(cancels)
+        last_error: Exception = RuntimeError("hedged request failed")
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    self.stats.incr(endpoint, self.mode, "provider_errors")
+                    continue
+                for loser in pending:
+                    cancels[loser].set()
+                    loser.cancel()
+                if future is secondary_future:
+                    with self._hedge_lock:
+                        self.hedge_counts["secondary_wins"] += 1
+                return True, result
+        return False, last_error
+
+    def record_parse(self, endpoint: str, ok: bool):
+        """Count a response that failed to parse into the expected shape"""
+        if not ok:
+            self.stats.incr(endpoint, self.mode, "parse_failures")
+            self.metrics.parse_failures.inc(endpoint=endpoint)
+            tracer.current().incr("parse_failures")
+
+    def record_retry(self, endpoint: str):
+        """Count a regeneration caused by unusable output"""
+        self.stats.incr(endpoint, self.mode, "retries")
+        self.metrics.retries.inc(endpoint=endpoint)
+        tracer.current().incr("retries")
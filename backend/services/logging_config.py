@@ -0,0 +1,288 @@
+# backend/services/logging_config.py
+"""
+Structured, sampled, non-blocking logging.
+
+Modules log through the standard library (`log = logging.getLogger(__name__)`)
+and pass structured fields as `extra`:
+
+    log.debug("Agent raw response", extra={"agent": role, "raw": raw})
+
+configure_logging() puts a queue handler on the root logger: the calling
+(request) thread only freezes the record and enqueues it, and a background
+listener formats and writes it. When the queue is full records are dropped
+and counted rather than blocking the request. Per-level sampling thins out
+high-volume records, long field values (raw LLM responses, parsed verdicts)
+are truncated, and levels can be set per module.
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Dict, Optional, TextIO
+
+# Attributes every LogRecord has; anything else on a record came from `extra`
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+
+def record_fields(record: logging.LogRecord) -> Dict:
+    """Structured fields attached to a record through `extra`"""
+    return {k: v for k, v in vars(record).items() if k not in _RESERVED}
+
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """
+    Parse per-module levels, e.g. "main=INFO,services.llm_service=DEBUG".
+
+    Raises:
+        ValueError: On an entry without "=" or an unknown level name
+    """
+    levels = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "=" not in part:
+            raise ValueError(f"Expected module=LEVEL, got {part!r}")
+        name, level = (x.strip() for x in part.split("=", 1))
+        levels[name] = _level(level)
+    return levels
+
+
+def parse_sample_rates(spec: str) -> Dict[int, float]:
+    """
+    Parse per-level sampling rates, e.g. "DEBUG=0.05,INFO=0.5".
+
+    Raises:
+        ValueError: On a malformed entry or a rate outside [0, 1]
+    """
+    rates = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "=" not in part:
+            raise ValueError(f"Expected LEVEL=rate, got {part!r}")
+        level, rate = (x.strip() for x in part.split("=", 1))
+        rate = float(rate)
+        if not 0 <= rate <= 1:
+            raise ValueError(f"Sample rate for {level} must be within [0, 1]")
+        rates[_level(level)] = rate
+    return rates
+
+
+def _level(level) -> int:
+    if isinstance(level, int):
+        return level
+    value = logging.getLevelName(str(level).upper())
+    if not isinstance(value, int):
+        raise ValueError(f"Unknown log level {level!r}")
+    return value
+
+
+def _clip(text: str, limit: int) -> str:
+    if limit <= 0 or len(text) <= limit:
+        return text
+    return f"{text[:limit]}...(+{len(text) - limit} chars)"
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a random fraction of the records at each level"""
+
+    def __init__(self, rates: Optional[Dict[int, float]] = None, rng: Optional[random.Random] = None):
+        """
+        Initialize the filter.
+
+        Args:
+            rates: Fraction of records kept per level number; levels not
+                listed are always kept
+            rng: Random source (seed one for reproducible tests)
+        """
+        super().__init__()
+        self.rates = dict(rates or {})
+        self.rng = rng or random.Random()
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(record.levelno, 1.0)
+        if rate >= 1 or (rate > 0 and self.rng.random() < rate):
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class StructuredFormatter(logging.Formatter):
+    """Renders a record and its fields as one JSON object or one key=value line"""
+
+    def __init__(self, fmt: str = "text", max_field_chars: int = 500):
+        """
+        Initialize the formatter.
+
+        Args:
+            fmt: "json" (one object per line) or "text" (human-readable)
+            max_field_chars: Longest message or field value written; longer
+                ones are cut with a note of how much was dropped (0 = no limit)
+        """
+        super().__init__()
+        if fmt not in ("json", "text"):
+            raise ValueError(f"Unknown log format {fmt!r}")
+        self.fmt = fmt
+        self.max_field_chars = max_field_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = _clip(record.getMessage(), self.max_field_chars)
+        fields = {k: self._value(v) for k, v in record_fields(record).items()}
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if self.fmt == "json":
+            payload = {
+                "ts": round(record.created, 3),
+                "level": record.levelname,
+                "logger": record.name,
+                "msg": message,
+                **fields
+            }
+            if record.exc_text:
+                payload["exc"] = record.exc_text
+            return json.dumps(payload, ensure_ascii=False, default=str)
+
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.created))
+        line = f"{stamp}.{int(record.msecs):03d} {record.levelname:<7} {record.name}: {message}"
+        if fields:
+            line += " " + " ".join(f"{k}={self._text(v)}" for k, v in fields.items())
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+    def _value(self, value):
+        """Truncate long strings; containers are kept as-is unless their JSON is too long"""
+        if isinstance(value, str):
+            return _clip(value, self.max_field_chars)
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        text = json.dumps(value, ensure_ascii=False, default=str)
+        if self.max_field_chars > 0 and len(text) > self.max_field_chars:
+            return _clip(text, self.max_field_chars)
+        return value
+
+    @staticmethod
+    def _text(value) -> str:
+        if isinstance(value, str):
+            return json.dumps(value, ensure_ascii=False) if (" " in value or not value) else value
+        return json.dumps(value, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Enqueues records for a background listener, dropping them when the
+    queue is full instead of blocking the caller.
+    """
+
+    def __init__(self, log_queue: queue.Queue, trace_id: Optional[Callable[[], Optional[str]]] = None):
+        """
+        Initialize the handler.
+
+        Args:
+            log_queue: Queue drained by the listener (bound it with maxsize)
+            trace_id: Returns the current request's trace id; read here, on
+                the calling thread, since the listener has no request context
+        """
+        super().__init__(log_queue)
+        self.trace_id = trace_id
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only freeze what could change once the caller returns; formatting
+        # (the expensive part) happens on the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if self.trace_id is not None and "trace_id" not in vars(record):
+            trace_id = self.trace_id()
+            if trace_id:
+                record.trace_id = trace_id
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LoggingHandle:
+    """The installed handler and listener, for stats and shutdown"""
+
+    def __init__(self, handler: NonBlockingQueueHandler, listener: QueueListener, sampler: SamplingFilter):
+        self.handler = handler
+        self.listener = listener
+        self.sampler = sampler
+        self._stopped = False
+
+    def stats(self) -> Dict:
+        return {
+            "queued": self.handler.queue.qsize(),
+            "dropped": self.handler.dropped,
+            "sampled_out": self.sampler.sampled_out
+        }
+
+    def stop(self):
+        """Flush queued records and stop the listener thread (idempotent)"""
+        if not self._stopped:
+            self._stopped = True
+            self.listener.stop()
+
+
+_active: Optional[LoggingHandle] = None
+
+
+def configure_logging(level="INFO", levels: Optional[Dict[str, int]] = None, fmt: str = "text",
+                      sample_rates: Optional[Dict[int, float]] = None, max_field_chars: int = 500,
+                      queue_size: int = 10000, stream: Optional[TextIO] = None,
+                      trace_id: Optional[Callable[[], Optional[str]]] = None) -> LoggingHandle:
+    """
+    Route all logging through a bounded queue to a background writer.
+    Calling it again replaces the previous configuration.
+
+    Args:
+        level: Root level (name or number)
+        levels: Per-logger levels, e.g. {"services.llm_service": logging.DEBUG}
+        fmt: "json" or "text"
+        sample_rates: Fraction of records kept per level, e.g. {logging.DEBUG: 0.05}
+        max_field_chars: Truncation limit for the message and each field
+        queue_size: Records buffered before new ones are dropped
+        stream: Output stream (stderr by default)
+        trace_id: Callable returning the current trace id, added to each record
+
+    Returns:
+        Handle exposing drop/sampling counts and stop()
+    """
+    global _active
+    root = logging.getLogger()
+    if _active is not None:
+        root.removeHandler(_active.handler)
+        _active.stop()
+
+    output = logging.StreamHandler(stream if stream is not None else sys.stderr)
+    output.setFormatter(StructuredFormatter(fmt, max_field_chars))
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    handler = NonBlockingQueueHandler(log_queue, trace_id=trace_id)
+    # Sampling runs before the record is frozen or queued
+    sampler = SamplingFilter(sample_rates)
+    handler.addFilter(sampler)
+    listener = QueueListener(log_queue, output, respect_handler_level=True)
+
+    root.setLevel(_level(level))
+    root.addHandler(handler)
+    for name, module_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(_level(module_level))
+
+    listener.start()
+    _active = LoggingHandle(handler, listener, sampler)
+    atexit.register(_active.stop)
+    return _active
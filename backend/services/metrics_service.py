@@ -8,6 +8,8 @@ from datetime import datetime
 from typing import List, Dict, Any
 from pathlib import Path
 
+from services.serialization import read_json, write_json
+
 
 class MetricsService:
     def __init__(self, storage_path: str = "data/debate_metrics.json"):
@@ -18,21 +20,18 @@ class MetricsService:
         """Create storage directory and file if they don't exist"""
         Path(self.storage_path).parent.mkdir(parents=True, exist_ok=True)
         if not os.path.exists(self.storage_path):
-            with open(self.storage_path, 'w') as f:
-                json.dump({"debates": []}, f)
+            write_json(self.storage_path, {"debates": []})
     
     def _load_metrics(self) -> Dict:
         """Load metrics from file"""
         try:
-            with open(self.storage_path, 'r') as f:
-                return json.load(f)
+            return read_json(self.storage_path)
         except (FileNotFoundError, json.JSONDecodeError):
             return {"debates": []}
     
     def _save_metrics(self, data: Dict):
         """Save metrics to file"""
-        with open(self.storage_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        write_json(self.storage_path, data)
     
     def calculate_debate_metrics(self, transcript: Dict, verdict: Dict) -> Dict[str, Any]:
         """
@@ -0,0 +1,483 @@
+# backend/services/mock_llm.py
+"""
+Deterministic stand-in for the LLM backends.
+
+MockLLM produces well-formed agent turns, round scores, verdicts,
+summaries and enhancements from the prompt alone, with configurable
+latency, token rate, error and malformed-output injection. It is used in
+two ways:
+
+- MockProvider plugs it into the provider layer (AI_PROVIDER=mock), so the
+  whole debate pipeline runs in-process with no network.
+- MockLLMServer serves it over HTTP in the Ollama (/api/generate,
+  /api/chat) and Groq/OpenAI (/openai/v1/chat/completions) shapes,
+  including streaming, so the real providers can be pointed at it
+  (OLLAMA_HOSTS=http://127.0.0.1:11435, GROQ_BASE_URL=http://127.0.0.1:11435).
+"""
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from services.llm_service import call_info
+
+DIMENSIONS = ["harm_minimization", "rule_consistency", "autonomy_respect", "honesty", "fairness"]
+
+_WORDS = (
+    "duty rights consent outcome welfare harm fairness honesty courage compassion principle "
+    "consequence trust autonomy justice character integrity suffering benefit obligation "
+    "virtue rule exception precedent community wellbeing responsibility dignity risk"
+).split()
+
+_OPPONENTS = re.compile(r"Pick ONE opponent \(([^)]*)\)|Respond to ([^.\n]+)\.")
+
+
+class MockLLMError(RuntimeError):
+    """Injected provider failure"""
+
+    def __init__(self, message: str, status: int = 503, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class MockLLM:
+    """Prompt-deterministic fake model with a latency and fault model"""
+
+    LATENCY_DISTS = ("fixed", "lognormal", "exponential", "uniform")
+
+    def __init__(self, seed: int = 0,
+                 latency_dist: str = "lognormal",
+                 median_ms: float = 300,
+                 sigma: float = 0.5,
+                 tokens_per_s: float = 200,
+                 turn_tokens: int = 70,
+                 error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0,
+                 malformed_rate: float = 0.0):
+        """
+        Initialize the mock model.
+
+        Args:
+            seed: Seed for latency/fault sampling and content
+            latency_dist: Time-to-first-token distribution: fixed, lognormal,
+                exponential or uniform (0..2x median)
+            median_ms: Median time to first token
+            sigma: Lognormal shape; larger means a heavier tail
+            tokens_per_s: Generation speed after the first token (0 = instant)
+            turn_tokens: Mean length of an agent turn's argument, in tokens
+            error_rate: Share of calls that fail with a 503
+            rate_limit_rate: Share of calls that fail with a 429
+            malformed_rate: Share of calls whose output is not clean JSON
+        """
+        if latency_dist not in self.LATENCY_DISTS:
+            raise ValueError(f"latency_dist must be one of {self.LATENCY_DISTS}")
+        self.seed = seed
+        self.latency_dist = latency_dist
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.tokens_per_s = tokens_per_s
+        self.turn_tokens = turn_tokens
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.malformed_rate = malformed_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    # ---- sampling ----
+    def plan(self) -> Dict:
+        """Sample the fate of the next call: fault, malformed output, first-token delay"""
+        with self._lock:
+            self.calls += 1
+            r = self._rng.random()
+            fault = None
+            if r < self.error_rate:
+                fault = MockLLMError("mock provider error", status=503)
+            elif r < self.error_rate + self.rate_limit_rate:
+                fault = MockLLMError("mock rate limit", status=429, retry_after=1.0)
+            return {
+                "error": fault,
+                "malformed": self._rng.random() < self.malformed_rate,
+                "ttft_s": self._ttft() / 1000
+            }
+
+    def _ttft(self) -> float:
+        m = self.median_ms
+        if self.latency_dist == "fixed":
+            return m
+        if self.latency_dist == "exponential":
+            return self._rng.expovariate(math.log(2) / m) if m > 0 else 0.0
+        if self.latency_dist == "uniform":
+            return self._rng.uniform(0, 2 * m)
+        return m * math.exp(self._rng.gauss(0, self.sigma))
+
+    def token_delay(self, tokens: int) -> float:
+        return tokens / self.tokens_per_s if self.tokens_per_s > 0 else 0.0
+
+    # ---- content ----
+    def complete(self, system_prompt: str, user_prompt: str, num_predict: int = 400,
+                 schema: Optional[dict] = None, malformed: bool = False) -> str:
+        """Build the completion text for a prompt (no delay)"""
+        rng = random.Random(self._content_seed(system_prompt, user_prompt))
+        kind = self.kind(system_prompt, user_prompt, schema)
+
+        if kind == "verdict":
+            body = json.dumps(self._verdict(rng))
+        elif kind == "round":
+            body = json.dumps(self._round(rng))
+        elif kind == "summary":
+            body = self._sentence(rng, self.turn_tokens * 2)
+        elif kind == "enhancement":
+            name = _agent_name(user_prompt)
+            body = f"{name} " + " ".join(self._sentence(rng, 22) for _ in range(5))
+        elif kind == "ping":
+            body = "Ready."
+        else:
+            body = json.dumps(self._turn(rng, user_prompt, schema))
+
+        if malformed:
+            body = self._malform(rng, body)
+        # Honour the token limit the way a real model does: by cutting off
+        return body[:max(num_predict, 1) * 4]
+
+    @staticmethod
+    def kind(system_prompt: str, user_prompt: str, schema: Optional[dict] = None) -> str:
+        text = system_prompt + json.dumps(schema or {})
+        if "final_recommendation" in text:
+            return "verdict"
+        if '"leaning"' in system_prompt:
+            return "round"
+        if "running summary" in system_prompt:
+            return "summary"
+        if "personality" in system_prompt.lower():
+            return "enhancement"
+        if user_prompt.strip() == "Ready?":
+            return "ping"
+        return "turn"
+
+    def _content_seed(self, *texts: str) -> int:
+        digest = hashlib.sha1("\x00".join(texts).encode("utf-8")).hexdigest()
+        return int(digest[:16], 16) ^ self.seed
+
+    def _sentence(self, rng: random.Random, tokens: int) -> str:
+        """~tokens worth of words (0.75 words per token), split into 12-18 word sentences"""
+        words = [rng.choice(_WORDS) for _ in range(max(int(tokens * 0.75), 3))]
+        sentences = []
+        while words:
+            n = rng.randint(12, 18)
+            sentences.append(" ".join(words[:n]).capitalize() + ".")
+            words = words[n:]
+        return " ".join(sentences)
+
+    def _turn(self, rng: random.Random, user_prompt: str, schema: Optional[dict]) -> dict:
+        opponents = _opponents(user_prompt)
+        tokens = max(int(rng.gauss(self.turn_tokens, self.turn_tokens * 0.2)), 8)
+        argument = self._sentence(rng, tokens)
+        turn = {"stance": rng.choice(["A", "B"])}
+        if opponents:
+            target = rng.choice(opponents)
+            argument = f"{target}, {argument[0].lower()}{argument[1:]}"
+            if schema and "opponent" in schema.get("properties", {}):
+                turn["opponent"] = target
+        turn["argument"] = argument
+        return turn
+
+    def _round(self, rng: random.Random) -> dict:
+        return {
+            "scores": {o: {d: rng.randint(0, 2) for d in DIMENSIONS} for o in ("option_a", "option_b")},
+            "leaning": rng.choice(["A", "B"]),
+            "confidence": rng.randint(50, 95),
+            "rationale": self._sentence(rng, 20)
+        }
+
+    def _verdict(self, rng: random.Random) -> dict:
+        scores = {o: {d: rng.randint(0, 2) for d in DIMENSIONS} for o in ("option_a", "option_b")}
+        total_a, total_b = sum(scores["option_a"].values()), sum(scores["option_b"].values())
+        return {
+            "scores": scores,
+            "final_recommendation": "A" if total_a >= total_b else "B",
+            "confidence": rng.randint(55, 95),
+            "verdict": " ".join(self._sentence(rng, 18) for _ in range(2))
+        }
+
+    def _malform(self, rng: random.Random, body: str) -> str:
+        style = rng.choice(["prose", "truncated", "no_json"])
+        if style == "prose":
+            return f"Sure! Here is my answer:\n{body}\nLet me know if you need more."
+        if style == "truncated":
+            return body[:max(len(body) // 2, 1)]
+        return self._sentence(rng, 30)
+
+    def chunks(self, text: str) -> Iterator[str]:
+        """Split a completion into roughly token-sized streaming chunks"""
+        for piece in re.findall(r"\S+\s*|\s+", text):
+            yield piece
+
+
+class MockProvider:
+    """Provider-layer adapter for MockLLM; honours cancel and stop sequences"""
+
+    name = "mock"
+
+    def __init__(self, llm: MockLLM, name: Optional[str] = None):
+        if name:
+            self.name = name
+        self.llm = llm
+
+    def generate(self, system_prompt: str, user_prompt: str, num_predict: int, temp: float,
+                 top_p: float, repeat_penalty: float, schema: Optional[dict] = None,
+                 cancel: Optional[threading.Event] = None, priority: int = 1,
+                 stop: Optional[List[str]] = None) -> str:
+        plan = self.llm.plan()
+        text = self.llm.complete(system_prompt, user_prompt, num_predict, schema, plan["malformed"])
+        text = _apply_stop(text, stop)
+        call_info().ttft = plan["ttft_s"]
+        delay = plan["ttft_s"] + self.llm.token_delay(len(text) // 4)
+        if cancel is not None:
+            if cancel.wait(delay):
+                raise MockLLMError("cancelled", status=499)
+        elif delay > 0:
+            time.sleep(delay)
+        if plan["error"] is not None:
+            raise plan["error"]
+        return text.strip()
+
+
+def _apply_stop(text: str, stop: Optional[List[str]]) -> str:
+    for s in stop or ():
+        i = text.find(s)
+        if i >= 0:
+            text = text[:i]
+    return text
+
+
+def _opponents(user_prompt: str) -> List[str]:
+    m = _OPPONENTS.search(user_prompt)
+    if not m:
+        return []
+    names = m.group(1) if m.group(1) is not None else m.group(2)
+    return [n.strip() for n in names.split(",") if n.strip()]
+
+
+def _agent_name(user_prompt: str) -> str:
+    m = re.search(r"AGENT NAME:\s*(.+)", user_prompt)
+    return m.group(1).strip() if m else "The agent"
+
+
+# -------------------- HTTP SERVER --------------------
+class MockLLMServer:
+    """
+    Threaded HTTP server speaking the Ollama and Groq/OpenAI chat APIs.
+
+    Usage:
+        server = MockLLMServer(MockLLM(median_ms=200), port=11435).start()
+        ...
+        server.stop()
+    """
+
+    def __init__(self, llm: MockLLM, host: str = "127.0.0.1", port: int = 11435):
+        self.llm = llm
+        self.httpd = ThreadingHTTPServer((host, port), _make_handler(llm))
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _make_handler(llm: MockLLM):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path in ("/", "/health"):
+                return self._json(200, {"status": "ok", "calls": llm.calls})
+            if self.path == "/api/tags":
+                return self._json(200, {"models": [{"name": "mock"}]})
+            self._json(404, {"error": "not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError:
+                return self._json(400, {"error": "invalid JSON"})
+
+            if self.path == "/api/generate":
+                return self._ollama(body, chat=False)
+            if self.path == "/api/chat":
+                return self._ollama(body, chat=True)
+            if self.path.rstrip("/").endswith("/chat/completions"):
+                return self._openai(body)
+            self._json(404, {"error": f"unknown path {self.path}"})
+
+        # ---- Ollama ----
+        def _ollama(self, body: dict, chat: bool):
+            if chat:
+                system_prompt, user_prompt = _split_messages(body.get("messages", []))
+            else:
+                system_prompt, user_prompt = _split_prompt(body.get("system", ""), body.get("prompt", ""))
+                if not user_prompt and not system_prompt:
+                    # Model load / keep-alive request
+                    return self._json(200, {"model": body.get("model"), "response": "", "done": True})
+            options = body.get("options") or {}
+            schema = body.get("format") if isinstance(body.get("format"), dict) else None
+
+            text, plan = self._run(system_prompt, user_prompt, options.get("num_predict", 400),
+                                   schema, options.get("stop"))
+            if plan["error"] is not None:
+                return self._error(plan["error"])
+
+            def frame(piece: str, done: bool) -> dict:
+                out = {"model": body.get("model", "mock"), "done": done}
+                if chat:
+                    out["message"] = {"role": "assistant", "content": piece}
+                else:
+                    out["response"] = piece
+                if done:
+                    # Ollama's timing fields, in nanoseconds
+                    out["prompt_eval_count"] = (len(system_prompt) + len(user_prompt)) // 4
+                    out["prompt_eval_duration"] = int(plan["ttft_s"] * 1e9)
+                    out["eval_count"] = len(text) // 4
+                return out
+
+            if body.get("stream", True):
+                self._start_stream("application/x-ndjson")
+                for piece in llm.chunks(text):
+                    self._sleep(llm.token_delay(1))
+                    self._chunk(json.dumps(frame(piece, False)) + "\n")
+                self._chunk(json.dumps(frame("", True)) + "\n")
+                return self._end_stream()
+
+            self._sleep(llm.token_delay(len(text) // 4))
+            self._json(200, frame(text, True))
+
+        # ---- Groq / OpenAI ----
+        def _openai(self, body: dict):
+            system_prompt, user_prompt = _split_messages(body.get("messages", []))
+            schema = {} if (body.get("response_format") or {}).get("type") == "json_object" else None
+            stop = body.get("stop")
+            text, plan = self._run(system_prompt, user_prompt, body.get("max_tokens") or 400,
+                                   schema, [stop] if isinstance(stop, str) else stop)
+            if plan["error"] is not None:
+                return self._error(plan["error"], openai=True)
+
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+            prompt_tokens = (len(system_prompt) + len(user_prompt)) // 4
+            completion_tokens = len(text) // 4
+            headers = {
+                "x-ratelimit-limit-tokens": "1000000",
+                "x-ratelimit-remaining-tokens": "1000000",
+                "x-ratelimit-limit-requests": "100000",
+                "x-ratelimit-remaining-requests": "100000",
+            }
+
+            if body.get("stream"):
+                self._start_stream("text/event-stream", headers)
+                for piece in llm.chunks(text):
+                    self._sleep(llm.token_delay(1))
+                    chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": body.get("model", "mock"),
+                             "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+                    self._chunk(f"data: {json.dumps(chunk)}\n\n")
+                self._chunk("data: [DONE]\n\n")
+                return self._end_stream()
+
+            self._sleep(llm.token_delay(completion_tokens))
+            self._json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens}
+            }, headers)
+
+        # ---- helpers ----
+        def _run(self, system_prompt, user_prompt, num_predict, schema, stop) -> Tuple[str, dict]:
+            plan = llm.plan()
+            self._sleep(plan["ttft_s"])
+            text = llm.complete(system_prompt, user_prompt, int(num_predict), schema, plan["malformed"])
+            return _apply_stop(text, stop), plan
+
+        def _sleep(self, seconds: float):
+            if seconds > 0:
+                time.sleep(seconds)
+
+        def _error(self, error: MockLLMError, openai: bool = False):
+            headers = {"retry-after": str(error.retry_after)} if error.retry_after else {}
+            payload = {"error": {"message": str(error), "type": "mock_error"}} if openai else {"error": str(error)}
+            self._json(error.status, payload, headers)
+
+        def _json(self, status: int, payload: dict, headers: Optional[Dict[str, str]] = None):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _start_stream(self, content_type: str, headers: Optional[Dict[str, str]] = None):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Transfer-Encoding", "chunked")
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+
+        def _chunk(self, text: str):
+            data = text.encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def _end_stream(self):
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def _split_prompt(system: str, prompt: str) -> Tuple[str, str]:
+    """
+    System and user parts of an /api/generate request. OllamaProvider sends
+    both in `prompt` ("<|system|>\n...\n<|user|>\n...\n") rather than using
+    the `system` field; the mock classifies requests by the system part.
+    """
+    if not system and prompt.startswith("<|system|>\n") and "\n<|user|>\n" in prompt:
+        system, _, prompt = prompt[len("<|system|>\n"):].partition("\n<|user|>\n")
+        prompt = prompt[:-1] if prompt.endswith("\n") else prompt
+    return system, prompt
+
+
+def _split_messages(messages: List[dict]) -> Tuple[str, str]:
+    system_prompt = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    user_prompt = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    return system_prompt, user_prompt
@@ -0,0 +1,344 @@
+# backend/services/profiling.py
+"""
+On-demand request profiling.
+
+ProfilingMiddleware decides per request whether to profile: an admin sends
+`X-Profile: cprofile` (or `sample`) with the configured X-Profile-Token, or
+a random fraction of requests is picked. Without a configured token, header
+requests are ignored and stored profiles can't be read. The decision travels in a context variable into the threadpool
+thread that runs the (sync) endpoint; endpoints are wrapped through a route
+class, and the wrapper runs the endpoint under the chosen profiler:
+
+- cprofile: deterministic, exact call counts, noticeably slower
+- sample: a side thread reads the endpoint thread's stack every few
+  milliseconds; cheap enough to leave on for a sample of production traffic
+
+The top functions of each profile are kept in a bounded buffer for
+/api/profiles. Work the endpoint hands to other threads (hedged LLM calls,
+judge ensembles) is not included.
+"""
+import contextvars
+import cProfile
+import functools
+import hmac
+import inspect
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from typing import Callable, Dict, Iterable, List, Optional
+
+from fastapi.routing import APIRoute
+
+MODES = ("cprofile", "sample")
+
+_SESSION: contextvars.ContextVar[Optional["ProfileSession"]] = contextvars.ContextVar("profile_session", default=None)
+
+
+def _label(filename: str, line: int, name: str) -> str:
+    try:
+        filename = os.path.relpath(filename)
+    except ValueError:
+        pass
+    if filename.startswith(".."):
+        filename = os.path.join(*filename.split(os.sep)[-2:])
+    return f"{filename}:{line}({name})"
+
+
+class ProfileSession:
+    """Profile data collected for one request"""
+
+    def __init__(self, mode: str, interval: float = 0.005):
+        """
+        Initialize the session.
+
+        Args:
+            mode: "cprofile" or "sample"
+            interval: Seconds between stack samples in sample mode
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode {mode!r}")
+        self.mode = mode
+        self.interval = interval
+        # function label -> [calls, self seconds, total seconds]
+        self.functions: Dict[str, List] = defaultdict(lambda: [0, 0.0, 0.0])
+        self.samples = 0
+        self.profiled_s = 0.0
+        self.ran = False
+        self._lock = threading.Lock()
+
+    def run(self, fn: Callable, args, kwargs):
+        """Call fn under this session's profiler"""
+        self.ran = True
+        start = time.perf_counter()
+        try:
+            if self.mode == "cprofile":
+                profile = cProfile.Profile()
+                profile.enable()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    profile.disable()
+                    self._add_stats(pstats.Stats(profile))
+            stop = threading.Event()
+            sampler = threading.Thread(target=self._sample, args=(threading.get_ident(), sys._getframe(), stop),
+                                       name="profile-sampler", daemon=True)
+            sampler.start()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stop.set()
+                sampler.join()
+        finally:
+            with self._lock:
+                self.profiled_s += time.perf_counter() - start
+
+    def top(self, n: int) -> List[Dict]:
+        """The n most expensive functions by total time plus the n by self time, most expensive first"""
+        with self._lock:
+            items = list(self.functions.items())
+        by_total = sorted(items, key=lambda kv: kv[1][2], reverse=True)[:n]
+        by_self = sorted(items, key=lambda kv: kv[1][1], reverse=True)[:n]
+        picked = dict(by_total + by_self)
+        out = []
+        for label, (calls, self_s, total_s) in sorted(picked.items(), key=lambda kv: kv[1][2], reverse=True):
+            entry = {"function": label, "self_ms": round(self_s * 1000, 3), "total_ms": round(total_s * 1000, 3)}
+            if self.mode == "cprofile":
+                entry["calls"] = calls
+            else:
+                entry["samples"] = calls
+            out.append(entry)
+        return out
+
+    def _add_stats(self, stats: pstats.Stats):
+        with self._lock:
+            for (filename, line, name), (_, calls, self_s, total_s, _) in stats.stats.items():
+                entry = self.functions[_label(filename, line, name)]
+                entry[0] += calls
+                entry[1] += self_s
+                entry[2] += total_s
+
+    def _sample(self, thread_id: int, run_frame, stop: threading.Event):
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            # Only the frames above run(): the endpoint and what it calls
+            while frame is not None and frame is not run_frame:
+                code = frame.f_code
+                stack.append(_label(code.co_filename, code.co_firstlineno, getattr(code, "co_qualname", code.co_name)))
+                frame = frame.f_back
+            if frame is None or not stack:
+                continue
+            with self._lock:
+                self.samples += 1
+                self.functions[stack[0]][1] += self.interval
+                for label in set(stack):
+                    entry = self.functions[label]
+                    entry[0] += 1
+                    entry[2] += self.interval
+
+
+class Profiler:
+    """Decides which requests to profile and keeps the most recent profiles"""
+
+    def __init__(self, enabled: bool = True, sample_rate: float = 0.0, mode: str = "sample",
+                 interval_ms: float = 5, top_n: int = 25, capacity: int = 50, token: Optional[str] = None,
+                 trace_id: Optional[Callable[[], Optional[str]]] = None, rng: Optional[random.Random] = None):
+        """
+        Initialize the profiler.
+
+        Args:
+            enabled: Honour profiling requests at all
+            sample_rate: Fraction of requests profiled without being asked
+            mode: Profiler used for sampled requests ("sample" or "cprofile")
+            interval_ms: Stack sampling interval in sample mode
+            top_n: Functions kept per profile (by total and by self time)
+            capacity: Profiles kept in memory
+            token: Secret required in X-Profile-Token to request a profile or
+                read profiles (None: nobody can do either; sampling still works)
+            trace_id: Returns the current trace id, stored with each profile
+            rng: Random source for sampling
+        """
+        self.configure(enabled, sample_rate, mode, interval_ms, top_n, capacity, token, trace_id, rng)
+
+    def configure(self, enabled: bool = True, sample_rate: float = 0.0, mode: str = "sample",
+                  interval_ms: float = 5, top_n: int = 25, capacity: int = 50, token: Optional[str] = None,
+                  trace_id: Optional[Callable[[], Optional[str]]] = None, rng: Optional[random.Random] = None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode {mode!r}")
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.mode = mode
+        self.interval = interval_ms / 1000
+        self.top_n = top_n
+        self.token = token
+        self.trace_id = trace_id
+        self.rng = rng or random.Random()
+        self._profiles: deque = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def authorized(self, token: Optional[str]) -> bool:
+        """Whether token grants admin access; always False when no token is configured"""
+        if self.token is None or token is None:
+            return False
+        # compare_digest only takes ASCII str; headers arrive latin-1 decoded
+        return hmac.compare_digest(token.encode("utf-8"), self.token.encode("utf-8"))
+
+    def requested_mode(self, header: Optional[str], token: Optional[str]) -> Optional[str]:
+        """
+        Profiling mode for a request, or None to run it unprofiled.
+
+        Args:
+            header: X-Profile value: "cprofile", "sample", or "1" for cprofile
+            token: X-Profile-Token value
+        """
+        if not self.enabled:
+            return None
+        if header and self.authorized(token):
+            header = header.strip().lower()
+            if header in MODES:
+                return header
+            if header in ("1", "true", "yes"):
+                return "cprofile"
+        if self.sample_rate > 0 and self.rng.random() < self.sample_rate:
+            return self.mode
+        return None
+
+    def session(self, mode: str) -> ProfileSession:
+        return ProfileSession(mode, self.interval)
+
+    def wrap(self, fn: Callable) -> Callable:
+        """
+        Run a sync endpoint under the request's profile session, if any.
+        Coroutine endpoints are returned unchanged: on the event loop a
+        profile would pick up every other request's work as well.
+        """
+        if inspect.iscoroutinefunction(fn):
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            session = _SESSION.get()
+            if session is None:
+                return fn(*args, **kwargs)
+            return session.run(fn, args, kwargs)
+        return wrapper
+
+    def record(self, session: ProfileSession, method: str, path: str, route: Optional[str],
+               status: Optional[int], duration_s: float, trace_id: Optional[str] = None,
+               profile_id: Optional[str] = None) -> Dict:
+        profile = {
+            "profile_id": profile_id or uuid.uuid4().hex[:16],
+            "trace_id": trace_id,
+            "started": round(time.time() - duration_s, 3),
+            "method": method,
+            "path": path,
+            "route": route,
+            "status": status,
+            "mode": session.mode,
+            "duration_ms": round(duration_s * 1000, 2),
+            "profiled_ms": round(session.profiled_s * 1000, 2),
+            "samples": session.samples if session.mode == "sample" else None,
+            "functions": session.top(self.top_n)
+        }
+        with self._lock:
+            self._profiles.append(profile)
+        return profile
+
+    def recent(self, limit: int = 20, route: Optional[str] = None) -> List[Dict]:
+        """Profiles newest first, without their function tables"""
+        with self._lock:
+            profiles = list(self._profiles)
+        out = []
+        for profile in reversed(profiles):
+            if route and route not in (profile["route"] or profile["path"]):
+                continue
+            summary = {k: v for k, v in profile.items() if k != "functions"}
+            summary["top_function"] = profile["functions"][0]["function"] if profile["functions"] else None
+            out.append(summary)
+            if len(out) >= limit:
+                break
+        return out
+
+    def get(self, profile_id: str, sort: str = "total") -> Optional[Dict]:
+        with self._lock:
+            profiles = list(self._profiles)
+        for profile in profiles:
+            if profile["profile_id"] == profile_id:
+                key = "self_ms" if sort == "self" else "total_ms"
+                return {**profile, "functions": sorted(profile["functions"], key=lambda f: f[key], reverse=True)}
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+
+
+def profiled_route(profiler: Profiler):
+    """APIRoute subclass that wraps each endpoint for `profiler`; set it as app.router.route_class"""
+
+    class ProfiledRoute(APIRoute):
+        def __init__(self, path: str, endpoint: Callable, **kwargs):
+            super().__init__(path, profiler.wrap(endpoint), **kwargs)
+
+    return ProfiledRoute
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware starting a profile session for requests that ask for
+    one (X-Profile header) or are sampled, and recording it once the
+    response has been sent. Adds an X-Profile-Id header to profiled responses.
+    """
+
+    def __init__(self, app, profiler: Profiler, skip_paths: Iterable[str] = (), skip_prefixes: Iterable[str] = ()):
+        self.app = app
+        self.profiler = profiler
+        self.skip_paths = set(skip_paths)
+        self.skip_prefixes = tuple(skip_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if (scope["type"] != "http" or not self.profiler.enabled or path in self.skip_paths
+                or path.startswith(self.skip_prefixes)):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or ())
+        header = headers.get(b"x-profile")
+        token = headers.get(b"x-profile-token")
+        mode = self.profiler.requested_mode(header.decode("latin-1") if header else None,
+                                            token.decode("latin-1") if token else None)
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        session = self.profiler.session(mode)
+        profile_id = uuid.uuid4().hex[:16]
+        trace_id = self.profiler.trace_id() if self.profiler.trace_id else None
+        state = {"status": None}
+
+        async def send_profiled(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        reset = _SESSION.set(session)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_profiled)
+        finally:
+            _SESSION.reset(reset)
+            if session.ran:
+                route = scope.get("route")
+                self.profiler.record(session, scope.get("method", ""), path, getattr(route, "path", None),
+                                     state["status"], time.perf_counter() - start, trace_id, profile_id)
+
+
+# Process-wide profiler; main configures it from the environment
+profiler = Profiler()
@@ -0,0 +1,206 @@
+# backend/services/rate_limiter.py
+"""
+Client-side request scheduler for rate-limited LLM APIs.
+
+Keeps token buckets for requests/minute and tokens/minute, paces callers
+against them in priority order, and corrects its view of the remaining
+budget from the provider's rate-limit response headers.
+"""
+import heapq
+import itertools
+import math
+import re
+import threading
+import time
+from typing import Dict, Mapping, Optional
+
+
+# Lower value = served first
+PRIORITY_JUDGE = 0
+PRIORITY_DEBATE = 1
+PRIORITY_ENHANCEMENT = 2
+
+ENDPOINT_PRIORITIES = {
+    "judge": PRIORITY_JUDGE,
+    "judge_ensemble": PRIORITY_JUDGE,
+    "judge_incremental": PRIORITY_JUDGE,
+    "continue": PRIORITY_DEBATE,
+    "openings": PRIORITY_DEBATE,
+    "agent": PRIORITY_DEBATE,
+    "summary": PRIORITY_DEBATE,
+    "enhancement": PRIORITY_ENHANCEMENT,
+}
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_SECONDS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+class RateLimitExceeded(RuntimeError):
+    """Raised when a request could not be scheduled within its wait budget"""
+
+
+def estimate_tokens(*texts: str, max_tokens: int = 0) -> int:
+    """Rough prompt + completion token estimate (~4 characters per token)"""
+    return sum(len(t) for t in texts) // 4 + max_tokens
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """Parse Groq reset durations such as '2m59.56s', '7.66s' or '120ms'"""
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    if not parts:
+        return None
+    return sum(float(n) * _UNIT_SECONDS[unit] for n, unit in parts)
+
+
+class TokenBucket:
+    """Continuous-refill token bucket; the level may go negative on debits"""
+
+    def __init__(self, capacity: float, per_seconds: float = 60, clock=time.monotonic):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / per_seconds
+        self.level = float(capacity)
+        self._clock = clock
+        self._last = clock()
+
+    def refill(self):
+        now = self._clock()
+        self.level = min(self.capacity, self.level + (now - self._last) * self.rate)
+        self._last = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` is available (0 if it is now)"""
+        self.refill()
+        # A request larger than the bucket goes through once the bucket is full
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self.refill()
+        self.level -= amount
+
+
+class RateLimiter:
+    """
+    Paces requests against requests/minute and tokens/minute budgets.
+
+    Waiters are served strictly in (priority, arrival) order, so a judge
+    call queued behind debate turns goes first and nothing bursts past the
+    budget to fail with a 429.
+    """
+
+    def __init__(self, rpm: int = 30, tpm: int = 12000, clock=time.monotonic):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            rpm: Requests allowed per minute
+            tpm: Tokens (prompt + completion) allowed per minute
+            clock: Monotonic clock, injectable for tests
+        """
+        self._clock = clock
+        self.requests = TokenBucket(rpm, clock=clock)
+        self.tokens = TokenBucket(tpm, clock=clock)
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self.counts = {"granted": 0, "timed_out": 0, "waited_s": 0.0, "throttled_by_server": 0}
+
+    def acquire(self, tokens: int, priority: int = PRIORITY_DEBATE, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for budget for one request of `tokens` estimated tokens.
+
+        Returns:
+            True once the budget is reserved, False if `timeout` elapsed first
+        """
+        start = self._clock()
+        deadline = None if timeout is None else start + timeout
+        ticket = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    wait = self._wait_time(tokens) if self._queue[0] == ticket else None
+                    if wait == 0:
+                        heapq.heappop(self._queue)
+                        self.requests.take(1)
+                        self.tokens.take(tokens)
+                        self.counts["granted"] += 1
+                        self.counts["waited_s"] += self._clock() - start
+                        return True
+                    now = self._clock()
+                    if deadline is not None and now >= deadline:
+                        self._queue.remove(ticket)
+                        heapq.heapify(self._queue)
+                        self.counts["timed_out"] += 1
+                        return False
+                    # Head waits for refill; others wait to be woken when the head moves
+                    limit = wait if wait is not None else 1.0
+                    if deadline is not None:
+                        limit = min(limit, deadline - now)
+                    self._cond.wait(max(limit, 0.001))
+            finally:
+                self._cond.notify_all()
+
+    def reconcile(self, estimated: int, actual: int):
+        """Correct the token bucket once the real usage is known"""
+        with self._cond:
+            self.tokens.take(actual - estimated)
+            self._cond.notify_all()
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """
+        Sync with the server's view of the budget.
+
+        Understands Groq's x-ratelimit-{limit,remaining,reset}-{requests,tokens}
+        headers and retry-after.
+        """
+        headers = {k.lower(): v for k, v in dict(headers or {}).items()}
+        now = self._clock()
+        with self._cond:
+            remaining_tokens = _to_int(headers.get("x-ratelimit-remaining-tokens"))
+            if remaining_tokens is not None:
+                self.tokens.refill()
+                self.tokens.level = min(self.tokens.level, remaining_tokens)
+
+            # Groq's request limit is per day; only act when it's exhausted
+            if _to_int(headers.get("x-ratelimit-remaining-requests")) == 0:
+                reset = parse_duration(headers.get("x-ratelimit-reset-requests", ""))
+                if reset:
+                    self._paused_until = max(self._paused_until, now + reset)
+
+            retry_after = parse_duration(headers.get("retry-after", "")) if "retry-after" in headers else None
+            if retry_after:
+                self.counts["throttled_by_server"] += 1
+                self._paused_until = max(self._paused_until, now + retry_after)
+            self._cond.notify_all()
+
+    def snapshot(self) -> Dict:
+        with self._cond:
+            self.requests.refill()
+            self.tokens.refill()
+            return {
+                "queued": len(self._queue),
+                "requests_available": math.floor(self.requests.level),
+                "tokens_available": math.floor(self.tokens.level),
+                "paused_for_s": round(max(self._paused_until - self._clock(), 0), 1),
+                **{k: round(v, 2) if isinstance(v, float) else v for k, v in self.counts.items()}
+            }
+
+    def _wait_time(self, tokens: int) -> float:
+        pause = max(self._paused_until - self._clock(), 0.0)
+        return max(pause, self.requests.wait_time(1), self.tokens.wait_time(tokens))
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,121 @@
+# backend/services/serialization.py
+"""
+JSON serialization used for persistence and pre-serialized responses.
+
+orjson is used when installed (compact output, native datetime/numpy support);
+the stdlib json module is the fallback. Set JSON_BACKEND=json to force the
+stdlib backend and JSON_PRETTY=1 to pretty-print files on disk for debugging.
+"""
+import json
+import os
+from pathlib import Path
+from typing import Any, Union
+
+from services.tracing import tracer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Fallback for types neither backend handles natively (matches default=str)"""
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    return str(obj)
+
+
+class StdlibSerializer:
+    name = "json"
+
+    def dumps(self, obj: Any, pretty: bool = False) -> bytes:
+        if pretty:
+            text = json.dumps(obj, indent=2, ensure_ascii=False, default=_default)
+        else:
+            text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default)
+        return text.encode("utf-8")
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+
+class OrjsonSerializer:
+    name = "orjson"
+
+    def dumps(self, obj: Any, pretty: bool = False) -> bytes:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        # orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers'
+        # existing except clauses keep working
+        return orjson.loads(data)
+
+
+_BACKENDS = {"json": StdlibSerializer}
+if orjson is not None:
+    _BACKENDS["orjson"] = OrjsonSerializer
+
+PRETTY_JSON = os.getenv("JSON_PRETTY", "").lower() in ("1", "true", "yes")
+
+serializer = None
+
+
+def set_backend(name: str) -> None:
+    """Select the serializer backend ("orjson" or "json")"""
+    global serializer
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown or unavailable JSON backend: {name}")
+    serializer = _BACKENDS[name]()
+
+
+def available_backends() -> list:
+    return list(_BACKENDS)
+
+
+set_backend(os.getenv("JSON_BACKEND", "orjson" if orjson is not None else "json"))
+
+
+def dumps(obj: Any, pretty: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes"""
+    return serializer.dumps(obj, pretty=pretty)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Parse JSON bytes or text"""
+    return serializer.loads(data)
+
+
+def read_json(path: Union[str, Path]) -> Any:
+    """Read and parse a JSON file (raises FileNotFoundError / JSONDecodeError)"""
+    with tracer.span("storage.read", file=Path(path).name) as span:
+        with open(path, "rb") as f:
+            data = f.read()
+        span.set(bytes=len(data))
+        return serializer.loads(data)
+
+
+def write_json(path: Union[str, Path], obj: Any, pretty: bool = None) -> None:
+    """
+    Atomically write obj as JSON: write to a temp file, then rename over the target.
+    Compact unless pretty (or JSON_PRETTY) is set.
+    """
+    path = Path(path)
+    with tracer.span("storage.write", file=path.name) as span:
+        data = serializer.dumps(obj, pretty=PRETTY_JSON if pretty is None else pretty)
+        span.set(bytes=len(data))
+        temp_path = path.with_suffix(path.suffix + ".tmp")
+
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            temp_path.replace(path)
+        except Exception:
+            if temp_path.exists():
+                temp_path.unlink()
+            raise
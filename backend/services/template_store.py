@@ -0,0 +1,123 @@
+# backend/services/template_store.py
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from services.serialization import dumps, read_json
+
+
+class _Snapshot:
+    """One parsed version of the templates file"""
+
+    def __init__(self, templates: List[dict], signature: Optional[Tuple[int, int]], debug_path: Optional[str] = None):
+        self.templates = templates
+        self.signature = signature
+        self.by_slug: Dict[str, dict] = {}
+        for template in templates:
+            slug = template.get('slug')
+            if slug:
+                self.by_slug[slug] = template
+        # Slugs of templates merged away by the library audit keep resolving
+        for template in templates:
+            for alias in template.get('merged_slugs', []):
+                self.by_slug.setdefault(alias, template)
+
+        payload = {"templates": templates, "count": len(templates)}
+        if debug_path is not None:
+            payload["debug"] = debug_path
+        self.list_body = dumps(payload)
+        self.list_etag = _etag(self.list_body)
+        self.slug_payloads: Dict[str, Tuple[bytes, str]] = {}
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+class TemplateStore:
+    """
+    In-memory view of the debate template library.
+
+    Keeps the parsed templates, a slug -> template map and pre-serialized
+    response bodies with ETags. The snapshot is rebuilt only when the file's
+    mtime/size changes or when invalidate() is called after a write.
+    """
+
+    def __init__(self, templates_path: str = "data/debate_templates.json"):
+        """
+        Initialize the template store.
+
+        Args:
+            templates_path: Path to debate templates JSON file
+        """
+        self.templates_path = Path(templates_path)
+        self._snapshot: Optional[_Snapshot] = None
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        """Drop the cached snapshot so the next read reloads the file"""
+        with self._lock:
+            self._snapshot = None
+
+    def get_templates(self) -> List[dict]:
+        """Get all templates"""
+        return self._current().templates
+
+    def get_template(self, slug: str) -> Optional[dict]:
+        """Get a template by slug (or by a slug merged into it)"""
+        return self._current().by_slug.get(slug)
+
+    def list_payload(self) -> Tuple[bytes, str]:
+        """Serialized {"templates": [...], "count": n} body and its ETag"""
+        snapshot = self._current()
+        return snapshot.list_body, snapshot.list_etag
+
+    def template_payload(self, slug: str) -> Optional[Tuple[bytes, str]]:
+        """Serialized {"template": {...}} body and its ETag, or None if unknown"""
+        snapshot = self._current()
+        cached = snapshot.slug_payloads.get(slug)
+        if cached is not None:
+            return cached
+
+        template = snapshot.by_slug.get(slug)
+        if template is None:
+            return None
+
+        body = dumps({"template": template})
+        cached = (body, _etag(body))
+        snapshot.slug_payloads[slug] = cached
+        return cached
+
+    def _current(self) -> _Snapshot:
+        """Return the cached snapshot, reloading it if the file changed"""
+        signature = self._file_signature()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.signature == signature:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.signature != signature:
+                snapshot = self._load(signature)
+                self._snapshot = snapshot
+            return snapshot
+
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.templates_path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self, signature: Optional[Tuple[int, int]]) -> _Snapshot:
+        """Parse the templates file into a new snapshot"""
+        if signature is None:
+            return _Snapshot([], None, debug_path=str(self.templates_path))
+
+        templates = read_json(self.templates_path)
+
+        if not isinstance(templates, list):
+            templates = []
+
+        return _Snapshot(templates, signature)
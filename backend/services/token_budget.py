@@ -0,0 +1,92 @@
+# backend/services/token_budget.py
+"""
+Adaptive completion-length budgets.
+
+Records how long completions actually are per endpoint and agent and caps
+max_tokens at a high percentile of that plus a margin, so prompts asking
+for 2-3 sentences don't reserve (and on some backends, schedule) several
+hundred tokens they never use. Custom agents share one key per endpoint,
+so the number of keys stays bounded.
+"""
+import math
+import threading
+from collections import defaultdict, deque
+from typing import Dict
+
+from services.rate_limiter import estimate_tokens
+
+
+class _Window:
+    def __init__(self, size: int):
+        self.lengths = deque(maxlen=size)
+        self.truncated = deque(maxlen=size)
+
+
+class BudgetController:
+    """Per-key max_tokens from observed completion lengths"""
+
+    def __init__(self, percentile: float = 95, margin: float = 1.25, pad: int = 16,
+                 min_samples: int = 20, floor: int = 48, window: int = 200,
+                 max_truncation_rate: float = 0.05):
+        """
+        Initialize the budget controller.
+
+        Args:
+            percentile: Completion-length percentile the budget covers
+            margin: Multiplier on that percentile
+            pad: Tokens added after the margin
+            min_samples: Completions needed before the default is replaced
+            floor: Smallest budget ever returned
+            window: Completions remembered per key
+            max_truncation_rate: Share of completions that may hit the
+                budget before the key falls back to its default
+        """
+        self.percentile = percentile
+        self.margin = margin
+        self.pad = pad
+        self.min_samples = min_samples
+        self.floor = floor
+        self.window = window
+        self.max_truncation_rate = max_truncation_rate
+        self._lock = threading.Lock()
+        self._windows: Dict[str, _Window] = defaultdict(lambda: _Window(self.window))
+
+    def budget(self, key: str, default: int) -> int:
+        """
+        Token budget for the next completion under `key`.
+
+        The caller's hard-coded limit is the ceiling; the budget only ever
+        shrinks below it.
+        """
+        with self._lock:
+            w = self._windows.get(key)
+            if w is None or len(w.lengths) < self.min_samples:
+                return default
+            if sum(w.truncated) / len(w.truncated) > self.max_truncation_rate:
+                return default
+            lengths = sorted(w.lengths)
+        rank = min(len(lengths) - 1, max(0, math.ceil(self.percentile / 100 * len(lengths)) - 1))
+        learned = math.ceil(lengths[rank] * self.margin) + self.pad
+        return max(self.floor, min(default, learned))
+
+    def record(self, key: str, completion: str, budget: int):
+        """Record a completion generated under `budget` tokens"""
+        tokens = estimate_tokens(completion)
+        with self._lock:
+            w = self._windows[key]
+            w.lengths.append(tokens)
+            # Token counts are estimated, so "close to the limit" counts as cut off
+            w.truncated.append(tokens >= 0.9 * budget)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            keys = {k: (sorted(w.lengths), sum(w.truncated)) for k, w in self._windows.items()}
+        out = {}
+        for key, (lengths, truncated) in keys.items():
+            rank = min(len(lengths) - 1, max(0, math.ceil(self.percentile / 100 * len(lengths)) - 1))
+            out[key] = {
+                "samples": len(lengths),
+                f"p{int(self.percentile)}_tokens": lengths[rank] if lengths else None,
+                "truncated": truncated
+            }
+        return out
@@ -0,0 +1,316 @@
+# backend/services/tracing.py
+"""
+Lightweight request tracing.
+
+Spans nest through a context variable: the HTTP middleware opens the
+root span for a request (root=True), and anything called underneath
+(agent turns, LLM calls, parsing, JSON storage) opens children with
+`tracer.span(...)` without passing anything around. Finished traces go into a bounded ring
+buffer that /api/traces queries; slow ones can also be appended to a
+size-capped JSON-lines file.
+
+Work handed to another thread keeps its parent by running under
+`contextvars.copy_context()`.
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+log = logging.getLogger(__name__)
+
+
+class Span:
+    """One timed operation within a trace"""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start", "duration_ms", "attributes", "error", "_t0")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict):
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time()
+        self.duration_ms: Optional[float] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self._t0 = time.perf_counter()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def rename(self, name: str):
+        self.name = name
+
+    def incr(self, key: str, n: int = 1):
+        self.attributes[key] = self.attributes.get(key, 0) + n
+
+    def to_dict(self) -> Dict:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "offset_ms": round((self.start - self.trace.start) * 1000, 2),
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+
+class Trace:
+    """All spans recorded under one root span"""
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.start = time.time()
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    @property
+    def root(self) -> Optional[Span]:
+        return self.spans[0] if self.spans else None
+
+    def summary(self) -> Dict:
+        root = self.root
+        with self._lock:
+            count = len(self.spans)
+            errors = sum(1 for s in self.spans if s.error)
+        return {
+            "trace_id": self.trace_id,
+            "name": root.name if root else None,
+            "start": round(self.start, 3),
+            "duration_ms": root.duration_ms if root else None,
+            "span_count": count,
+            "errors": errors,
+            "attributes": dict(root.attributes) if root else {}
+        }
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            spans = [s.to_dict() for s in self.spans]
+        return {**self.summary(), "spans": spans}
+
+
+_CURRENT: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("trace_span", default=None)
+
+
+class _NoopSpan:
+    """Stands in for a span when nothing is being traced"""
+
+    def set(self, **attributes):
+        pass
+
+    def rename(self, name: str):
+        pass
+
+    def incr(self, key: str, n: int = 1):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Tracer:
+    """Creates spans and keeps the most recent traces"""
+
+    def __init__(self, enabled: bool = True, capacity: int = 200, path: Optional[str] = None,
+                 slow_ms: float = 1000, max_file_bytes: int = 10 * 1024 * 1024):
+        """
+        Initialize the tracer.
+
+        Args:
+            enabled: Record spans at all; when off, span() costs one check
+            capacity: Finished traces kept in memory
+            path: JSON-lines file that slow traces are appended to (None: memory only)
+            slow_ms: Root duration at or above which a trace is written to `path`
+            max_file_bytes: Size at which `path` is rotated to `path`.1
+        """
+        self.configure(enabled, capacity, path, slow_ms, max_file_bytes)
+
+    def configure(self, enabled: bool = True, capacity: int = 200, path: Optional[str] = None,
+                  slow_ms: float = 1000, max_file_bytes: int = 10 * 1024 * 1024):
+        self.enabled = enabled
+        self.path = path
+        self.slow_ms = slow_ms
+        self.max_file_bytes = max_file_bytes
+        self._traces: deque = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, root: bool = False, **attributes):
+        """
+        Time a block as a child of the current span. Exceptions are recorded
+        and re-raised.
+
+        Args:
+            name: Span name, e.g. "llm.generate"
+            root: Start a new trace when there is no current span; otherwise
+                work outside a traced request (startup, scripts) is not recorded
+            **attributes: Initial span attributes
+        """
+        parent = _CURRENT.get()
+        if not self.enabled or (parent is None and not root):
+            yield _NOOP
+            return
+        trace = parent.trace if parent is not None else Trace()
+        span = Span(trace, name, parent.span_id if parent is not None else None, attributes)
+        trace.add(span)
+        token = _CURRENT.set(span)
+        start = time.perf_counter()
+        span._t0 = start
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"[:300]
+            raise
+        finally:
+            _CURRENT.reset(token)
+            self.end(span)
+
+    def end(self, span):
+        """
+        Stop a span's clock (idempotent). Lets a request's root span end when
+        the response is sent, before background tasks run under it.
+        """
+        if not isinstance(span, Span) or span.duration_ms is not None:
+            return
+        span.duration_ms = round((time.perf_counter() - span._t0) * 1000, 2)
+        if span.parent_id is None:
+            self._finish(span.trace)
+
+    def traced(self, name: Optional[str] = None):
+        """Decorator form of span()"""
+        def decorator(fn):
+            span_name = name or fn.__qualname__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or _CURRENT.get() is None:
+                    return fn(*args, **kwargs)
+                with self.span(span_name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def current():
+        """The active span (a no-op stand-in outside any trace)"""
+        span = _CURRENT.get()
+        return span if span is not None else _NOOP
+
+    def current_trace_id(self) -> Optional[str]:
+        span = _CURRENT.get()
+        return span.trace.trace_id if span is not None else None
+
+    def recent(self, limit: int = 50, min_ms: float = 0, name: Optional[str] = None,
+               errors_only: bool = False) -> List[Dict]:
+        """Summaries of finished traces, newest first, optionally only slow/matching/failed ones"""
+        with self._lock:
+            traces = list(self._traces)
+        out = []
+        for trace in reversed(traces):
+            summary = trace.summary()
+            if (summary["duration_ms"] or 0) < min_ms:
+                continue
+            if name and name not in (summary["name"] or ""):
+                continue
+            if errors_only and not summary["errors"]:
+                continue
+            out.append(summary)
+            if len(out) >= limit:
+                break
+        return out
+
+    def get(self, trace_id: str) -> Optional[Dict]:
+        with self._lock:
+            traces = list(self._traces)
+        for trace in traces:
+            if trace.trace_id == trace_id:
+                return trace.to_dict()
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._traces.clear()
+
+    def _finish(self, trace: Trace):
+        with self._lock:
+            self._traces.append(trace)
+        root = trace.root
+        if self.path and root is not None and root.duration_ms >= self.slow_ms:
+            self._persist(trace)
+
+    def _persist(self, trace: Trace):
+        line = json.dumps(trace.to_dict(), ensure_ascii=False, default=str) + "\n"
+        with self._file_lock:
+            try:
+                if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_file_bytes:
+                    os.replace(self.path, self.path + ".1")
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+            except OSError as e:
+                log.warning("Failed to write trace %s: %s", trace.trace_id, e)
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening the root span of each HTTP request.
+
+    Adds an X-Trace-Id response header and names the trace after the route
+    template ("GET /api/debates/{debate_id}") so requests group by endpoint.
+    Written as plain ASGI: BaseHTTPMiddleware costs about a millisecond per
+    request and runs the app in a separate task.
+    """
+
+    def __init__(self, app, tracer: "Tracer", skip_paths: Iterable[str] = (), skip_prefixes: Iterable[str] = ()):
+        self.app = app
+        self.tracer = tracer
+        self.skip_paths = set(skip_paths)
+        self.skip_prefixes = tuple(skip_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if (scope["type"] != "http" or not self.tracer.enabled or path in self.skip_paths
+                or path.startswith(self.skip_prefixes)):
+            await self.app(scope, receive, send)
+            return
+
+        method = scope.get("method", "")
+        with self.tracer.span(f"{method} {path}", root=True, method=method, path=path) as span:
+            trace_id = span.trace.trace_id.encode()
+
+            async def send_traced(message):
+                if message["type"] == "http.response.start":
+                    span.set(status=message["status"])
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"x-trace-id", trace_id)]
+                elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                    self._name(span, scope, method)
+                    self.tracer.end(span)
+                await send(message)
+
+            await self.app(scope, receive, send_traced)
+            self._name(span, scope, method)
+
+    @staticmethod
+    def _name(span, scope, method):
+        route = scope.get("route")
+        if route is not None and getattr(route, "path", None):
+            span.rename(f"{method} {route.path}")
+
+
+# Process-wide tracer; main configures it from the environment
+tracer = Tracer()
@@ -0,0 +1,189 @@
+# backend/test/test_agent_leaderboard.py
+"""
+Unit tests for the agent leaderboard and AgentService listings
+"""
+
+import random
+import threading
+
+import pytest
+from models.custom_agent import AgentCreationRequest, AgentRating
+from services.agent_leaderboard import AgentLeaderboard
+from services.agent_service import AgentService
+
+
+def record(rating=0.0, usage=0, public=True):
+    return {"average_rating": rating, "usage_count": usage, "is_public": public}
+
+
+def sort_order(agents, public_only=True):
+    """The ranking list_agents used to compute by sorting on every call"""
+    items = [(aid, r) for aid, r in agents.items() if r["is_public"] or not public_only]
+    items.sort(key=lambda item: (item[1]["average_rating"], item[1]["usage_count"]), reverse=True)
+    return [aid for aid, _ in items]
+
+
+class TestAgentLeaderboard:
+    """Unit tests for AgentLeaderboard"""
+
+    def test_rating_then_usage(self):
+        """Test agents rank by rating, then usage, ties in insertion order"""
+        board = AgentLeaderboard()
+        board.update("a", record(4.0, 1))
+        board.update("b", record(4.5, 0))
+        board.update("c", record(4.0, 3))
+        board.update("d", record(4.0, 1))
+
+        assert board.page(limit=10) == ["b", "c", "a", "d"]
+        assert board.rank("a") == 2
+
+    def test_updates_move_agents(self):
+        """Test a rating or usage change re-ranks only that agent"""
+        board = AgentLeaderboard()
+        for aid in "abc":
+            board.update(aid, record())
+        board.update("c", record(usage=1))
+        assert board.page() == ["c", "a", "b"]
+
+        board.update("c", record())
+        assert board.page() == ["a", "b", "c"]
+
+    def test_public_and_private(self):
+        """Test private agents only appear in the full ranking"""
+        board = AgentLeaderboard()
+        board.update("pub", record(3.0))
+        board.update("priv", record(5.0, public=False))
+
+        assert board.page() == ["pub"]
+        assert board.page(public_only=False) == ["priv", "pub"]
+        assert board.rank("priv", public_only=True) is None
+
+        board.update("priv", record(5.0))
+        assert board.page() == ["priv", "pub"]
+
+    def test_pages_and_remove(self):
+        """Test offset/limit slices and removal"""
+        board = AgentLeaderboard()
+        for i in range(10):
+            board.update(str(i), record(usage=i))
+
+        assert board.page(offset=2, limit=3) == ["7", "6", "5"]
+        assert board.page(offset=20) == []
+        assert board.page(limit=0) == []
+
+        board.remove("9")
+        board.remove("missing")
+        assert board.page(limit=2) == ["8", "7"]
+        assert len(board) == 9
+
+    def test_matches_full_sort(self):
+        """Test random incremental updates agree with sorting from scratch"""
+        rng = random.Random(7)
+        agents = {}
+        board = AgentLeaderboard()
+        for _ in range(500):
+            aid = f"agent-{rng.randrange(60)}"
+            if rng.random() < 0.1 and aid in agents:
+                del agents[aid]
+                board.remove(aid)
+                continue
+            agents[aid] = record(rng.choice([0.0, 3.5, 4.0, 4.5]), rng.randrange(5), rng.random() < 0.8)
+            board.update(aid, agents[aid])
+
+        rebuilt = AgentLeaderboard()
+        rebuilt.rebuild(agents)
+        assert rebuilt.page(limit=100) == sort_order(agents)
+        assert rebuilt.page(limit=100, public_only=False) == sort_order(agents, public_only=False)
+        # Ties may differ from a fresh sort (re-added agents go last), but the ranking keys agree
+        def keys(ids):
+            return [(agents[a]["average_rating"], agents[a]["usage_count"]) for a in ids]
+        assert keys(board.page(limit=100)) == keys(sort_order(agents))
+
+
+class TestAgentServiceListing:
+    """Unit tests for AgentService listings backed by the leaderboard"""
+
+    @pytest.fixture
+    def service(self, tmp_path):
+        service = AgentService(storage_path=str(tmp_path))
+        for name in ("Alpha", "Beta", "Gamma"):
+            service.create_agent(AgentCreationRequest(name=name, description=f"{name} agent ".ljust(60, ".")),
+                                 "prompt", "system")
+        return service
+
+    def ids(self, service, **kwargs):
+        return [a.name for a in service.list_agents(**kwargs)]
+
+    def test_usage_and_ratings_reorder(self, service):
+        """Test increment_usage and add_rating move agents up"""
+        assert self.ids(service) == ["Alpha", "Beta", "Gamma"]
+
+        gamma = service.get_agent_by_name("Gamma")
+        service.increment_usage(gamma.id)
+        assert self.ids(service) == ["Gamma", "Alpha", "Beta"]
+
+        beta = service.get_agent_by_name("Beta")
+        service.add_rating(AgentRating(agent_id=beta.id, debate_id="d1", argument_quality=5, consistency=4,
+                                       engagement=4, overall_satisfaction=5))
+        assert self.ids(service) == ["Beta", "Gamma", "Alpha"]
+        assert service.get_all_available_agents()[3]["name"] == "Beta"
+
+    def test_pagination(self, service):
+        """Test offset and limit page through the ranking"""
+        assert self.ids(service, limit=2) == ["Alpha", "Beta"]
+        assert self.ids(service, limit=2, offset=2) == ["Gamma"]
+        assert self.ids(service, search="agent", limit=1, offset=1) == ["Beta"]
+
+    def test_delete_removes_from_ranking(self, service):
+        """Test deleted agents leave the listing"""
+        service.delete_agent(service.get_agent_by_name("Alpha").id)
+        assert self.ids(service) == ["Beta", "Gamma"]
+
+    def test_external_change_rebuilds_ranking(self, service, tmp_path):
+        """Test usage recorded by another writer is picked up"""
+        other = AgentService(storage_path=str(tmp_path))
+        other.increment_usage(other.get_agent_by_name("Gamma").id)
+        assert self.ids(service) == ["Gamma", "Alpha", "Beta"]
+
+    def test_concurrent_updates_are_not_lost(self, service):
+        """Test racing usage updates, creations and listings stay consistent"""
+        gamma = service.get_agent_by_name("Gamma")
+        errors = []
+
+        def run(fn):
+            try:
+                fn()
+            except Exception as e:
+                errors.append(e)
+
+        def bump():
+            for _ in range(10):
+                service.increment_usage(gamma.id)
+
+        def create(i):
+            service.create_agent(AgentCreationRequest(name=f"Extra {i}", description="Extra agent ".ljust(60, ".")),
+                                 "prompt", "system")
+
+        def browse():
+            for _ in range(10):
+                service.list_agents(search="agent")
+                service.list_agents()
+
+        targets = [bump] * 4 + [lambda i=i: create(i) for i in range(4)] + [browse] * 4
+        threads = [threading.Thread(target=run, args=(target,)) for target in targets]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert errors == []
+        assert service.get_agent(gamma.id).usage_count == 40
+        assert self.ids(service)[0] == "Gamma"
+        assert len(service.list_agents(search="agent", limit=100)) == 7
+
+    def test_search_skips_ids_missing_from_snapshot(self, service, monkeypatch):
+        """Test a search hit the cached agents don't have is dropped rather than raising"""
+        original = service._search_index.search
+        monkeypatch.setattr(service._search_index, "search",
+                            lambda query: original(query) + [("ghost", 99.0)])
+        assert self.ids(service, search="agent") == ["Alpha", "Beta", "Gamma"]
@@ -0,0 +1,155 @@
+# backend/test/test_agent_search.py
+"""
+Unit tests for the agent search index and AgentService search
+"""
+
+import pytest
+from models.custom_agent import AgentCreationRequest, AgentUpdateRequest
+from services.agent_search import AgentSearchIndex, tokenize
+from services.agent_service import AgentService
+from services.serialization import read_json, write_json
+
+
+def record(name, description, prompt=""):
+    return {"name": name, "description": description, "enhanced_prompt": prompt}
+
+
+def creation(name, description):
+    return AgentCreationRequest(name=name, description=description.ljust(60, "."))
+
+
+class TestAgentSearchIndex:
+    """Unit tests for AgentSearchIndex"""
+
+    @pytest.fixture
+    def index(self):
+        index = AgentSearchIndex()
+        index.add("eco", record("Gaia", "Environmental ethicist focused on future generations"))
+        index.add("law", record("Justice", "Legal scholar weighing rights and duties",
+                                "Cite environmental law when relevant"))
+        index.add("care", record("Carer", "Care ethicist who values relationships"))
+        return index
+
+    def test_tokenize(self):
+        """Test tokens are lowercase words without punctuation"""
+        assert tokenize("Don't PANIC, it's 42!") == ["don", "t", "panic", "it", "s", "42"]
+        assert tokenize(None) == []
+        assert tokenize("Zoë meets СОКРАТ, Straße") == ["zoë", "meets", "сократ", "strasse"]
+
+    def test_prefix_matches(self, index):
+        """Test a term matches the words it starts"""
+        assert {a for a, _ in index.search("ethic")} == {"eco", "care"}
+        assert index.search("ethic", prefix=False) == []
+        assert index.expand("envir") == ["environmental"]
+
+    def test_all_terms_must_match(self, index):
+        """Test multi-word queries intersect"""
+        assert [a for a, _ in index.search("care ethicist")] == ["care"]
+        assert index.search("care legal") == []
+
+    def test_field_weights_rank_results(self, index):
+        """Test a description hit outranks one in the enhanced prompt"""
+        assert [a for a, _ in index.search("environmental")] == ["eco", "law"]
+
+    def test_exact_match_beats_prefix(self):
+        """Test an exact word scores above a word it merely prefixes"""
+        index = AgentSearchIndex()
+        index.add("a", record("Alpha", "Talks about law"))
+        index.add("b", record("Beta", "Talks about lawyers"))
+        assert [a for a, _ in index.search("law")] == ["a", "b"]
+
+    def test_short_terms_match_exactly(self, index):
+        """Test terms shorter than min_prefix are not expanded"""
+        index.add("x", record("X", "a b c"))
+        assert [a for a, _ in index.search("a")] == ["x"]
+
+    def test_reindex_and_remove(self, index):
+        """Test updates replace old tokens and removal drops unused ones"""
+        index.add("eco", record("Gaia", "Green economist"))
+        assert [a for a, _ in index.search("environmental")] == ["law"]
+        assert [a for a, _ in index.search("economist")] == ["eco"]
+
+        index.remove("eco")
+        index.remove("missing")
+        assert index.search("economist") == []
+        assert index.expand("econ") == []
+        assert len(index) == 2
+
+    def test_allowed_and_limit(self, index):
+        """Test results can be restricted and truncated"""
+        assert [a for a, _ in index.search("ethicist", allowed={"care"})] == ["care"]
+        assert len(index.search("ethicist", limit=1)) == 1
+        assert index.search("   ") == []
+
+    def test_rebuild_matches_incremental(self, index):
+        """Test rebuild produces the same results as adding one by one"""
+        rebuilt = AgentSearchIndex()
+        rebuilt.rebuild({
+            "eco": record("Gaia", "Environmental ethicist focused on future generations"),
+            "law": record("Justice", "Legal scholar weighing rights and duties",
+                          "Cite environmental law when relevant"),
+            "care": record("Carer", "Care ethicist who values relationships")
+        })
+        for query in ("ethic", "environmental", "care", "rights"):
+            assert rebuilt.search(query) == index.search(query)
+
+
+class TestAgentServiceSearch:
+    """Unit tests for AgentService.list_agents search"""
+
+    @pytest.fixture
+    def service(self, tmp_path):
+        service = AgentService(storage_path=str(tmp_path))
+        service.create_agent(creation("Gaia", "Environmental ethicist focused on future generations"),
+                             "You defend ecosystems.", "system")
+        service.create_agent(creation("Justice", "Legal scholar weighing rights and duties"),
+                             "Cite environmental law when relevant.", "system")
+        return service
+
+    def test_search_uses_enhanced_prompt(self, service):
+        """Test enhanced prompts are searchable and name/description hits rank first"""
+        names = [a.name for a in service.list_agents(search="environ")]
+        assert names == ["Gaia", "Justice"]
+        assert [a.name for a in service.list_agents(search="ecosystems")] == ["Gaia"]
+
+    def test_index_follows_update_and_delete(self, service):
+        """Test updates and deletes are reflected in search results"""
+        justice = service.get_agent_by_name("Justice")
+        service.update_agent(justice.id, AgentUpdateRequest(name="Themis"))
+        assert [a.name for a in service.list_agents(search="themis")] == ["Themis"]
+        assert service.list_agents(search="justice") == []
+
+        service.delete_agent(justice.id)
+        assert [a.name for a in service.list_agents(search="environ")] == ["Gaia"]
+
+    def test_private_agents_hidden(self, service):
+        """Test public_only applies to search results"""
+        agents = read_json(service.agents_file)
+        for data in agents.values():
+            if data["name"] == "Gaia":
+                data["is_public"] = False
+        write_json(service.agents_file, agents)
+
+        assert [a.name for a in service.list_agents(search="environ")] == ["Justice"]
+        assert len(service.list_agents(search="environ", public_only=False)) == 2
+
+    def test_external_file_change_rebuilds_index(self, service, tmp_path):
+        """Test an edit by another writer is picked up on the next search"""
+        other = AgentService(storage_path=str(tmp_path))
+        other.create_agent(creation("Stoic", "Stoic philosopher on virtue and endurance"), "prompt", "system")
+
+        assert [a.name for a in service.list_agents(search="stoic")] == ["Stoic"]
+
+    def test_non_ascii_names(self, service):
+        """Test agents named in other scripts are found by full name and by prefix"""
+        service.create_agent(creation("Сократ", "Asks questions until the definitions give way"), "prompt", "system")
+        service.create_agent(creation("Zoë", "Pragmatist who weighs outcomes"), "prompt", "system")
+
+        assert [a.name for a in service.list_agents(search="Сократ")] == ["Сократ"]
+        assert [a.name for a in service.list_agents(search="сокр")] == ["Сократ"]
+        assert [a.name for a in service.list_agents(search="zoë")] == ["Zoë"]
+
+    def test_limit(self, service):
+        """Test search honours the limit"""
+        assert len(service.list_agents(search="environ", limit=1)) == 1
+        assert service.list_agents(search="environ", limit=0) == []
@@ -0,0 +1,98 @@
+# backend/test/test_debate_context_service.py
+"""
+Unit tests for DebateContextService
+"""
+
+import pytest
+from services.debate_context_service import DebateContextService, session_key
+
+AGENTS = ["Deon", "Conse", "Virtue"]
+
+
+class FakeLLM:
+    """Records summarizer calls and returns a deterministic summary"""
+
+    def __init__(self, fail: bool = False):
+        self.calls = []
+        self.fail = fail
+
+    def __call__(self, system_prompt, user_prompt, num_predict=400, temp=0.7):
+        self.calls.append(user_prompt)
+        if self.fail:
+            raise RuntimeError("provider down")
+        return f"summary after {len(self.calls)} update(s) " + "word " * 400
+
+
+def make_transcript(rounds: int, extra: int = 0):
+    turns = []
+    for r in range(rounds):
+        for agent in AGENTS:
+            turns.append({"agent": agent, "stance": "A", "argument": f"{agent} round {r} argument"})
+    for agent in AGENTS[:extra]:
+        turns.append({"agent": agent, "stance": "B", "argument": f"{agent} partial argument"})
+    return {"dilemma": {"title": "T", "A": "a", "B": "b", "constraints": "c"}, "turns": turns}
+
+
+class TestDebateContextService:
+    """Unit tests for rolling debate summaries"""
+
+    def test_no_summary_before_second_round(self):
+        """Test the opening round is quoted directly, not summarized"""
+        llm = FakeLLM()
+        service = DebateContextService(llm=llm)
+
+        assert service.get_summary(make_transcript(1), AGENTS) == ""
+        assert service.get_summary(make_transcript(1, extra=2), AGENTS) == ""
+        assert llm.calls == []
+
+    def test_refreshed_once_per_round(self):
+        """Test per-agent /continue calls within a round share one refresh"""
+        llm = FakeLLM()
+        service = DebateContextService(llm=llm)
+
+        for extra in range(3):
+            summary = service.get_summary(make_transcript(2, extra=extra), AGENTS)
+        assert len(llm.calls) == 1
+        assert summary.startswith("summary after 1")
+
+        service.get_summary(make_transcript(3), AGENTS)
+        assert len(llm.calls) == 2
+        # Only the newly completed round is sent, folded into the previous summary
+        assert "round 1 argument" in llm.calls[1]
+        assert "round 0 argument" not in llm.calls[1]
+        assert "summary after 1" in llm.calls[1]
+
+    def test_summary_is_bounded(self):
+        """Test summary length stays bounded however long the debate gets"""
+        service = DebateContextService(llm=FakeLLM(), max_summary_words=50)
+
+        for rounds in range(2, 12):
+            summary = service.get_summary(make_transcript(rounds), AGENTS)
+            assert len(summary) <= service.max_summary_chars
+
+    def test_extractive_fallback(self):
+        """Test a failing summarizer falls back to per-agent positions"""
+        service = DebateContextService(llm=FakeLLM(fail=True))
+
+        summary = service.get_summary(make_transcript(3), AGENTS)
+
+        assert summary.count("\n") == len(AGENTS) - 1
+        assert "Deon (A): Deon round 1 argument" in summary
+
+    def test_sessions_are_isolated(self):
+        """Test different debates on the same dilemma keep separate summaries"""
+        service = DebateContextService(llm=FakeLLM())
+        first = make_transcript(2)
+        second = make_transcript(2)
+        second["turns"][0]["argument"] = "A different opening"
+
+        assert session_key(first, AGENTS) != session_key(second, AGENTS)
+        service.get_summary(first, AGENTS)
+        service.get_summary(second, AGENTS)
+        assert len(service.sessions) == 2
+
+    def test_explicit_session_id(self):
+        """Test a client session_id is used as the key"""
+        transcript = make_transcript(2)
+        transcript["session_id"] = "abc"
+        assert session_key(transcript, AGENTS) == "abc"
@@ -0,0 +1,88 @@
+# backend/test/test_debate_history_service.py
+"""
+Unit tests for DebateHistoryService pagination and summary index
+"""
+
+import threading
+
+import pytest
+from services.debate_history_service import DebateHistoryService, SUMMARY_FIELDS
+
+
+def make_transcript(title):
+    return {
+        "dilemma": {"title": title, "A": "a", "B": "b", "constraints": "c"},
+        "turns": [{"agent": "Deon", "stance": "A", "argument": "x" * 500}]
+    }
+
+
+class TestDebateHistoryService:
+    """Unit tests for debate history service"""
+
+    @pytest.fixture
+    def service(self, tmp_path):
+        service = DebateHistoryService(storage_path=str(tmp_path))
+        for i in range(5):
+            service.save_debate(make_transcript(f"Debate {i}"), {"final_recommendation": "A", "confidence": 60 + i})
+        return service
+
+    def test_summaries_are_projected(self, service):
+        """Test list entries carry only summary fields"""
+        summaries, _ = service.list_summaries(limit=10)
+
+        assert len(summaries) == 5
+        assert all(set(s) == set(SUMMARY_FIELDS) for s in summaries)
+        assert summaries[0]["title"] == "Debate 4"
+
+    def test_cursor_pagination_covers_history(self, service):
+        """Test walking pages returns every debate once, in order"""
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = service.list_summaries(limit=2, cursor=cursor)
+            seen.extend(s["title"] for s in page)
+            if cursor is None:
+                break
+
+        assert seen == [f"Debate {i}" for i in range(4, -1, -1)]
+
+    def test_cursor_survives_deleted_debate(self, service):
+        """Test a cursor still resumes after its debate is deleted"""
+        page, cursor = service.list_summaries(limit=2)
+        service.delete_debate(page[-1]["id"])
+
+        next_page, _ = service.list_summaries(limit=2, cursor=cursor)
+        assert [s["title"] for s in next_page] == ["Debate 2", "Debate 1"]
+
+    def test_invalid_cursor(self, service):
+        """Test malformed cursors are rejected"""
+        with pytest.raises(ValueError):
+            service.list_summaries(cursor="not-a-cursor")
+
+    def test_index_follows_external_writes(self, service):
+        """Test another writer's changes are picked up"""
+        other = DebateHistoryService(storage_path=str(service.storage_path))
+        other.save_debate(make_transcript("From elsewhere"), {"final_recommendation": "B", "confidence": 90})
+
+        summaries, _ = service.list_summaries(limit=1)
+        assert summaries[0]["title"] == "From elsewhere"
+        assert service.get_debate_by_id(summaries[0]["id"])["transcript"]["dilemma"]["title"] == "From elsewhere"
+
+    def test_concurrent_saves_are_all_readable(self, service):
+        """Test racing saves leave every debate on disk and in the cache"""
+        saved = []
+        barrier = threading.Barrier(8)
+
+        def save(i):
+            barrier.wait()
+            saved.append(service.save_debate(make_transcript(f"Race {i}"), {"final_recommendation": "A"}))
+
+        threads = [threading.Thread(target=save, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(service.get_all_debates(limit=100)) == 13
+        for entry in saved:
+            assert service.get_debate_by_id(entry["id"]) is not None
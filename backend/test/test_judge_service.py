@@ -0,0 +1,274 @@
+# backend/test/test_judge_service.py
+"""
+Unit tests for JudgeService incremental judging
+"""
+
+import json
+import pytest
+from services.judge_service import JudgeService, JudgeState, DIMENSIONS
+
+AGENTS = ["Deon", "Conse", "Virtue"]
+
+
+def parse(raw, fallback):
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        return fallback
+
+
+class ScriptedLLM:
+    """Returns queued responses and records prompts"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def __call__(self, system_prompt, user_prompt, num_predict=400, temp=0.7):
+        self.calls.append((system_prompt, user_prompt, num_predict))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def scores(a, b):
+    return {"option_a": {d: a for d in DIMENSIONS}, "option_b": {d: b for d in DIMENSIONS}}
+
+
+def make_transcript(rounds):
+    turns = [
+        {"agent": agent, "stance": "A", "argument": f"{agent} round {r}"}
+        for r in range(rounds) for agent in AGENTS
+    ]
+    return {"dilemma": {"title": "T", "A": "a", "B": "b", "constraints": "c"}, "turns": turns}
+
+
+class TestJudgeService:
+    """Unit tests for incremental judging"""
+
+    def test_update_round_scores_each_round_once(self):
+        """Test repeated updates on the same transcript make one call"""
+        llm = ScriptedLLM([json.dumps({"scores": scores(2, 1), "leaning": "A", "confidence": 70, "rationale": "A ahead"})])
+        service = JudgeService(llm=llm, parse=parse)
+
+        state = service.update_round(make_transcript(1), AGENTS)
+        service.update_round(make_transcript(1), AGENTS)
+
+        assert len(llm.calls) == 1
+        assert state["scores"]["option_a"]["honesty"] == 2
+        assert state["rounds_scored"] == 1
+        assert state["confidence"] == 70
+
+    def test_only_new_round_is_sent(self):
+        """Test later updates send only unscored turns"""
+        llm = ScriptedLLM([json.dumps({"scores": scores(1, 1)}), json.dumps({"scores": scores(0, 2), "leaning": "B"})])
+        service = JudgeService(llm=llm, parse=parse)
+
+        service.update_round(make_transcript(1), AGENTS)
+        state = service.update_round(make_transcript(2), AGENTS)
+
+        prompt = llm.calls[1][1]
+        assert "round 1" in prompt and "round 0" not in prompt
+        assert state["leaning"] == "B"
+        assert state["rounds_scored"] == 2
+
+    def test_final_verdict_is_short_consolidation(self):
+        """Test the final verdict uses compact state and unscored turns"""
+        llm = ScriptedLLM([
+            json.dumps({"scores": scores(2, 0), "leaning": "A", "confidence": 80}),
+            json.dumps({"final_recommendation": "A", "confidence": 85, "verdict": "A protects more people."})
+        ])
+        service = JudgeService(llm=llm, parse=parse)
+        transcript = make_transcript(1)
+        service.update_round(transcript, AGENTS)
+        transcript["turns"].append({"agent": "Deon", "stance": "A", "argument": "Deon closing"})
+
+        verdict = service.final_verdict(transcript, AGENTS)
+
+        system_prompt, prompt, num_predict = llm.calls[-1]
+        assert num_predict < 600
+        assert "Deon closing" in prompt and "Deon round 0" not in prompt
+        assert verdict["final_recommendation"] == "A"
+        assert verdict["confidence"] == 85
+        assert verdict["scores"]["option_a"]["fairness"] == 2
+        assert verdict["verdict"] == "A protects more people."
+
+    def test_final_verdict_falls_back_to_running_scores(self):
+        """Test a failed consolidation still returns a verdict"""
+        llm = ScriptedLLM([
+            json.dumps({"scores": scores(0, 2), "rationale": "B respects autonomy"}),
+            RuntimeError("provider down")
+        ])
+        service = JudgeService(llm=llm, parse=parse)
+        transcript = make_transcript(1)
+        service.update_round(transcript, AGENTS)
+
+        verdict = service.final_verdict(transcript, AGENTS)
+
+        assert verdict["final_recommendation"] == "B"
+        assert verdict["verdict"] == "B respects autonomy"
+
+    def test_malformed_scores_are_ignored(self):
+        """Test out-of-range and non-numeric scores are clamped or skipped"""
+        bad = scores(5, "high")
+        llm = ScriptedLLM([json.dumps({"scores": bad, "confidence": 400})])
+        service = JudgeService(llm=llm, parse=parse)
+
+        state = service.update_round(make_transcript(1), AGENTS)
+
+        assert state["scores"]["option_a"]["honesty"] == 2
+        assert state["scores"]["option_b"]["honesty"] == 1
+        assert state["confidence"] == 100
+
+    def test_failed_round_reaches_final_verdict(self):
+        """Test turns of a round whose update failed stay unscored and go to the consolidation"""
+        llm = ScriptedLLM([
+            RuntimeError("provider down"),
+            "not json",
+            json.dumps({"final_recommendation": "B", "verdict": "B wins."})
+        ])
+        service = JudgeService(llm=llm, parse=parse)
+        transcript = make_transcript(1)
+
+        state = service.update_round(transcript, AGENTS)
+        assert state["rounds_scored"] == 0
+        state = service.update_round(transcript, AGENTS)
+        assert state["rounds_scored"] == 0
+        verdict = service.final_verdict(transcript, AGENTS)
+
+        assert len(llm.calls) == 3
+        assert all(f"{agent} round 0" in llm.calls[-1][1] for agent in AGENTS)
+        assert verdict["rounds_scored"] == 0
+
+    def test_reset_keeps_lock(self):
+        """Test reset clears the scores but keeps the lock callers may hold"""
+        state = JudgeState()
+        lock = state.lock
+        state.rounds_scored = 3
+        state.scores["option_a"]["honesty"] = 5
+
+        with state.lock:
+            state.reset()
+
+        assert state.lock is lock
+        assert state.rounds_scored == 0
+        assert state.scores["option_a"]["honesty"] == 1
+
+
+class TestJudgeEnsemble:
+    """Unit tests for the parallel judge ensemble"""
+
+    def test_aggregate_uses_median_and_majority(self):
+        """Test scores are medians and the recommendation is the majority"""
+        verdicts = [
+            {"scores": scores(2, 0), "final_recommendation": "A", "confidence": 90, "verdict": "strong A"},
+            {"scores": scores(1, 1), "final_recommendation": "A", "confidence": 70, "verdict": "mild A"},
+            {"scores": scores(0, 2), "final_recommendation": "B", "confidence": 95, "verdict": "B"},
+        ]
+
+        result = JudgeService.aggregate_verdicts(verdicts)
+
+        assert result["final_recommendation"] == "A"
+        assert result["scores"]["option_a"]["honesty"] == 1
+        assert result["ensemble"]["votes"] == {"A": 2, "B": 1}
+        assert result["ensemble"]["agreement"] == 0.67
+        # Median of agreeing confidences (80) scaled by agreement
+        assert result["confidence"] == round(80 * 2 / 3)
+
+    def test_returns_at_quorum_without_waiting_for_stragglers(self):
+        """Test a slow member does not delay the verdict"""
+        import threading
+        import time
+
+        release = threading.Event()
+        verdict = json.dumps({"scores": scores(2, 1), "final_recommendation": "A", "confidence": 80, "verdict": "A"})
+
+        def fast(system_prompt, user_prompt, num_predict=400, temp=0.7):
+            return verdict
+
+        def slow(system_prompt, user_prompt, num_predict=400, temp=0.7):
+            release.wait(5)
+            return verdict
+
+        service = JudgeService(llm=fast, parse=parse, ensemble_llms=[fast, fast, slow])
+        start = time.monotonic()
+        result = service.ensemble_verdict("sys", "input", k=3, quorum=2)
+        elapsed = time.monotonic() - start
+        release.set()
+
+        assert elapsed < 2
+        assert result["ensemble"]["responded"] == 2
+        assert result["final_recommendation"] == "A"
+
+    def test_stragglers_are_cancelled_at_quorum(self):
+        """Test members still running after the quorum see their cancel token set"""
+        import threading
+
+        verdict = json.dumps({"scores": scores(2, 1), "final_recommendation": "A", "confidence": 80, "verdict": "A"})
+        cancelled = threading.Event()
+
+        def fast(system_prompt, user_prompt, num_predict=400, temp=0.7):
+            return verdict
+
+        def slow(system_prompt, user_prompt, num_predict=400, temp=0.7, cancel=None):
+            if cancel.wait(5):
+                cancelled.set()
+                raise RuntimeError("cancelled")
+            return verdict
+
+        service = JudgeService(llm=fast, parse=parse, ensemble_llms=[fast, fast, slow])
+        result = service.ensemble_verdict("sys", "input", k=3, quorum=2)
+
+        assert result["ensemble"]["responded"] == 2
+        assert cancelled.wait(1)
+
+    def test_failed_members_are_skipped(self):
+        """Test invalid responses do not count toward the quorum"""
+        good = json.dumps({"scores": scores(0, 2), "final_recommendation": "B", "confidence": 60, "verdict": "B"})
+        responses = iter(["not json", good, good])
+        lock = __import__("threading").Lock()
+
+        def llm(system_prompt, user_prompt, num_predict=400, temp=0.7):
+            with lock:
+                return next(responses)
+
+        service = JudgeService(llm=llm, parse=parse)
+        result = service.ensemble_verdict("sys", "input", k=3, quorum=2)
+
+        assert result["final_recommendation"] == "B"
+        assert result["ensemble"]["responded"] == 2
+        assert result["ensemble"]["failed"] == 1
+
+    def test_timeout_bounds_the_whole_wait(self):
+        """Test the timeout covers all members together, not each wait for the next one"""
+        import threading
+        import time
+
+        verdict = json.dumps({"scores": scores(2, 1), "final_recommendation": "A", "confidence": 80, "verdict": "A"})
+        release = threading.Event()
+
+        def staggered(system_prompt, user_prompt, num_predict=400, temp=0.7):
+            # One answer every 0.15s: each gap fits a per-wait timeout, their sum doesn't
+            time.sleep(0.15 * (1 + int(temp * 4)))
+            return verdict
+
+        def blocked(system_prompt, user_prompt, num_predict=400, temp=0.7, cancel=None):
+            release.wait(5)
+            raise RuntimeError("cancelled")
+
+        service = JudgeService(llm=staggered, parse=parse, ensemble_llms=[staggered, staggered, staggered, blocked],
+                               ensemble_temperatures=(0.0, 0.25, 0.5, 0.75))
+        start = time.perf_counter()
+        result = service.ensemble_verdict("sys", "input", k=4, quorum=4, timeout=0.4)
+        elapsed = time.perf_counter() - start
+        release.set()
+
+        assert elapsed < 0.6
+        assert result["ensemble"]["responded"] == 2
+
+    def test_all_members_fail(self):
+        """Test an ensemble with no valid verdict raises"""
+        service = JudgeService(llm=lambda *a, **kw: "garbage", parse=parse)
+        with pytest.raises(RuntimeError):
+            service.ensemble_verdict("sys", "input", k=2)
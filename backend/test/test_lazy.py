@@ -0,0 +1,160 @@
+# backend/test/test_lazy.py
+"""
+Unit tests for lazily constructed services and modules
+"""
+
+import sys
+import threading
+import time
+
+from services.lazy import LazyService, lazy_import, preload
+
+
+class Service:
+    built = 0
+
+    def __init__(self):
+        Service.built += 1
+        self.value = 42
+
+    def ping(self):
+        return "pong"
+
+
+class TestLazyService:
+    """Unit tests for LazyService"""
+
+    def test_builds_on_first_use(self):
+        """Test the factory runs on the first attribute access, once"""
+        calls = []
+        service = LazyService(lambda: calls.append(1) or Service(), name="svc")
+        assert not service.loaded
+        assert calls == []
+
+        assert service.ping() == "pong"
+        assert service.value == 42
+        assert service.loaded
+        assert calls == [1]
+
+    def test_concurrent_first_use_builds_once(self):
+        """Test racing threads share a single instance"""
+        def slow():
+            time.sleep(0.05)
+            return Service()
+
+        before = Service.built
+        service = LazyService(slow)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(service.get())) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert Service.built == before + 1
+        assert all(r is results[0] for r in results)
+
+    def test_failed_build_is_retried(self):
+        """Test a factory error propagates and the next access tries again"""
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise OSError("disk not ready")
+            return Service()
+
+        service = LazyService(flaky)
+        try:
+            service.ping()
+        except OSError:
+            pass
+        assert service.ping() == "pong"
+        assert len(attempts) == 2
+
+    def test_dunder_lookups_do_not_build(self):
+        """Test protocol probes (copy, pickle) don't trigger construction"""
+        service = LazyService(Service)
+        assert not hasattr(service, "__deepcopy__")
+        assert not service.loaded
+        assert "pending" in repr(service)
+
+
+class TestPreload:
+    """Unit tests for preload()"""
+
+    def test_preload_builds_pending_services(self):
+        """Test pending services are built and timed; loaded ones are skipped"""
+        loaded = LazyService(Service, name="loaded")
+        loaded.get()
+        pending = LazyService(Service, name="pending")
+
+        timings = preload([loaded, pending])
+        assert list(timings) == ["pending"]
+        assert pending.loaded
+
+    def test_preload_survives_failures(self):
+        """Test one failing service doesn't stop the others"""
+        def broken():
+            raise RuntimeError("no")
+
+        ok = LazyService(Service, name="ok")
+        timings = preload([LazyService(broken, name="broken"), ok])
+        assert list(timings) == ["ok"]
+
+
+class TestLazyImport:
+    """Unit tests for lazy_import()"""
+
+    def test_module_runs_on_attribute_access(self, tmp_path, monkeypatch):
+        """Test the module body runs only when an attribute is used"""
+        (tmp_path / "lazy_probe_mod.py").write_text("import builtins\nbuiltins._lazy_probe_ran = True\nVALUE = 7\n")
+        monkeypatch.syspath_prepend(str(tmp_path))
+        monkeypatch.delitem(sys.modules, "lazy_probe_mod", raising=False)
+        import builtins
+
+        module = lazy_import("lazy_probe_mod")
+        assert not getattr(builtins, "_lazy_probe_ran", False)
+        assert module.VALUE == 7
+        assert builtins._lazy_probe_ran
+        del builtins._lazy_probe_ran
+        sys.modules.pop("lazy_probe_mod", None)
+
+    def test_returns_already_imported_module(self):
+        """Test an imported module is returned as-is"""
+        import json
+        assert lazy_import("json") is json
+
+    def test_concurrent_first_access_sees_loaded_module(self, tmp_path, monkeypatch):
+        """Test threads racing on the first access all wait for the body to finish, which runs once"""
+        (tmp_path / "lazy_slow_mod.py").write_text(
+            "import builtins, time\n"
+            "builtins._lazy_slow_runs = getattr(builtins, '_lazy_slow_runs', 0) + 1\n"
+            "time.sleep(0.1)\n"
+            "VALUE = 7\n")
+        monkeypatch.syspath_prepend(str(tmp_path))
+        monkeypatch.delitem(sys.modules, "lazy_slow_mod", raising=False)
+        import builtins
+
+        module = lazy_import("lazy_slow_mod")
+        barrier = threading.Barrier(8)
+        results, errors = [], []
+
+        def use():
+            barrier.wait()
+            try:
+                results.append(module.VALUE)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=use) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert errors == []
+        assert results == [7] * 8
+        assert builtins._lazy_slow_runs == 1
+        del builtins._lazy_slow_runs
+        sys.modules.pop("lazy_slow_mod", None)
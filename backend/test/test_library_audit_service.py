@@ -0,0 +1,147 @@
+# backend/test/test_library_audit_service.py
+"""
+Unit tests for LibraryAuditService
+"""
+
+import pytest
+import json
+import numpy as np
+import tempfile
+from itertools import combinations
+from pathlib import Path
+from services.debate_deduplication_service import DebateDeduplicationService
+from services.library_audit_service import LibraryAuditService
+
+
+def make_template(template_id, context, option_a, option_b, **extra):
+    template = {
+        'id': template_id,
+        'slug': f'debate-{template_id}',
+        'title': f'Debate {template_id}',
+        'context': context,
+        'option_a': option_a,
+        'option_b': option_b
+    }
+    template.update(extra)
+    return template
+
+
+class TestLibraryAuditService:
+    """Unit tests for library audit service"""
+
+    @pytest.fixture
+    def temp_templates_file(self):
+        """Create a temporary templates file for testing"""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            temp_path = f.name
+            json.dump([], f)
+        yield temp_path
+        Path(temp_path).unlink(missing_ok=True)
+
+    @pytest.fixture
+    def dedup_service(self, temp_templates_file):
+        """Create deduplication service with temp file"""
+        return DebateDeduplicationService(templates_path=temp_templates_file)
+
+    @pytest.fixture
+    def library(self):
+        """Library with one duplicate pair, one triple and two unique debates"""
+        return [
+            make_template(1, 'Trolley heading to five workers', 'Pull lever', 'Do nothing'),
+            make_template(2, 'Surveillance to stop crime in the city', 'Allow cameras', 'Protect privacy'),
+            make_template(3, 'Trolley heading to five workers', 'Pull lever', 'Do nothing', is_custom=True),
+            make_template(4, 'Lying to protect a friend from harm', 'Lie', 'Tell the truth'),
+            make_template(5, 'Surveillance to stop crime in the city', 'Allow cameras', 'Protect privacy', is_custom=True),
+            make_template(6, 'Surveillance to stop crime in the city', 'Allow cameras', 'Protect privacy', is_custom=True),
+            make_template(7, 'Sharing medical data for research', 'Share data', 'Keep records private'),
+        ]
+
+    def test_default_threshold_matches_live_deduplication(self, dedup_service):
+        """Test audit uses the same threshold as submissions"""
+        audit = LibraryAuditService(deduplication_service=dedup_service)
+        assert audit.threshold == DebateDeduplicationService.HIGH_SIMILARITY_THRESHOLD
+
+    def test_find_clusters_groups_duplicates(self, dedup_service, library):
+        """Test duplicate templates are grouped into clusters"""
+        audit = LibraryAuditService(deduplication_service=dedup_service)
+        clusters = audit.find_clusters(library)
+
+        assert len(clusters) == 2
+        assert clusters[0].size == 3
+        assert clusters[0].canonical['id'] == 2
+        assert sorted(d['id'] for d in clusters[0].duplicates) == [5, 6]
+        assert clusters[1].canonical['id'] == 1
+        assert [d['id'] for d in clusters[1].duplicates] == [3]
+        assert clusters[1].min_score >= audit.threshold
+
+    def test_find_clusters_no_duplicates(self, dedup_service, library):
+        """Test unique library yields no clusters"""
+        audit = LibraryAuditService(deduplication_service=dedup_service)
+        unique = [t for t in library if t['id'] in (1, 2, 4, 7)]
+        assert audit.find_clusters(unique) == []
+
+    def test_chained_component_is_split_at_canonical(self, dedup_service):
+        """Test A~B~C does not merge C into A when A and C are not duplicates"""
+        angles = np.radians([0, 30, 60])
+        vectors = np.stack([np.cos(angles), np.sin(angles)], axis=1).astype(np.float32)
+        chain = [make_template(i + 1, f'context {i}', 'a', 'b') for i in range(3)]
+        audit = LibraryAuditService(deduplication_service=dedup_service, threshold=0.8)
+        audit.compute_embeddings = lambda templates, out=None: vectors
+
+        clusters = audit.find_clusters(chain)
+
+        # sim(1,2) = sim(2,3) = 0.87, but sim(1,3) = 0.5
+        assert len(clusters) == 1
+        assert clusters[0].canonical['id'] == 1
+        assert [d['id'] for d in clusters[0].duplicates] == [2]
+        assert clusters[0].min_score >= 0.8
+
+    def test_blocked_pairs_match_brute_force(self, dedup_service, library):
+        """Test tiling produces exactly the brute-force pair set"""
+        audit = LibraryAuditService(deduplication_service=dedup_service, threshold=0.5, block_size=2)
+        embeddings = audit.compute_embeddings(library)
+
+        blocked = {(i, j) for i, j, _ in audit.iter_similar_pairs(embeddings)}
+        brute = {
+            (i, j) for i, j in combinations(range(len(library)), 2)
+            if float(embeddings[i] @ embeddings[j]) >= 0.5
+        }
+
+        assert blocked == brute
+
+    def test_memmap_path_gives_same_clusters(self, dedup_service, library):
+        """Test disk-backed embeddings give the same result"""
+        in_memory = LibraryAuditService(deduplication_service=dedup_service)
+        on_disk = LibraryAuditService(deduplication_service=dedup_service, memmap_threshold=0, block_size=3)
+
+        expected = [c.to_dict() for c in in_memory.find_clusters(library)]
+        actual = [c.to_dict() for c in on_disk.find_clusters(library)]
+
+        assert actual == expected
+
+    def test_run_with_merge(self, dedup_service, library):
+        """Test merging keeps one template per cluster and records merged slugs"""
+        dedup_service._save_templates(library)
+        audit = LibraryAuditService(deduplication_service=dedup_service)
+
+        report = audit.run(merge=True)
+
+        assert report['cluster_count'] == 2
+        assert report['duplicate_count'] == 3
+        assert report['merged'] is True
+
+        saved = dedup_service._load_templates()
+        assert [t['id'] for t in saved] == [1, 2, 4, 7]
+        by_id = {t['id']: t for t in saved}
+        assert by_id[1]['merged_slugs'] == ['debate-3']
+        assert sorted(by_id[2]['merged_slugs']) == ['debate-5', 'debate-6']
+
+    def test_run_without_merge_leaves_library(self, dedup_service, library):
+        """Test report-only run does not modify the library"""
+        dedup_service._save_templates(library)
+        audit = LibraryAuditService(deduplication_service=dedup_service)
+
+        report = audit.run()
+
+        assert report['merged'] is False
+        assert len(dedup_service._load_templates()) == len(library)
@@ -0,0 +1,121 @@
+# backend/test/test_llm_replay.py
+"""
+Unit tests for LLM traffic recording and replay
+"""
+
+import gzip
+import time
+
+import pytest
+from services.llm_replay import ReplayError, ReplayProvider, TrafficRecorder, read_archive
+from services.llm_service import AGENT_TURN_SCHEMA, LLMService, agent_turn_schema
+
+TURN = '{"stance":"A","argument":"Conse, duty binds us."}'
+
+
+def record(path, calls):
+    recorder = TrafficRecorder(str(path))
+    for system, user, response, params in calls:
+        recorder.call(lambda: response, "continue", system, user, schema=AGENT_TURN_SCHEMA, params=params)
+    recorder.close()
+
+
+def replay(provider, system, user, temp=0.7, schema=AGENT_TURN_SCHEMA, **kwargs):
+    return provider.generate(system, user, 200, temp, 0.9, 1.1, schema=schema, **kwargs)
+
+
+class TestTrafficRecorder:
+    """Unit tests for TrafficRecorder and read_archive"""
+
+    def test_round_trip(self, tmp_path):
+        """Test calls, errors and params survive the archive with prompts interned once"""
+        path = tmp_path / "traffic.jsonl.gz"
+        recorder = TrafficRecorder(str(path))
+        for i in range(3):
+            recorder.call(lambda: TURN, "continue", "You are Deon.", f"turn {i}",
+                          schema=AGENT_TURN_SCHEMA, params={"temp": 0.65})
+
+        def fail():
+            raise TimeoutError("upstream timed out")
+
+        with pytest.raises(TimeoutError):
+            recorder.call(fail, "judge", "You are the Judge.", "{}")
+        recorder.close()
+
+        calls = list(read_archive(str(path)))
+        assert [c["user"] for c in calls] == ["turn 0", "turn 1", "turn 2", "{}"]
+        assert calls[0]["system"] == "You are Deon." and calls[0]["schema"] == AGENT_TURN_SCHEMA
+        assert calls[0]["params"] == {"temp": 0.65} and calls[0]["latency_ms"] >= 0
+        assert calls[3]["response"] is None and calls[3]["error"] == "TimeoutError: upstream timed out"
+        with gzip.open(path, "rt") as f:
+            assert f.read().count("You are Deon.") == 1
+
+    def test_unclosed_archive_is_readable(self, tmp_path):
+        """Test an archive whose writer never closed it reads up to the last record"""
+        path = tmp_path / "traffic.jsonl.gz"
+        recorder = TrafficRecorder(str(path))
+        recorder.call(lambda: TURN, "continue", "You are Deon.", "turn", params={})
+        assert [c["response"] for c in read_archive(str(path))] == [TURN]
+        recorder.close()
+
+    def test_appends_to_existing_archive(self, tmp_path):
+        """Test a second recording session adds to the archive"""
+        path = tmp_path / "traffic.jsonl.gz"
+        record(path, [("You are Deon.", "a", TURN, {})])
+        record(path, [("You are Deon.", "b", TURN, {})])
+        assert [c["user"] for c in read_archive(str(path))] == ["a", "b"]
+
+
+class TestReplayProvider:
+    """Unit tests for ReplayProvider"""
+
+    @pytest.fixture
+    def archive(self, tmp_path):
+        path = tmp_path / "traffic.jsonl.gz"
+        record(path, [
+            ("You are Deon.", "turn", '{"stance":"A","argument":"first"}', {"temp": 0.65}),
+            ("You are Deon.", "turn", '{"stance":"B","argument":"second"}', {"temp": 0.65}),
+            ("You are Deon.", "retry", "not json at all", {"temp": 0.8}),
+        ])
+        return str(path)
+
+    def test_exact_matches_in_recorded_order(self, archive):
+        """Test repeated requests walk through their recordings, malformed output included"""
+        provider = ReplayProvider.from_archive(archive, time_scale=0)
+        assert '"first"' in replay(provider, "You are Deon.", "turn", 0.65)
+        assert '"second"' in replay(provider, "You are Deon.", "turn", 0.65)
+        assert '"first"' in replay(provider, "You are Deon.", "turn", 0.65)
+        assert replay(provider, "You are Deon.", "retry", 0.8) == "not json at all"
+        assert provider.snapshot() == {"recorded": 3, "exact": 4, "fallback": 0, "miss": 0}
+
+    def test_fallback_and_strict(self, archive):
+        """Test unseen prompts get a same-agent recording unless strict"""
+        provider = ReplayProvider.from_archive(archive, time_scale=0)
+        assert replay(provider, "You are Deon.", "another dilemma", 0.65)
+        with pytest.raises(ReplayError):
+            replay(provider, "You are Virtue.", "turn", 0.65)
+        # A different kind of call by the same agent is not a match
+        with pytest.raises(ReplayError):
+            replay(provider, "You are Deon.", "turn", 0.65, schema=agent_turn_schema(["Conse"]))
+
+        strict = ReplayProvider.from_archive(archive, time_scale=0, strict=True)
+        with pytest.raises(ReplayError):
+            replay(strict, "You are Deon.", "another dilemma", 0.65)
+
+    def test_errors_and_timing(self):
+        """Test recorded errors are raised after the scaled recorded latency"""
+        calls = [{"system": "s", "user": "u", "schema": None, "params": {"temp": 0.7},
+                  "response": None, "error": "RuntimeError: 503", "latency_ms": 200.0}]
+        provider = ReplayProvider(calls, time_scale=0.25)
+        start = time.perf_counter()
+        with pytest.raises(ReplayError, match="503"):
+            replay(provider, "s", "u", schema=None)
+        assert 0.04 < time.perf_counter() - start < 0.15
+
+    def test_replays_through_service(self, archive):
+        """Test stop sequences and the re-appended brace give back the recorded text"""
+        # Unstructured calls: the recorded schema is the one providers saw, i.e. none
+        calls = [dict(c, schema=None) for c in read_archive(archive)]
+        service = LLMService([ReplayProvider(calls, time_scale=0)], structured_output=False)
+        text = service.generate("You are Deon.", "turn", temp=0.65, endpoint="continue", stop_at_brace=True)
+        assert text == '{"stance":"A","argument":"first"}'
@@ -0,0 +1,661 @@
+# backend/test/test_llm_service.py
+"""
+Unit tests for the LLM provider layer
+"""
+
+import threading
+import time
+
+import pytest
+from services.llm_service import (
+    LLMService, GroqProvider, ProviderPool, LatencyTracker, CircuitBreaker, CircuitOpenError, CancelToken,
+    AGENT_TURN_SCHEMA, agent_turn_schema, agent_label, call_info
+)
+
+
+class FakeProvider:
+    """Records calls and returns a fixed response or raises"""
+
+    def __init__(self, name, response="{}", error=None):
+        self.name = name
+        self.response = response
+        self.error = error
+        self.calls = []
+
+    def generate(self, system_prompt, user_prompt, num_predict, temp, top_p, repeat_penalty, schema=None,
+                 cancel=None, priority=1, stop=None):
+        self.calls.append({"user_prompt": user_prompt, "schema": schema, "priority": priority,
+                           "num_predict": num_predict, "stop": stop})
+        if self.error:
+            raise self.error
+        return self.response
+
+
+class SlowProvider(FakeProvider):
+    """Blocks for `delay` seconds, or until cancelled"""
+
+    def __init__(self, name, delay, response="{}"):
+        super().__init__(name, response=response)
+        self.delay = delay
+        self.cancelled = threading.Event()
+
+    def generate(self, *args, schema=None, cancel=None, priority=1, stop=None):
+        super().generate(*args, schema=schema, priority=priority, stop=stop)
+        if cancel is None:
+            time.sleep(self.delay)
+        elif cancel.wait(self.delay):
+            self.cancelled.set()
+            raise RuntimeError("cancelled")
+        return self.response
+
+
+class TestLLMService:
+    """Unit tests for LLMService"""
+
+    def test_falls_back_to_next_provider(self):
+        """Test a failing provider falls through to the next one"""
+        groq = FakeProvider("groq", error=RuntimeError("rate limited"))
+        ollama = FakeProvider("ollama", response='{"stance":"A"}')
+        service = LLMService([groq, ollama], hedge=False)
+
+        assert service.generate("sys", "user", endpoint="agent") == '{"stance":"A"}'
+        assert len(groq.calls) == 1 and len(ollama.calls) == 1
+        assert service.stats.snapshot()["agent"]["structured"]["provider_errors"] == 1
+
+    def test_all_providers_fail(self):
+        """Test the last provider error is raised"""
+        service = LLMService([FakeProvider("a", error=ValueError("a")), FakeProvider("b", error=KeyError("b"))])
+        with pytest.raises(KeyError):
+            service.generate("sys", "user")
+
+    def test_schema_passed_only_when_structured(self):
+        """Test schemas reach providers only with structured output on"""
+        provider = FakeProvider("ollama")
+        LLMService([provider]).generate("sys", "user", schema=AGENT_TURN_SCHEMA)
+        LLMService([provider], structured_output=False).generate("sys", "user", schema=AGENT_TURN_SCHEMA)
+
+        assert provider.calls[0]["schema"] == AGENT_TURN_SCHEMA
+        assert provider.calls[1]["schema"] is None
+
+    def test_stats_split_by_mode(self):
+        """Test stats keep raw counts and retry rates per output mode"""
+        service = LLMService([FakeProvider("ollama")], structured_output=False)
+        for i in range(10):
+            service.generate("sys", "user", endpoint="continue")
+            if i < 4:
+                service.record_retry("continue")
+        service.structured_output = True
+        for i in range(10):
+            service.generate("sys", "user", endpoint="continue")
+        service.record_retry("continue")
+        service.record_parse("continue", ok=False)
+
+        stats = service.stats.snapshot()["continue"]
+        assert stats["plain"]["retry_rate"] == 0.4
+        assert stats["plain"]["retries"] == 4
+        assert stats["structured"]["calls"] == 10
+        assert stats["structured"]["retries"] == 1
+        assert stats["structured"]["retry_rate"] == 0.1
+        assert stats["structured"]["parse_failures"] == 1
+        assert "retries_removed" not in stats
+
+    def test_stop_at_brace_without_schema(self):
+        """Test plain-mode JSON turns stop at the brace and get it back"""
+        provider = FakeProvider("ollama", response='{"stance":"A","argument":"Deon, no"')
+        service = LLMService([provider], structured_output=False)
+
+        assert service.generate("sys", "user", stop_at_brace=True, schema=AGENT_TURN_SCHEMA) == \
+            '{"stance":"A","argument":"Deon, no"}'
+        assert provider.calls[0]["stop"] == ["}"]
+
+        service.structured_output = True
+        service.generate("sys", "user", stop_at_brace=True, schema=AGENT_TURN_SCHEMA)
+        assert provider.calls[1]["stop"] is None
+
+    def test_budget_key_caps_num_predict(self):
+        """Test learned budgets replace the caller's num_predict"""
+        from services.token_budget import BudgetController
+        provider = FakeProvider("ollama", response="x" * 120)
+        service = LLMService([provider], budgets=BudgetController(min_samples=3, pad=0, margin=1, floor=1))
+
+        for _ in range(4):
+            service.generate("sys", "user", num_predict=400, budget_key="continue:Deon")
+
+        assert [c["num_predict"] for c in provider.calls] == [400, 400, 400, 30]
+
+    def test_rebuttal_schema_restricts_opponent(self):
+        """Test the rebuttal schema only allows agents in the debate"""
+        schema = agent_turn_schema(["Deon", "Virtue"])
+        assert schema["properties"]["opponent"]["enum"] == ["Deon", "Virtue"]
+        assert agent_turn_schema([]) is AGENT_TURN_SCHEMA
+
+
+class TestHedging:
+    """Unit tests for hedged requests"""
+
+    def test_slow_primary_is_hedged(self):
+        """Test the secondary answers when the primary misses its deadline"""
+        primary = SlowProvider("groq", delay=2, response="primary")
+        secondary = FakeProvider("ollama", response="secondary")
+        service = LLMService([primary, secondary], hedge_max_delay=0.05)
+
+        start = time.monotonic()
+        assert service.generate("sys", "user") == "secondary"
+        assert time.monotonic() - start < 1
+        assert primary.cancelled.wait(1)
+        assert service.hedge_counts == {"fired": 1, "secondary_wins": 1}
+
+    def test_caller_cancel_stops_both_legs(self):
+        """Test cancelling the caller's token cancels primary and hedge alike"""
+        primary = SlowProvider("groq", delay=2)
+        secondary = SlowProvider("ollama", delay=2)
+        service = LLMService([primary, secondary], hedge_max_delay=0.05)
+        cancel = CancelToken()
+        threading.Timer(0.2, cancel.set).start()
+
+        start = time.monotonic()
+        with pytest.raises(RuntimeError):
+            service.generate("sys", "user", cancel=cancel)
+        assert time.monotonic() - start < 1
+        assert primary.cancelled.wait(1) and secondary.cancelled.wait(1)
+        # Cancelled calls say nothing about provider health
+        assert service.breakers["groq"].snapshot()["error_rate"] == 0.0
+
+    def test_cancelled_call_does_not_fall_back(self):
+        """Test a cancelled call isn't retried on the next provider"""
+        primary = SlowProvider("groq", delay=2)
+        secondary = FakeProvider("ollama")
+        service = LLMService([primary, secondary], hedge=False)
+        cancel = CancelToken()
+        threading.Timer(0.1, cancel.set).start()
+
+        with pytest.raises(RuntimeError):
+            service.generate("sys", "user", cancel=cancel)
+        assert secondary.calls == []
+
+    def test_cancel_token_children(self):
+        """Test setting a token sets its children, including ones derived afterwards"""
+        parent = CancelToken()
+        child = parent.child()
+        child.set()
+        assert not parent.is_set()
+
+        sibling = parent.child()
+        parent.set()
+        assert sibling.is_set()
+        assert parent.child().is_set()
+
+    def test_queued_primary_is_not_hedged(self):
+        """Test time spent waiting for a pool thread doesn't count toward the hedge deadline"""
+        primary = SlowProvider("groq", delay=0.1, response="primary")
+        secondary = FakeProvider("ollama", response="secondary")
+        service = LLMService([primary, secondary], hedge_max_delay=0.2, max_workers=1)
+        service._executor.submit(time.sleep, 0.3)
+
+        assert service.generate("sys", "user") == "primary"
+        assert service.hedge_counts["fired"] == 0
+        assert secondary.calls == []
+
+    def test_fast_primary_is_not_hedged(self):
+        """Test no backup request is sent when the primary is on time"""
+        primary = FakeProvider("groq", response="primary")
+        secondary = FakeProvider("ollama")
+        service = LLMService([primary, secondary], hedge_max_delay=1)
+
+        assert service.generate("sys", "user") == "primary"
+        assert secondary.calls == []
+        assert service.hedge_counts["fired"] == 0
+
+    def test_primary_error_falls_back_without_waiting(self):
+        """Test a failing primary goes straight to the secondary"""
+        primary = FakeProvider("groq", error=RuntimeError("429"))
+        secondary = FakeProvider("ollama", response="secondary")
+        service = LLMService([primary, secondary], hedge_max_delay=5)
+
+        start = time.monotonic()
+        assert service.generate("sys", "user") == "secondary"
+        assert time.monotonic() - start < 1
+        assert service.hedge_counts["fired"] == 0
+
+    def test_deadline_follows_primary_p95(self):
+        """Test the hedge deadline is the primary's p95, clamped"""
+        service = LLMService([FakeProvider("groq"), FakeProvider("ollama")],
+                             hedge_min_delay=0.2, hedge_max_delay=5, hedge_min_samples=10)
+        groq = service.providers[0]
+        assert service.hedge_delay(groq) == 5
+
+        for ms in range(1, 101):
+            service.latency["groq"].record(ms / 100)
+        assert service.hedge_delay(groq) == 0.95
+
+        service.hedge_min_delay = 2
+        assert service.hedge_delay(groq) == 2
+
+    def test_latency_percentile(self):
+        """Test nearest-rank percentiles"""
+        tracker = LatencyTracker()
+        assert tracker.percentile(95) is None
+        for x in range(1, 21):
+            tracker.record(x)
+        assert tracker.percentile(50) == 10
+        assert tracker.percentile(95) == 19
+        assert tracker.percentile(100) == 20
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker:
+    """Unit tests for per-provider circuit breaking"""
+
+    def test_opens_on_error_rate(self):
+        """Test the circuit opens once the windowed error rate is reached"""
+        breaker = CircuitBreaker(error_rate=0.5, min_calls=4, clock=FakeClock())
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_success()
+        assert breaker.state == "closed"
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert not breaker.acquire()
+
+    def test_old_outcomes_leave_the_window(self):
+        """Test failures outside the window don't count"""
+        clock = FakeClock()
+        breaker = CircuitBreaker(min_calls=2, window_seconds=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 20
+        breaker.record_success()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == "closed"
+
+    def test_half_open_probe(self):
+        """Test one probe is allowed after the cooldown and decides the state"""
+        clock = FakeClock()
+        breaker = CircuitBreaker(min_calls=1, open_seconds=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+        assert breaker.state == "half_open"
+        assert breaker.acquire()
+        assert not breaker.acquire()
+
+        breaker.record_failure()
+        assert breaker.state == "open"
+        clock.now = 25
+        assert breaker.state == "open"  # cooldown doubled
+        clock.now = 30
+        assert breaker.acquire()
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+    def test_traffic_skips_open_provider(self):
+        """Test an open circuit routes calls straight to the healthy provider"""
+        groq = FakeProvider("groq", error=RuntimeError("503"))
+        ollama = FakeProvider("ollama", response="ok")
+        service = LLMService([groq, ollama], hedge=False,
+                             breaker_factory=lambda: CircuitBreaker(min_calls=2))
+
+        for _ in range(5):
+            assert service.generate("sys", "user") == "ok"
+        assert len(groq.calls) == 2
+        assert service.breaker_snapshot()["groq"]["state"] == "open"
+
+    def test_all_open_fails_fast(self):
+        """Test a call with every circuit open raises without calling providers"""
+        provider = FakeProvider("ollama", error=RuntimeError("down"))
+        service = LLMService([provider], breaker_factory=lambda: CircuitBreaker(min_calls=1))
+        with pytest.raises(RuntimeError):
+            service.generate("sys", "user")
+        with pytest.raises(CircuitOpenError):
+            service.generate("sys", "user")
+        assert len(provider.calls) == 1
+
+
+class TestCoalescing:
+    """Unit tests for single-flight request coalescing"""
+
+    def _run_concurrently(self, service, n, **kwargs):
+        barrier = threading.Barrier(n)
+        results = []
+
+        def call():
+            barrier.wait()
+            results.append(service.generate("sys", "same prompt", **kwargs))
+
+        threads = [threading.Thread(target=call) for _ in range(n)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results
+
+    def test_identical_requests_share_one_call(self):
+        """Test concurrent identical requests on an opted-in endpoint make one call"""
+        provider = SlowProvider("ollama", delay=0.3, response="shared")
+        service = LLMService([provider], coalesce_endpoints=["openings"])
+
+        results = self._run_concurrently(service, 5, endpoint="openings")
+
+        assert results == ["shared"] * 5
+        assert len(provider.calls) == 1
+        assert service.stats.snapshot()["openings"]["structured"]["coalesced"] == 4
+
+    def test_other_endpoints_are_not_coalesced(self):
+        """Test endpoints that want diversity keep independent calls"""
+        provider = SlowProvider("ollama", delay=0.1)
+        service = LLMService([provider], coalesce_endpoints=["openings"])
+
+        self._run_concurrently(service, 3, endpoint="continue")
+
+        assert len(provider.calls) == 3
+
+    def test_sampling_params_are_part_of_the_key(self):
+        """Test requests differing only in temperature are not merged"""
+        provider = SlowProvider("ollama", delay=0.2)
+        service = LLMService([provider], coalesce_endpoints=["agent"])
+
+        threads = [threading.Thread(target=service.generate, args=("sys", "p"),
+                                    kwargs={"temp": t, "endpoint": "agent"}) for t in (0.6, 0.8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(provider.calls) == 2
+
+    def test_errors_are_shared(self):
+        """Test followers see the leader's error and nothing is cached afterwards"""
+        provider = FakeProvider("ollama", error=RuntimeError("down"))
+        service = LLMService([provider], coalesce_endpoints=["agent"], breaker_factory=lambda: CircuitBreaker(min_calls=100))
+
+        with pytest.raises(RuntimeError):
+            service.generate("sys", "p", endpoint="agent")
+        provider.error = None
+        assert service.generate("sys", "p", endpoint="agent") == "{}"
+
+
+class TestMetrics:
+    """Unit tests for per-call Prometheus instrumentation"""
+
+    class ReportingProvider(FakeProvider):
+        """Reports token counts and time to first token like a real backend"""
+
+        def generate(self, *args, **kwargs):
+            info = call_info()
+            info.prompt_tokens, info.completion_tokens, info.ttft = 120, 30, 0.2
+            return super().generate(*args, **kwargs)
+
+    def test_successful_call_is_measured(self):
+        """Test latency, tokens and time to first token are labelled by endpoint, agent and provider"""
+        service = LLMService([self.ReportingProvider("groq", response='{"stance":"A"}')], hedge=False)
+        service.generate("sys", "user", endpoint="continue", budget_key="continue:Deon")
+
+        m = service.metrics
+        labels = {"endpoint": "continue", "agent": "Deon", "provider": "groq"}
+        assert m.requests.value(outcome="ok", **labels) == 1
+        assert m.latency.count(**labels) == 1
+        assert m.prompt_tokens.value(**labels) == 120
+        assert m.completion_tokens.value(**labels) == 30
+        assert m.ttft.count(endpoint="continue", provider="groq") == 1
+
+    def test_custom_agents_share_one_label(self):
+        """Test default agents are labelled by name and all custom agents share one label"""
+        service = LLMService([FakeProvider("groq")], hedge=False)
+        for name in ("Gaia", "Themis", "Сократ"):
+            service.generate("sys", "user", endpoint="continue", budget_key=f"continue:{name}")
+
+        m = service.metrics
+        assert m.requests.value(endpoint="continue", agent="custom", provider="groq", outcome="ok") == 3
+        assert "Gaia" not in m.registry.render()
+        assert agent_label("agent:deon") == "Deon"
+        assert agent_label("judge") == ""
+
+    def test_errors_retries_and_estimates(self):
+        """Test failed calls, estimated tokens, retries and parse failures are counted"""
+        service = LLMService([FakeProvider("groq", error=RuntimeError("503")),
+                              FakeProvider("ollama", response="x" * 40)], hedge=False)
+        service.generate("s" * 40, "u" * 40, endpoint="judge")
+        service.record_parse("judge", False)
+        service.record_retry("judge")
+
+        m = service.metrics
+        assert m.requests.value(endpoint="judge", agent="", provider="groq", outcome="error") == 1
+        assert m.prompt_tokens.value(endpoint="judge", agent="", provider="ollama") == 20
+        assert m.completion_tokens.value(endpoint="judge", agent="", provider="ollama") == 10
+        assert m.ttft.count(endpoint="judge", provider="ollama") == 0
+        assert m.parse_failures.value(endpoint="judge") == 1
+        assert m.retries.value(endpoint="judge") == 1
+        assert 'llm_requests_total{endpoint="judge",agent="",provider="groq",outcome="error"} 1' \
+            in m.registry.render()
+
+
+class TestProviderPool:
+    """Unit tests for pooled providers"""
+
+    def test_least_outstanding_member_is_used(self):
+        """Test a busy member is passed over for an idle one"""
+        busy = SlowProvider("groq[0]", delay=2, response="busy")
+        idle = FakeProvider("groq[1]", response="idle")
+        pool = ProviderPool("groq", [busy, idle])
+        cancel = threading.Event()
+
+        def hold_busy_member():
+            with pytest.raises(RuntimeError):
+                pool.generate("s", "u", 10, 0.5, 0.9, 1.1, cancel=cancel)
+
+        worker = threading.Thread(target=hold_busy_member)
+        worker.start()
+        while not busy.calls:
+            time.sleep(0.01)
+        results = [pool.generate("s", "u", 10, 0.5, 0.9, 1.1) for _ in range(3)]
+        cancel.set()
+        worker.join()
+
+        assert results == ["idle"] * 3
+        assert pool.snapshot()["groq[1]"]["served"] == 3
+
+    def test_load_is_spread_across_members(self):
+        """Test idle members share sequential calls"""
+        members = [FakeProvider(f"ollama@{i}") for i in range(3)]
+        pool = ProviderPool("ollama", members)
+        for _ in range(9):
+            pool.generate("s", "u", 10, 0.5, 0.9, 1.1)
+        assert [len(m.calls) for m in members] == [3, 3, 3]
+
+    def test_failing_member_is_skipped(self):
+        """Test a failed member falls over within the pool and its circuit opens"""
+        bad = FakeProvider("groq[0]", error=RuntimeError("401"))
+        good = FakeProvider("groq[1]", response="ok")
+        pool = ProviderPool("groq", [bad, good], breaker_factory=lambda: CircuitBreaker(min_calls=2))
+
+        for _ in range(6):
+            assert pool.generate("s", "u", 10, 0.5, 0.9, 1.1) == "ok"
+        assert len(bad.calls) == 2
+        assert pool.snapshot()["groq[0]"]["circuit"] == "open"
+
+    def test_all_members_fail(self):
+        """Test the pool raises when no member succeeds"""
+        pool = ProviderPool("groq", [FakeProvider("a", error=ValueError("a"))])
+        with pytest.raises(ValueError):
+            pool.generate("s", "u", 10, 0.5, 0.9, 1.1)
+
+    def test_calls_can_be_pinned_to_a_provider_and_model(self):
+        """Test routes list each pool model once and a pinned call uses only that route"""
+        def member(name, model):
+            provider = FakeProvider(name, response=model)
+            provider.model = model
+            return provider
+
+        groq = ProviderPool("groq", [member("groq[0]:llama", "llama"), member("groq[1]:llama", "llama"),
+                                     member("groq[0]:qwen", "qwen")])
+        service = LLMService([groq, FakeProvider("ollama", response="ollama")], hedge=False)
+
+        assert service.routes() == [("groq", "llama"), ("groq", "qwen"), ("ollama", None)]
+        assert service.generate("s", "u", provider="groq", model="qwen") == "qwen"
+        assert service.generate("s", "u", provider="ollama") == "ollama"
+        assert service.generate("s", "u", provider="groq", model="llama") == "llama"
+        with pytest.raises(ValueError):
+            service.generate("s", "u", provider="missing")
+
+    def test_pinned_call_does_not_fall_back(self):
+        """Test a failing pinned provider raises instead of trying the next one"""
+        backup = FakeProvider("ollama", response="ok")
+        service = LLMService([FakeProvider("groq", error=RuntimeError("503")), backup], hedge=False)
+        with pytest.raises(RuntimeError):
+            service.generate("s", "u", provider="groq")
+        assert backup.calls == []
+
+
+class TestGroqProvider:
+    """Unit tests for Groq JSON mode"""
+
+    class _Client:
+        def __init__(self, error):
+            self.error = error
+            self.kwargs = None
+            self.chat = self
+            self.completions = self
+            self.with_raw_response = self
+
+        def create(self, **kwargs):
+            self.kwargs = kwargs
+            raise self.error
+
+    def test_failed_generation_is_returned(self):
+        """Test output rejected by JSON mode is handed back instead of raising"""
+        error = RuntimeError("400")
+        error.body = {"error": {"code": "json_validate_failed", "failed_generation": ' {"stance": "A", '}}
+        client = self._Client(error)
+
+        raw = GroqProvider(client, "model").generate("sys", "json please", 100, 0.5, 0.9, 1.1,
+                                                     schema=AGENT_TURN_SCHEMA)
+
+        assert raw == '{"stance": "A",'
+        assert client.kwargs["response_format"] == {"type": "json_object"}
+
+    def test_other_errors_raise(self):
+        """Test unrelated errors still propagate for fallback"""
+        client = self._Client(RuntimeError("timeout"))
+        with pytest.raises(RuntimeError):
+            GroqProvider(client, "model").generate("sys", "user", 100, 0.5, 0.9, 1.1)
+        assert "response_format" not in client.kwargs
+
+    def test_limiter_tracks_usage_and_headers(self):
+        """Test a successful call reconciles usage and syncs rate-limit headers"""
+        from types import SimpleNamespace
+        from services.rate_limiter import RateLimiter
+
+        completion = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=" ok "))],
+            usage=SimpleNamespace(total_tokens=10)
+        )
+        raw = SimpleNamespace(headers={"x-ratelimit-remaining-tokens": "900"}, parse=lambda: completion)
+
+        class Client:
+            def __init__(self):
+                self.chat = self.completions = self.with_raw_response = self
+                self.options = None
+
+            def with_options(self, **options):
+                self.options = options
+                return self
+
+            def create(self, **kwargs):
+                return raw
+
+        client = Client()
+        limiter = RateLimiter(rpm=10, tpm=1000)
+        provider = GroqProvider(client, "model", limiter=limiter)
+
+        assert provider.generate("sys", "user", 100, 0.5, 0.9, 1.1) == "ok"
+        assert client.options == {"max_retries": 0}
+        assert limiter.counts["granted"] == 1
+        assert limiter.tokens.level <= 900
+
+    def test_usage_is_reported(self):
+        """Test token counts and server-side time to first token reach the call info"""
+        from types import SimpleNamespace
+        from services.llm_service import CallInfo, _CALL_INFO
+
+        completion = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))],
+            usage=SimpleNamespace(prompt_tokens=50, completion_tokens=7, total_tokens=57,
+                                  queue_time=0.05, prompt_time=0.1)
+        )
+        raw = SimpleNamespace(headers={}, parse=lambda: completion)
+        client = SimpleNamespace(create=lambda **kwargs: raw)
+        client.chat = client.completions = client.with_raw_response = client
+
+        info = CallInfo()
+        token = _CALL_INFO.set(info)
+        try:
+            GroqProvider(client, "model").generate("sys", "user", 100, 0.5, 0.9, 1.1)
+        finally:
+            _CALL_INFO.reset(token)
+        assert (info.prompt_tokens, info.completion_tokens) == (50, 7)
+        assert info.ttft == pytest.approx(0.15)
+
+
+class TestOllamaProvider:
+    """Unit tests for Ollama request shapes"""
+
+    class _Response:
+        def __init__(self, body):
+            self.body = body
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return self.body
+
+    def _capture(self, monkeypatch, body):
+        import services.llm_service as llm_module
+        sent = []
+
+        def post(url, json=None, headers=None, timeout=None, **kwargs):
+            sent.append((url, json))
+            return self._Response(body)
+
+        monkeypatch.setattr(llm_module.requests, "post", post)
+        return sent
+
+    def test_chat_mode_keeps_system_prompt_separate(self, monkeypatch):
+        """Test chat mode sends the persona as a stable system message with keep_alive"""
+        from services.llm_service import OllamaProvider
+        sent = self._capture(monkeypatch, {"message": {"role": "assistant", "content": " hi "}})
+        provider = OllamaProvider("http://ollama:11434/", "qwen", keep_alive="10m")
+
+        assert provider.generate("You are Deon.", "Turn 1", 50, 0.5, 0.9, 1.1) == "hi"
+        url, payload = sent[0]
+        assert url == "http://ollama:11434/api/chat"
+        assert payload["messages"][0] == {"role": "system", "content": "You are Deon."}
+        assert payload["keep_alive"] == "10m"
+
+    def test_generate_mode(self, monkeypatch):
+        """Test the raw prompt mode is still available"""
+        from services.llm_service import OllamaProvider
+        sent = self._capture(monkeypatch, {"response": "ok"})
+        provider = OllamaProvider("http://ollama:11434", "qwen", use_chat=False, keep_alive=None)
+
+        assert provider.generate("sys", "user", 50, 0.5, 0.9, 1.1, schema=AGENT_TURN_SCHEMA) == "ok"
+        url, payload = sent[0]
+        assert url.endswith("/api/generate")
+        assert payload["format"] == AGENT_TURN_SCHEMA
+        assert "keep_alive" not in payload
+
+    def test_warmup_loads_model_and_primes_prompts(self, monkeypatch):
+        """Test warmup loads the model then evaluates each system prompt once"""
+        from services.llm_service import OllamaProvider
+        sent = self._capture(monkeypatch, {"message": {"content": ""}, "response": ""})
+        OllamaProvider("http://ollama:11434", "qwen").warmup(["A", "B"])
+
+        assert sent[0][0].endswith("/api/generate") and sent[0][1]["prompt"] == ""
+        assert [p["messages"][0]["content"] for _, p in sent[1:]] == ["A", "B"]
+        assert all(p["options"]["num_predict"] == 1 for _, p in sent[1:])
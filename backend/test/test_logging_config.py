@@ -0,0 +1,207 @@
+# backend/test/test_logging_config.py
+"""
+Unit tests for the structured, queued logging setup
+"""
+
+import io
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+
+import pytest
+from services import logging_config
+from services.logging_config import (
+    NonBlockingQueueHandler, SamplingFilter, StructuredFormatter,
+    configure_logging, parse_levels, parse_sample_rates
+)
+
+
+def make_record(msg="hello", level=logging.INFO, name="test", args=None, **fields):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    for k, v in fields.items():
+        setattr(record, k, v)
+    return record
+
+
+@pytest.fixture
+def configured():
+    """Configure logging into a buffer and undo it afterwards"""
+    stream = io.StringIO()
+    handles = []
+
+    def configure(**kwargs):
+        handle = configure_logging(stream=stream, **kwargs)
+        handles.append(handle)
+        return handle, stream
+
+    yield configure
+    for handle in handles:
+        logging.getLogger().removeHandler(handle.handler)
+        handle.stop()
+    logging_config._active = None
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+class TestParsing:
+    """Unit tests for the environment-variable parsers"""
+
+    def test_parse_levels(self):
+        """Test per-module levels parse by name"""
+        assert parse_levels("main=INFO, services.llm_service=debug") == {
+            "main": logging.INFO, "services.llm_service": logging.DEBUG
+        }
+        assert parse_levels("") == {}
+
+    def test_parse_levels_rejects_unknown(self):
+        """Test bad entries fail at startup rather than being ignored"""
+        with pytest.raises(ValueError):
+            parse_levels("main=LOUD")
+        with pytest.raises(ValueError):
+            parse_levels("main")
+
+    def test_parse_sample_rates(self):
+        """Test rates are keyed by level number and bounded"""
+        assert parse_sample_rates("DEBUG=0.05,INFO=1") == {logging.DEBUG: 0.05, logging.INFO: 1.0}
+        with pytest.raises(ValueError):
+            parse_sample_rates("DEBUG=2")
+
+
+class TestStructuredFormatter:
+    """Unit tests for StructuredFormatter"""
+
+    def test_json_includes_fields(self):
+        """Test extra fields become top-level JSON keys"""
+        formatter = StructuredFormatter("json")
+        line = formatter.format(make_record("Agent parsed JSON", agent="Deon", parsed={"stance": "A"}))
+
+        payload = json.loads(line)
+        assert payload["msg"] == "Agent parsed JSON"
+        assert payload["level"] == "INFO"
+        assert payload["agent"] == "Deon"
+        assert payload["parsed"] == {"stance": "A"}
+
+    def test_truncates_long_values(self):
+        """Test long strings and large containers are cut to the limit"""
+        formatter = StructuredFormatter("json", max_field_chars=10)
+        payload = json.loads(formatter.format(make_record("x" * 50, raw="y" * 30, parsed={"k": "z" * 30})))
+
+        assert payload["msg"] == "x" * 10 + "...(+40 chars)"
+        assert payload["raw"] == "y" * 10 + "...(+20 chars)"
+        assert isinstance(payload["parsed"], str) and payload["parsed"].startswith('{"k": "zz')
+
+    def test_text_format(self):
+        """Test the text format appends fields as key=value"""
+        line = StructuredFormatter("text").format(make_record("Agent retrying", agent="Deon", note="two words"))
+        assert line.endswith('test: Agent retrying agent=Deon note="two words"')
+
+    def test_rejects_unknown_format(self):
+        """Test an unknown format name is an error"""
+        with pytest.raises(ValueError):
+            StructuredFormatter("xml")
+
+
+class TestSamplingFilter:
+    """Unit tests for SamplingFilter"""
+
+    def test_samples_per_level(self):
+        """Test only the configured level is thinned out"""
+        sampler = SamplingFilter({logging.DEBUG: 0.1}, rng=random.Random(1))
+        kept_debug = sum(sampler.filter(make_record(level=logging.DEBUG)) for _ in range(1000))
+        kept_info = sum(sampler.filter(make_record(level=logging.INFO)) for _ in range(100))
+
+        assert 50 < kept_debug < 150
+        assert kept_info == 100
+        assert sampler.sampled_out == 1000 - kept_debug
+
+    def test_zero_rate_drops_all(self):
+        """Test a zero rate silences a level"""
+        sampler = SamplingFilter({logging.DEBUG: 0})
+        assert not any(sampler.filter(make_record(level=logging.DEBUG)) for _ in range(10))
+
+
+class TestNonBlockingQueueHandler:
+    """Unit tests for NonBlockingQueueHandler"""
+
+    def test_drops_when_full(self):
+        """Test a full queue drops records instead of blocking"""
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=2))
+        for _ in range(5):
+            handler.handle(make_record())
+
+        assert handler.queue.qsize() == 2
+        assert handler.dropped == 3
+
+    def test_prepare_freezes_message_and_trace_id(self):
+        """Test args are merged and the trace id is read on the calling thread"""
+        handler = NonBlockingQueueHandler(queue.Queue(), trace_id=lambda: "abc123")
+        handler.handle(make_record("turn %d", args=(3,)))
+
+        record = handler.queue.get_nowait()
+        assert record.getMessage() == "turn 3"
+        assert record.args is None
+        assert record.trace_id == "abc123"
+
+    def test_exception_text_is_captured(self):
+        """Test tracebacks are rendered before the record crosses threads"""
+        handler = NonBlockingQueueHandler(queue.Queue())
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            record = logging.LogRecord("test", logging.ERROR, __file__, 1, "failed", None, sys.exc_info())
+        handler.handle(record)
+
+        queued = handler.queue.get_nowait()
+        assert queued.exc_info is None
+        assert "RuntimeError: boom" in queued.exc_text
+
+
+class TestConfigureLogging:
+    """Tests for the installed pipeline"""
+
+    def test_writes_on_background_thread(self, configured):
+        """Test records are written by the listener, not the caller"""
+        handle, stream = configured(level="INFO", fmt="json")
+        writers = []
+        original = stream.write
+
+        def write(text):
+            writers.append(threading.current_thread())
+            return original(text)
+
+        stream.write = write
+        logging.getLogger("test.pipeline").info("Debate submission", extra={"success": True})
+        handle.stop()
+
+        payload = json.loads(stream.getvalue().splitlines()[0])
+        assert payload["success"] is True
+        assert writers and threading.current_thread() not in writers
+
+    def test_per_module_levels(self, configured):
+        """Test a module can log below the root level"""
+        handle, stream = configured(level="WARNING", levels={"test.verbose": logging.DEBUG})
+        logging.getLogger("test.verbose").debug("kept")
+        logging.getLogger("test.quiet").info("dropped")
+        handle.stop()
+
+        output = stream.getvalue()
+        assert "kept" in output
+        assert "dropped" not in output
+        logging.getLogger("test.verbose").setLevel(logging.NOTSET)
+
+    def test_reconfigure_replaces_handler(self, configured):
+        """Test configuring twice leaves a single queue handler installed"""
+        configured(level="INFO")
+        second, _ = configured(level="INFO")
+
+        installed = [h for h in logging.getLogger().handlers if isinstance(h, NonBlockingQueueHandler)]
+        assert installed == [second.handler]
+
+    def test_stats(self, configured):
+        """Test sampled-out records are counted"""
+        handle, _ = configured(level="DEBUG", sample_rates={logging.DEBUG: 0})
+        logging.getLogger("test.sampled").debug("gone")
+
+        assert handle.stats()["sampled_out"] == 1
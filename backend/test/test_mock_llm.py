@@ -0,0 +1,142 @@
+# backend/test/test_mock_llm.py
+"""
+Unit tests for the mock LLM provider and server
+"""
+
+import json
+import threading
+
+import pytest
+from services.llm_service import AGENT_TURN_SCHEMA, VERDICT_SCHEMA, OllamaProvider, agent_turn_schema
+from services.mock_llm import MockLLM, MockLLMError, MockLLMServer, MockProvider
+
+REBUTTAL = "You are Deon. Opponents said:\n...\nPick ONE opponent (Conse, Virtue) and respond in 2-3 sentences."
+
+
+def generate(provider, system_prompt, user_prompt, **kwargs):
+    return provider.generate(system_prompt, user_prompt, 400, 0.7, 0.9, 1.1, **kwargs)
+
+
+class TestMockLLM:
+    """Unit tests for MockLLM content and faults"""
+
+    def test_output_is_deterministic_per_prompt(self):
+        """Test the same prompt always yields the same completion"""
+        llm = MockLLM(seed=1)
+        assert llm.complete("sys", REBUTTAL) == MockLLM(seed=1).complete("sys", REBUTTAL)
+        assert llm.complete("sys", REBUTTAL) != llm.complete("sys", REBUTTAL + " again")
+
+    def test_rebuttal_names_an_opponent(self):
+        """Test turns address one of the listed opponents"""
+        turn = json.loads(MockLLM().complete("sys", REBUTTAL, schema=agent_turn_schema(["Conse", "Virtue"])))
+        assert turn["opponent"] in ("Conse", "Virtue")
+        assert turn["argument"].startswith(turn["opponent"] + ", ")
+        assert turn["stance"] in ("A", "B")
+
+    def test_verdict_shape(self):
+        """Test verdict prompts return a complete verdict"""
+        verdict = json.loads(MockLLM().complete("You are the Judge.", "{}", 600, schema=VERDICT_SCHEMA))
+        assert set(verdict) == {"scores", "final_recommendation", "confidence", "verdict"}
+        assert set(verdict["scores"]["option_a"]) == set(VERDICT_SCHEMA["properties"]["scores"]["properties"]
+                                                           ["option_a"]["properties"])
+
+    def test_num_predict_truncates(self):
+        """Test a small token limit cuts the output like a real model"""
+        text = MockLLM(turn_tokens=200).complete("sys", REBUTTAL, num_predict=10)
+        assert len(text) <= 40
+        with pytest.raises(json.JSONDecodeError):
+            json.loads(text)
+
+    def test_fault_rates(self):
+        """Test injected errors, 429s and malformed outputs follow their rates"""
+        llm = MockLLM(seed=3, error_rate=0.1, rate_limit_rate=0.1, malformed_rate=0.2)
+        plans = [llm.plan() for _ in range(2000)]
+        errors = [p["error"].status for p in plans if p["error"] is not None]
+        assert 150 < errors.count(503) < 250
+        assert 150 < errors.count(429) < 250
+        assert 300 < sum(p["malformed"] for p in plans) < 500
+
+    def test_latency_distribution(self):
+        """Test the lognormal first-token delay is centred on the median"""
+        llm = MockLLM(median_ms=100, sigma=0.5)
+        samples = sorted(llm.plan()["ttft_s"] for _ in range(2001))
+        assert 0.09 < samples[1000] < 0.11
+        assert samples[-20] > 0.2  # heavy-ish tail
+
+
+class TestMockProvider:
+    """Unit tests for the in-process provider"""
+
+    def test_stop_and_errors(self):
+        """Test stop sequences are honoured and injected errors raised"""
+        provider = MockProvider(MockLLM(median_ms=0, tokens_per_s=0))
+        text = generate(provider, "sys", REBUTTAL, stop=["}"])
+        assert text.startswith("{") and "}" not in text
+
+        failing = MockProvider(MockLLM(median_ms=0, tokens_per_s=0, error_rate=1.0))
+        with pytest.raises(MockLLMError):
+            generate(failing, "sys", REBUTTAL)
+
+    def test_cancel(self):
+        """Test a cancelled call returns early"""
+        provider = MockProvider(MockLLM(latency_dist="fixed", median_ms=5000))
+        cancel = threading.Event()
+        cancel.set()
+        with pytest.raises(MockLLMError):
+            generate(provider, "sys", REBUTTAL, cancel=cancel)
+
+
+class TestMockLLMServer:
+    """Round trips through the HTTP stand-in"""
+
+    @pytest.fixture
+    def server(self):
+        server = MockLLMServer(MockLLM(median_ms=1, tokens_per_s=0), port=0).start()
+        yield server
+        server.stop()
+
+    def test_ollama_chat_and_generate(self, server):
+        """Test the Ollama provider works against both endpoints, streamed or not"""
+        chat = OllamaProvider(server.url, "mock")
+        raw = OllamaProvider(server.url, "mock", use_chat=False)
+
+        turn = json.loads(generate(chat, "You are Deon.", REBUTTAL, schema=AGENT_TURN_SCHEMA))
+        assert turn["argument"].split(",")[0] in ("Conse", "Virtue")
+        streamed = generate(chat, "You are Deon.", REBUTTAL, schema=AGENT_TURN_SCHEMA, cancel=threading.Event())
+        assert json.loads(streamed) == turn
+        assert json.loads(generate(raw, "You are Deon.", REBUTTAL))["stance"] in ("A", "B")
+        chat.warmup(["You are Deon."])
+
+    def test_generate_mode_classifies_by_system_prompt(self, server):
+        """Test /api/generate requests, with the system prompt inside `prompt`, get the right response kind"""
+        chat = OllamaProvider(server.url, "mock")
+        raw = OllamaProvider(server.url, "mock", use_chat=False)
+        judge = "You are the Judge. Return JSON with final_recommendation."
+
+        verdict = json.loads(generate(raw, judge, "{}", schema=VERDICT_SCHEMA))
+        assert verdict["final_recommendation"] in ("A", "B")
+        assert generate(raw, "You are Deon.", REBUTTAL) == generate(chat, "You are Deon.", REBUTTAL)
+
+    def test_openai_shape(self, server):
+        """Test the Groq chat-completions shape, usage and rate-limit headers"""
+        import requests
+        r = requests.post(f"{server.url}/openai/v1/chat/completions", json={
+            "model": "mock", "max_tokens": 300,
+            "messages": [{"role": "system", "content": "You are the Judge. Return JSON with final_recommendation."}, {"role": "user", "content": "{}"}],
+            "response_format": {"type": "json_object"}
+        })
+        body = r.json()
+        assert json.loads(body["choices"][0]["message"]["content"])["final_recommendation"] in ("A", "B")
+        assert body["usage"]["total_tokens"] > 0
+        assert "x-ratelimit-remaining-tokens" in r.headers
+
+    def test_openai_streaming(self, server):
+        """Test server-sent event streaming ends with [DONE]"""
+        import requests
+        r = requests.post(f"{server.url}/openai/v1/chat/completions", stream=True, json={
+            "model": "mock", "stream": True, "messages": [{"role": "user", "content": REBUTTAL}]
+        })
+        events = [line for line in r.iter_lines() if line]
+        assert events[-1] == b"data: [DONE]"
+        content = "".join(json.loads(e[6:])["choices"][0]["delta"]["content"] for e in events[:-1])
+        assert json.loads(content)["stance"] in ("A", "B")
@@ -0,0 +1,207 @@
+# backend/test/test_profiling.py
+"""
+Unit tests for on-demand request profiling
+"""
+
+import random
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from services.profiling import ProfileSession, Profiler, ProfilingMiddleware, profiled_route
+
+
+TOKEN = "s3cret"
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < end:
+        n += 1
+    return n
+
+
+def parse_many(n):
+    return [int(str(i)) for i in range(n)]
+
+
+def make_app(profiler):
+    app = FastAPI()
+    app.router.route_class = profiled_route(profiler)
+
+    @app.get("/work")
+    def work():
+        parse_many(2000)
+        busy(0.05)
+        return {"ok": True}
+
+    @app.get("/health")
+    def health():
+        return {"ok": True}
+
+    app.add_middleware(ProfilingMiddleware, profiler=profiler, skip_paths={"/health"})
+    return app
+
+
+class TestProfileSession:
+    """Unit tests for ProfileSession"""
+
+    def test_cprofile_counts_calls(self):
+        """Test cprofile mode records exact call counts for the endpoint's callees"""
+        session = ProfileSession("cprofile")
+        result = session.run(parse_many, (50,), {})
+
+        assert len(result) == 50
+        functions = {f["function"]: f for f in session.top(50)}
+        label = next(k for k in functions if k.endswith("(parse_many)"))
+        assert functions[label]["calls"] == 1
+        assert session.ran
+
+    def test_sampling_finds_hot_function(self):
+        """Test sample mode attributes time to the function on the stack"""
+        session = ProfileSession("sample", interval=0.002)
+        session.run(busy, (0.1,), {})
+
+        assert session.samples > 10
+        top = session.top(5)
+        assert any(f["function"].endswith("(busy)") for f in top)
+        assert "samples" in top[0]
+
+    def test_top_keeps_high_self_time(self):
+        """Test top() keeps functions with high self time even when their total is small"""
+        session = ProfileSession("cprofile")
+        session.functions["outer"] = [1, 0.0, 1.0]
+        session.functions["middle"] = [1, 0.0, 0.9]
+        session.functions["leaf"] = [100, 0.5, 0.5]
+
+        names = [f["function"] for f in session.top(1)]
+        assert names == ["outer", "leaf"]
+
+    def test_unknown_mode(self):
+        """Test an unknown mode is rejected"""
+        with pytest.raises(ValueError):
+            ProfileSession("perf")
+
+
+class TestProfiler:
+    """Unit tests for Profiler request selection"""
+
+    def test_header_modes(self):
+        """Test X-Profile selects the mode and '1' means cprofile"""
+        profiler = Profiler(token=TOKEN)
+        assert profiler.requested_mode("sample", TOKEN) == "sample"
+        assert profiler.requested_mode("1", TOKEN) == "cprofile"
+        assert profiler.requested_mode(None, TOKEN) is None
+
+    def test_token_required(self):
+        """Test a configured token gates header-requested profiles"""
+        profiler = Profiler(token=TOKEN)
+        assert profiler.requested_mode("cprofile", None) is None
+        assert profiler.requested_mode("cprofile", "wrong") is None
+        assert profiler.requested_mode("cprofile", TOKEN) == "cprofile"
+
+    def test_non_ascii_token_is_rejected(self):
+        """Test a token compare_digest can't take as str is refused rather than raising"""
+        profiler = Profiler(token=TOKEN)
+        assert not profiler.authorized("s3crét")
+        assert Profiler(token="clé").authorized("clé")
+
+        client = TestClient(make_app(profiler))
+        response = client.get("/work", headers=[(b"X-Profile", b"1"), (b"X-Profile-Token", "s3crét".encode("latin-1"))])
+        assert response.status_code == 200
+        assert "x-profile-id" not in response.headers
+
+    def test_no_token_configured(self):
+        """Test without a configured token nobody can request or read profiles, but sampling works"""
+        profiler = Profiler(sample_rate=1.0, mode="cprofile")
+        assert not profiler.authorized(None)
+        assert not profiler.authorized("")
+        assert profiler.requested_mode("sample", None) == "cprofile"
+        assert Profiler().requested_mode("sample", "anything") is None
+
+    def test_sample_rate(self):
+        """Test unrequested profiles follow the sample rate"""
+        profiler = Profiler(sample_rate=0.2, rng=random.Random(3))
+        picked = sum(profiler.requested_mode(None, None) == "sample" for _ in range(1000))
+        assert 150 < picked < 250
+
+    def test_disabled(self):
+        """Test nothing is profiled when disabled"""
+        profiler = Profiler(enabled=False, sample_rate=1.0, token=TOKEN)
+        assert profiler.requested_mode("cprofile", TOKEN) is None
+
+    def test_wrap_is_transparent_without_session(self):
+        """Test wrapped endpoints run normally and keep their signature"""
+        profiler = Profiler()
+
+        def endpoint(a: int, b: str = "x"):
+            return a, b
+
+        wrapped = profiler.wrap(endpoint)
+        assert wrapped(1, b="y") == (1, "y")
+        assert wrapped.__wrapped__ is endpoint
+
+
+class TestProfilingMiddleware:
+    """Tests for ProfilingMiddleware on a FastAPI app"""
+
+    def test_header_profiles_request(self):
+        """Test a requested profile is stored and its id returned"""
+        profiler = Profiler(token=TOKEN)
+        client = TestClient(make_app(profiler))
+
+        response = client.get("/work", headers={"X-Profile": "cprofile", "X-Profile-Token": TOKEN})
+        assert response.status_code == 200
+        profile_id = response.headers["x-profile-id"]
+
+        profile = profiler.get(profile_id)
+        assert profile["route"] == "/work"
+        assert profile["status"] == 200
+        assert profile["mode"] == "cprofile"
+        assert any(f["function"].endswith("(parse_many)") for f in profile["functions"])
+
+        summaries = profiler.recent()
+        assert summaries[0]["profile_id"] == profile_id
+        assert "functions" not in summaries[0]
+
+    def test_sampling_mode_profiles_worker_thread(self):
+        """Test the sampler follows the threadpool thread running a sync endpoint"""
+        profiler = Profiler(interval_ms=2, token=TOKEN)
+        client = TestClient(make_app(profiler))
+
+        profile_id = client.get("/work", headers={"X-Profile": "sample", "X-Profile-Token": TOKEN}).headers["x-profile-id"]
+        profile = profiler.get(profile_id, sort="self")
+        assert profile["samples"] > 5
+        assert profile["functions"][0]["function"].endswith("(busy)")
+
+    def test_unprofiled_requests(self):
+        """Test requests without a header are neither profiled nor stored"""
+        profiler = Profiler(token=TOKEN)
+        client = TestClient(make_app(profiler))
+
+        response = client.get("/work")
+        assert "x-profile-id" not in response.headers
+        assert client.get("/work", headers={"X-Profile": "1"}).headers.get("x-profile-id") is None
+        admin = {"X-Profile": "1", "X-Profile-Token": TOKEN}
+        assert client.get("/health", headers=admin).headers.get("x-profile-id") is None
+        assert profiler.recent() == []
+
+    def test_sampled_requests(self):
+        """Test sample_rate=1 profiles every request in the configured mode"""
+        profiler = Profiler(sample_rate=1.0, mode="cprofile")
+        client = TestClient(make_app(profiler))
+
+        client.get("/work")
+        client.get("/work")
+        assert [p["mode"] for p in profiler.recent()] == ["cprofile", "cprofile"]
+
+    def test_buffer_is_bounded(self):
+        """Test only the most recent profiles are kept"""
+        profiler = Profiler(sample_rate=1.0, mode="cprofile", capacity=2)
+        client = TestClient(make_app(profiler))
+
+        ids = [client.get("/work").headers["x-profile-id"] for _ in range(3)]
+        assert [p["profile_id"] for p in profiler.recent()] == ids[:0:-1]
+        assert profiler.get(ids[0]) is None
@@ -0,0 +1,96 @@
+# backend/test/test_rate_limiter.py
+"""
+Unit tests for the client-side rate limiter
+"""
+
+import threading
+import time
+
+from services.rate_limiter import (
+    RateLimiter, TokenBucket, parse_duration, PRIORITY_JUDGE, PRIORITY_ENHANCEMENT
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRateLimiter:
+    """Unit tests for RateLimiter"""
+
+    def test_token_bucket_refills(self):
+        """Test the bucket refills continuously up to capacity"""
+        clock = FakeClock()
+        bucket = TokenBucket(60, clock=clock)
+        bucket.take(60)
+        assert bucket.wait_time(30) == 30
+        clock.now = 30
+        assert bucket.wait_time(30) == 0
+        clock.now = 1000
+        bucket.refill()
+        assert bucket.level == 60
+
+    def test_requests_per_minute_enforced(self):
+        """Test requests beyond the RPM budget are refused until refill"""
+        clock = FakeClock()
+        limiter = RateLimiter(rpm=2, tpm=100000, clock=clock)
+        assert limiter.acquire(10, timeout=0)
+        assert limiter.acquire(10, timeout=0)
+        assert not limiter.acquire(10, timeout=0)
+        clock.now = 30
+        assert limiter.acquire(10, timeout=0)
+
+    def test_tokens_per_minute_and_reconcile(self):
+        """Test token estimates are charged and corrected by actual usage"""
+        clock = FakeClock()
+        limiter = RateLimiter(rpm=100, tpm=1000, clock=clock)
+        assert limiter.acquire(800, timeout=0)
+        assert not limiter.acquire(800, timeout=0)
+        limiter.reconcile(estimated=800, actual=200)
+        assert limiter.acquire(800, timeout=0)
+
+    def test_headers_sync_budget(self):
+        """Test server headers lower the local budget and retry-after pauses"""
+        clock = FakeClock()
+        limiter = RateLimiter(rpm=100, tpm=10000, clock=clock)
+        limiter.update_from_headers({"x-ratelimit-remaining-tokens": "50"})
+        assert not limiter.acquire(500, timeout=0)
+
+        limiter = RateLimiter(rpm=100, tpm=10000, clock=clock)
+        limiter.update_from_headers({"Retry-After": "5"})
+        assert not limiter.acquire(1, timeout=0)
+        clock.now = 5
+        assert limiter.acquire(1, timeout=0)
+
+    def test_priority_order(self):
+        """Test a queued judge request is served before earlier enhancement requests"""
+        limiter = RateLimiter(rpm=60, tpm=100000)
+        limiter.requests.take(limiter.requests.level)  # empty: next slot in ~1s
+        served = []
+
+        def worker(name, priority):
+            limiter.acquire(1, priority=priority, timeout=5)
+            served.append(name)
+
+        threads = [threading.Thread(target=worker, args=(f"enh{i}", PRIORITY_ENHANCEMENT)) for i in range(2)]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+        judge = threading.Thread(target=worker, args=("judge", PRIORITY_JUDGE))
+        judge.start()
+        for t in threads + [judge]:
+            t.join()
+
+        assert served[0] == "judge"
+
+    def test_parse_duration(self):
+        """Test Groq reset durations parse to seconds"""
+        assert parse_duration("2m59.56s") == 179.56
+        assert parse_duration("7.66s") == 7.66
+        assert parse_duration("120ms") == 0.12
+        assert parse_duration("3") == 3
+        assert parse_duration("") is None
@@ -0,0 +1,55 @@
+# backend/test/test_telemetry.py
+"""
+Unit tests for the Prometheus metrics registry
+"""
+
+import pytest
+from services.telemetry import MetricsRegistry
+
+
+class TestMetricsRegistry:
+    """Unit tests for MetricsRegistry rendering"""
+
+    def test_counter(self):
+        """Test labelled counters render one sample per label set"""
+        registry = MetricsRegistry()
+        calls = registry.counter("calls_total", "Calls", ("endpoint",))
+        calls.inc(endpoint="judge")
+        calls.inc(2, endpoint="judge")
+        calls.inc(endpoint='say "hi"\n')
+
+        text = registry.render()
+        assert "# TYPE calls_total counter" in text
+        assert 'calls_total{endpoint="judge"} 3' in text
+        assert 'calls_total{endpoint="say \\"hi\\"\\n"} 1' in text
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test histogram buckets count every observation at or below their bound"""
+        registry = MetricsRegistry()
+        latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+        for v in (0.05, 0.1, 0.5, 3):
+            latency.observe(v)
+
+        lines = registry.render().splitlines()
+        assert 'latency_seconds_bucket{le="0.1"} 2' in lines
+        assert 'latency_seconds_bucket{le="1"} 3' in lines
+        assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+        assert "latency_seconds_sum 3.65" in lines
+        assert "latency_seconds_count 4" in lines
+
+    def test_gauge_callback(self):
+        """Test gauges read their values at scrape time"""
+        registry = MetricsRegistry()
+        state = {"groq": 1}
+        registry.gauge("circuit_open", "Open circuits", ("provider",),
+                       callback=lambda: [((name,), v) for name, v in state.items()])
+        state["groq"] = 0
+        assert 'circuit_open{provider="groq"} 0' in registry.render()
+
+    def test_reregistering(self):
+        """Test the same metric can be registered twice but not with another shape"""
+        registry = MetricsRegistry()
+        a = registry.counter("calls_total", "Calls", ("endpoint",))
+        assert registry.counter("calls_total", "Calls", ("endpoint",)) is a
+        with pytest.raises(ValueError):
+            registry.histogram("calls_total", "Calls", ("endpoint",))
@@ -0,0 +1,96 @@
+# backend/test/test_template_store.py
+"""
+Unit tests for TemplateStore
+"""
+
+import pytest
+import json
+import os
+import tempfile
+from pathlib import Path
+from services.debate_deduplication_service import DebateDeduplicationService
+from services.template_store import TemplateStore
+
+
+class TestTemplateStore:
+    """Unit tests for template store"""
+
+    @pytest.fixture
+    def temp_templates_file(self):
+        """Create a temporary templates file with two templates"""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            temp_path = f.name
+            json.dump([
+                {'id': 1, 'slug': 'first', 'title': 'First', 'context': 'c1', 'option_a': 'a', 'option_b': 'b'},
+                {'id': 2, 'slug': 'second', 'title': 'Second', 'context': 'c2', 'option_a': 'a', 'option_b': 'b',
+                 'merged_slugs': ['second-copy']}
+            ], f)
+        yield temp_path
+        Path(temp_path).unlink(missing_ok=True)
+
+    @pytest.fixture
+    def store(self, temp_templates_file):
+        return TemplateStore(temp_templates_file)
+
+    def test_list_payload(self, store):
+        """Test list body matches the API shape"""
+        body, etag = store.list_payload()
+        payload = json.loads(body)
+
+        assert payload['count'] == 2
+        assert [t['slug'] for t in payload['templates']] == ['first', 'second']
+        assert etag.startswith('"') and etag.endswith('"')
+
+    def test_slug_lookup(self, store):
+        """Test slug map lookups, including merged slugs"""
+        assert store.get_template('first')['id'] == 1
+        assert store.get_template('second-copy')['id'] == 2
+        assert store.get_template('missing') is None
+
+    def test_template_payload_is_cached(self, store):
+        """Test per-slug bodies are serialized once"""
+        first = store.template_payload('first')
+        assert json.loads(first[0])['template']['id'] == 1
+        assert store.template_payload('first') is first
+        assert store.template_payload('missing') is None
+
+    def test_snapshot_reused_until_file_changes(self, store, temp_templates_file):
+        """Test the file is only re-parsed after it changes on disk"""
+        body, etag = store.list_payload()
+        assert store.list_payload() == (body, etag)
+
+        with open(temp_templates_file, 'w') as f:
+            json.dump([{'id': 3, 'slug': 'third'}], f)
+        stat = os.stat(temp_templates_file)
+        os.utime(temp_templates_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        new_body, new_etag = store.list_payload()
+        assert new_etag != etag
+        assert json.loads(new_body)['count'] == 1
+        assert store.get_template('third') is not None
+
+    def test_add_to_library_invalidates(self, temp_templates_file):
+        """Test deduplication writes are visible immediately"""
+        store = TemplateStore(temp_templates_file)
+        service = DebateDeduplicationService(templates_path=temp_templates_file, template_store=store)
+        _, etag = store.list_payload()
+
+        added = service.add_to_library({
+            'title': 'A New Debate',
+            'context': 'Brand new context',
+            'option_a': 'A',
+            'option_b': 'B'
+        })
+
+        body, new_etag = store.list_payload()
+        assert new_etag != etag
+        assert json.loads(body)['count'] == 3
+        assert store.get_template(added['slug'])['id'] == 3
+
+    def test_missing_file(self, tmp_path):
+        """Test a missing library serves an empty list"""
+        store = TemplateStore(tmp_path / 'missing.json')
+        payload = json.loads(store.list_payload()[0])
+
+        assert payload['templates'] == []
+        assert payload['count'] == 0
@@ -0,0 +1,48 @@
+# backend/test/test_token_budget.py
+"""
+Unit tests for adaptive completion budgets
+"""
+
+from services.token_budget import BudgetController
+
+
+def completion(tokens: int) -> str:
+    return "x" * (tokens * 4)
+
+
+class TestBudgetController:
+    """Unit tests for BudgetController"""
+
+    def test_default_until_enough_samples(self):
+        """Test the caller's limit is used while data is thin"""
+        budgets = BudgetController(min_samples=5)
+        for _ in range(4):
+            budgets.record("continue:Deon", completion(60), 200)
+        assert budgets.budget("continue:Deon", 200) == 200
+
+    def test_budget_tracks_high_percentile(self):
+        """Test the budget is p95 of observed lengths plus margin and pad"""
+        budgets = BudgetController(min_samples=10, margin=1.25, pad=10)
+        for tokens in range(41, 61):
+            budgets.record("openings:Conse", completion(tokens), 480)
+        # p95 of 41..60 is 59; ceil(59 * 1.25) + 10
+        assert budgets.budget("openings:Conse", 480) == 84
+        assert budgets.budget("openings:Conse", 70) == 70  # never above the ceiling
+        assert budgets.budget("openings:Virtue", 480) == 480  # keys are independent
+
+    def test_truncation_backs_off_to_default(self):
+        """Test frequent completions at the limit restore the default"""
+        budgets = BudgetController(min_samples=10, max_truncation_rate=0.05)
+        for _ in range(18):
+            budgets.record("judge", completion(100), 600)
+        assert budgets.budget("judge", 600) < 600
+        budgets.record("judge", completion(140), 150)
+        budgets.record("judge", completion(140), 150)
+        assert budgets.budget("judge", 600) == 600
+
+    def test_floor(self):
+        """Test tiny completions don't shrink the budget below the floor"""
+        budgets = BudgetController(min_samples=3, floor=48)
+        for _ in range(3):
+            budgets.record("summary", "ok", 225)
+        assert budgets.budget("summary", 225) == 48
@@ -0,0 +1,197 @@
+# backend/test/test_tracing.py
+"""
+Unit tests for request tracing
+"""
+
+import contextvars
+import json
+import threading
+import time
+
+import pytest
+from services.llm_service import LLMService
+from services.tracing import Tracer, TracingMiddleware, tracer as default_tracer
+
+
+def names(trace):
+    return [s["name"] for s in trace["spans"]]
+
+
+class TestTracer:
+    """Unit tests for Tracer"""
+
+    def test_spans_nest_under_the_root(self):
+        """Test child spans record their parent and the trace is stored when the root ends"""
+        tracer = Tracer()
+        with tracer.span("POST /continue", root=True) as root:
+            with tracer.span("agent.respond", agent="Deon"):
+                with tracer.span("llm.generate"):
+                    pass
+            trace_id = tracer.current_trace_id()
+            root.set(status=200)
+
+        trace = tracer.get(trace_id)
+        spans = {s["name"]: s for s in trace["spans"]}
+        assert names(trace) == ["POST /continue", "agent.respond", "llm.generate"]
+        assert spans["llm.generate"]["parent_id"] == spans["agent.respond"]["span_id"]
+        assert spans["agent.respond"]["attributes"] == {"agent": "Deon"}
+        assert trace["attributes"] == {"status": 200}
+        assert trace["duration_ms"] >= spans["agent.respond"]["duration_ms"]
+
+    def test_spans_outside_a_request_are_not_recorded(self):
+        """Test non-root spans with no parent, and disabled tracing, record nothing"""
+        tracer = Tracer()
+        with tracer.span("storage.read") as span:
+            span.set(bytes=10)
+        assert tracer.recent() == []
+
+        off = Tracer(enabled=False)
+        with off.span("GET /", root=True):
+            pass
+        assert off.recent() == []
+
+    def test_errors_are_recorded(self):
+        """Test an exception marks its span and the trace, and still propagates"""
+        tracer = Tracer()
+        with pytest.raises(ValueError):
+            with tracer.span("POST /judge", root=True):
+                with tracer.span("llm.provider"):
+                    raise ValueError("bad gateway")
+
+        [summary] = tracer.recent(errors_only=True)
+        trace = tracer.get(summary["trace_id"])
+        assert summary["errors"] == 2
+        assert trace["spans"][1]["error"] == "ValueError: bad gateway"
+
+    def test_ring_buffer_and_filters(self):
+        """Test old traces fall out and recent() filters by duration and name"""
+        tracer = Tracer(capacity=3)
+        for i in range(5):
+            with tracer.span(f"GET /{i}", root=True):
+                if i == 4:
+                    time.sleep(0.02)
+
+        assert [t["name"] for t in tracer.recent()] == ["GET /4", "GET /3", "GET /2"]
+        assert [t["name"] for t in tracer.recent(min_ms=15)] == ["GET /4"]
+        assert [t["name"] for t in tracer.recent(name="/3")] == ["GET /3"]
+
+    def test_slow_traces_are_written_and_rotated(self, tmp_path):
+        """Test only slow traces reach the file, which rotates at its size cap"""
+        path = str(tmp_path / "traces.jsonl")
+        tracer = Tracer(path=path, slow_ms=10, max_file_bytes=600)
+        with tracer.span("GET /fast", root=True):
+            pass
+        for _ in range(3):
+            with tracer.span("POST /continue", root=True):
+                time.sleep(0.011)
+
+        with open(path) as f:
+            written = [json.loads(line) for line in f]
+        assert written and all(t["name"] == "POST /continue" for t in written)
+        assert (tmp_path / "traces.jsonl.1").exists()
+
+    def test_copied_context_keeps_the_parent_across_threads(self):
+        """Test work run under copy_context() in another thread joins the trace"""
+        tracer = Tracer()
+        with tracer.span("POST /judge", root=True):
+            trace_id = tracer.current_trace_id()
+            ctx = contextvars.copy_context()
+
+            def member():
+                with tracer.span("llm.generate"):
+                    pass
+
+            t = threading.Thread(target=ctx.run, args=(member,))
+            t.start()
+            t.join()
+
+        assert names(tracer.get(trace_id)) == ["POST /judge", "llm.generate"]
+
+    def test_traced_decorator(self):
+        """Test the decorator spans calls inside a trace and is a plain call outside one"""
+        tracer = Tracer()
+
+        @tracer.traced("parse.clamp_json")
+        def parse(text):
+            return json.loads(text)
+
+        assert parse("{}") == {}
+        with tracer.span("POST /openings", root=True):
+            parse("[]")
+            trace_id = tracer.current_trace_id()
+        assert names(tracer.get(trace_id)) == ["POST /openings", "parse.clamp_json"]
+
+
+class TestTracingMiddleware:
+    """Root spans for HTTP requests"""
+
+    def test_requests_are_traced_by_route(self):
+        """Test the trace id header, route-template naming, skipped paths and background spans"""
+        from fastapi import BackgroundTasks, FastAPI
+        from fastapi.testclient import TestClient
+
+        tracer = Tracer()
+        app = FastAPI()
+        app.add_middleware(TracingMiddleware, tracer=tracer, skip_paths={"/health"})
+
+        def background():
+            time.sleep(0.05)
+            with tracer.span("judge.update"):
+                pass
+
+        @app.get("/api/debates/{debate_id}")
+        def get_debate(debate_id: str, background_tasks: BackgroundTasks):
+            with tracer.span("storage.read"):
+                background_tasks.add_task(background)
+            return {"id": debate_id}
+
+        @app.get("/health")
+        def health():
+            return {}
+
+        client = TestClient(app)
+        response = client.get("/api/debates/abc")
+        client.get("/health")
+
+        [summary] = tracer.recent()
+        assert response.headers["x-trace-id"] == summary["trace_id"]
+        assert summary["name"] == "GET /api/debates/{debate_id}"
+        assert summary["attributes"]["status"] == 200
+        # The response was complete before the background task ran under the same trace
+        assert summary["duration_ms"] < 50
+        assert names(tracer.get(summary["trace_id"])) == [
+            "GET /api/debates/{debate_id}", "storage.read", "judge.update"
+        ]
+
+
+class TestLLMTracing:
+    """LLM calls appear as spans, including hedged calls on worker threads"""
+
+    class Provider:
+        def __init__(self, name, delay):
+            self.name, self.delay = name, delay
+
+        def generate(self, *args, cancel=None, **kwargs):
+            if cancel is not None and cancel.wait(self.delay):
+                raise RuntimeError("cancelled")
+            return '{"stance":"A"}'
+
+    def test_hedged_calls_join_the_request_trace(self):
+        """Test both legs of a hedged call are children of llm.generate, retries annotate the caller"""
+        default_tracer.clear()
+        service = LLMService([self.Provider("slow", 1.0), self.Provider("fast", 0)],
+                             hedge_min_delay=0.01, hedge_max_delay=0.01)
+        with default_tracer.span("POST /continue", root=True):
+            with default_tracer.span("agent.respond", agent="Deon"):
+                service.generate("sys", "user", endpoint="continue", budget_key="continue:Deon")
+                service.record_retry("continue")
+            trace_id = default_tracer.current_trace_id()
+
+        trace = default_tracer.get(trace_id)
+        spans = trace["spans"]
+        generate = next(s for s in spans if s["name"] == "llm.generate")
+        legs = [s for s in spans if s["name"] == "llm.provider"]
+        assert generate["attributes"]["agent"] == "Deon"
+        assert {s["attributes"]["provider"] for s in legs} == {"slow", "fast"}
+        assert all(s["parent_id"] == generate["span_id"] for s in legs)
+        assert spans[1]["attributes"]["retries"] == 1
@@ -145,7 +145,7 @@ function App() {
       setCurrentThinkingAgent(agent);
       
       try {
-        const response = await fetch(`${API_URL}/continue`, {
+        const response = await fetch(`${API_URL}/continue?judge_mode=incremental`, {
           method: 'POST',
           headers: { 'Content-Type': 'application/json' },
           body: JSON.stringify({
@@ -177,7 +177,7 @@ function App() {
     setStage('judging'); // New intermediate stage
 
     try {
-      const response = await fetch(`${API_URL}/judge`, {
+      const response = await fetch(`${API_URL}/judge?mode=incremental`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify(transcript),
@@ -264,10 +264,21 @@ function App() {
     setSelectedHistoryItem(null);
   };
 
-  const viewHistoryItem = (item) => {
-    setSelectedHistoryItem(item);
-    setHistoryViewTab('debate');
-    setStage('history');
+  const viewHistoryItem = async (item) => {
+    // History list only carries summaries; fetch the full transcript and verdict
+    try {
+      const response = await fetch(`${API_URL}/api/debates/${item.id}`);
+      if (response.ok) {
+        const data = await response.json();
+        setSelectedHistoryItem(data.debate);
+        setHistoryViewTab('debate');
+        setStage('history');
+      } else {
+        console.error('Failed to load debate');
+      }
+    } catch (error) {
+      console.error('Error loading debate:', error);
+    }
   };
 
   const deleteHistoryItem = async (id) => {